@@ -0,0 +1,98 @@
+"""
+Alert State Machine - hysteresis, escalation and all-clear per station
+======================================================================
+
+Decides when a station's readings should produce an outbound alert.
+Each station tracks its current alert level (forecast, warning, severe):
+
+- a level is entered at the normal thresholds but only left once the
+  readings fall back past a hysteresis band, so a noisy sensor hovering
+  around a threshold does not flap between levels;
+- escalating to a level higher than anything alerted so far in the current
+  episode is sent immediately, regardless of the cooldown;
+- staying at (or returning to) a level that was already alerted only sends
+  a reminder once the cooldown for that level has expired;
+- once readings have stayed below all alert levels for `clear_hold`
+  seconds, a single "all clear" closes the episode.
+"""
+
+from flood_status import STATUS_NORMAL, STATUS_RISING, classify_status
+
+
+# Kinds of alert decisions
+ALERT = "alert"            # First alert of an episode
+ESCALATION = "escalation"  # Higher level than anything alerted in this episode
+REMINDER = "reminder"      # Same level still active after the cooldown
+ALL_CLEAR = "all_clear"    # Episode over
+
+
+class AlertStateMachine:
+    """Alert level of one station; update() returns (kind, status code) or None"""
+
+    __slots__ = ('normal_river_height', 'normal_flow_rate', 'cooldown', 'height_band',
+                 'flow_band', 'forecast_horizon', 'forecast_exit', 'clear_hold',
+                 'state', 'episode_max', 'last_sent', 'calm_since')
+
+    def __init__(self, normal_river_height, normal_flow_rate, cooldown=1800, height_band=0.5,
+                 flow_band=0.1, forecast_horizon=1800, forecast_exit=1.5, clear_hold=300):
+        self.normal_river_height = normal_river_height
+        self.normal_flow_rate = normal_flow_rate
+        self.cooldown = cooldown                  # Seconds before repeating the same level
+        self.height_band = height_band            # cm below the threshold needed to leave a level
+        self.flow_band = flow_band                # Fraction below the flow threshold to leave a level
+        self.forecast_horizon = forecast_horizon  # Forecast crossing within this enters RISING
+        self.forecast_exit = forecast_exit        # ...and must move beyond horizon x this to leave
+        self.clear_hold = clear_hold              # Seconds below all levels before "all clear"
+
+        self.state = STATUS_NORMAL
+        self.episode_max = STATUS_NORMAL  # Highest level alerted since the last all clear
+        self.last_sent = {}               # status code -> time of the last message at that level
+        self.calm_since = None
+
+    def _classify(self, river_height, flow_rate, eta_warning, normal_river_height,
+                  normal_flow_rate, horizon):
+        code = classify_status(river_height, flow_rate, normal_river_height, normal_flow_rate)
+        if code < STATUS_RISING and eta_warning is not None and eta_warning <= horizon:
+            code = STATUS_RISING
+        return code
+
+    def update(self, timestamp, river_height, flow_rate, eta_warning=None):
+        """Advance the state with one reading and decide whether to send a message"""
+        entered = self._classify(river_height, flow_rate, eta_warning, self.normal_river_height,
+                                 self.normal_flow_rate, self.forecast_horizon)
+        if entered > self.state:
+            self.state = entered
+        elif entered < self.state:
+            # Only leave the current level once past the hysteresis band
+            remaining = self._classify(river_height, flow_rate, eta_warning,
+                                       self.normal_river_height - self.height_band,
+                                       self.normal_flow_rate * (1 - self.flow_band),
+                                       self.forecast_horizon * self.forecast_exit)
+            if remaining < self.state:
+                self.state = remaining
+
+        state = self.state
+        if state >= STATUS_RISING:
+            self.calm_since = None
+            if state > self.episode_max:
+                kind = ESCALATION if self.episode_max >= STATUS_RISING else ALERT
+                self.episode_max = state
+            else:
+                # Deduplicate: anything sent at this level or above counts
+                last = max((sent for code, sent in self.last_sent.items() if code >= state),
+                           default=None)
+                if last is not None and timestamp - last < self.cooldown:
+                    return None
+                kind = REMINDER
+            self.last_sent[state] = timestamp
+            return kind, state
+
+        if self.episode_max >= STATUS_RISING:
+            if self.calm_since is None:
+                self.calm_since = timestamp
+            if timestamp - self.calm_since >= self.clear_hold:
+                self.episode_max = STATUS_NORMAL
+                self.last_sent.clear()
+                self.calm_since = None
+                return ALL_CLEAR, state
+        return None
@@ -0,0 +1,394 @@
+"""
+SMS Alerts - concurrent delivery of flood alert events
+======================================================
+
+Alerts are queued and fanned out to every recipient in parallel on a worker
+pool, so neither the GUI nor serial processing ever waits on the network.
+Each recipient is retried with exponential backoff on transient failures and
+its outcome is tracked per message.
+
+The transport is pluggable: TwilioTransport uses the official client, while
+HttpTransport speaks the Twilio Messages REST API to any base URL, e.g. a
+local stand-in server for tests (set TWILIO_API_BASE_URL).
+
+All credentials are loaded from environment variables (see config.env.example)
+and are NOT hardcoded in this source code.
+"""
+
+import base64
+import heapq
+import http.client
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from monitor_engine import AlertEvent
+
+
+# Per-recipient delivery states
+PENDING = "pending"
+RETRYING = "retrying"
+SENT = "sent"
+FAILED = "failed"
+
+
+class DeliveryError(Exception):
+    """A failed send; retryable errors are attempted again after a backoff"""
+
+    def __init__(self, message, retryable=True, status=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status = status
+
+
+def is_retryable_status(status):
+    """Rate limiting and server errors are worth retrying, other 4xx are not"""
+    return status == 429 or status >= 500
+
+
+class TwilioTransport:
+    """Send messages with the official Twilio client"""
+
+    def __init__(self, client, from_number):
+        self.client = client
+        self.from_number = from_number
+
+    def send(self, to, body):
+        from twilio.base.exceptions import TwilioRestException
+        try:
+            message = self.client.messages.create(body=body, from_=self.from_number, to=to)
+        except TwilioRestException as e:
+            raise DeliveryError(str(e), is_retryable_status(e.status), e.status)
+        except Exception as e:
+            raise DeliveryError(str(e))
+        return message.sid
+
+
+class HttpTransport:
+    """Send messages through a Twilio-compatible Messages REST endpoint
+
+    Each worker thread keeps its own persistent HTTP connection.
+    """
+
+    def __init__(self, base_url, account_sid, auth_token, from_number, timeout=10):
+        url = urlsplit(base_url)
+        self.https = url.scheme == "https"
+        self.host = url.netloc
+        self.path = f"{url.path.rstrip('/')}/2010-04-01/Accounts/{account_sid}/Messages.json"
+        self.from_number = from_number
+        self.timeout = timeout
+        credentials = base64.b64encode(f"{account_sid}:{auth_token}".encode()).decode()
+        self.headers = {
+            "Authorization": f"Basic {credentials}",
+            "Content-Type": "application/x-www-form-urlencoded",
+        }
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            connection = cls(self.host, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def send(self, to, body):
+        payload = urlencode({"To": to, "From": self.from_number, "Body": body})
+        connection = self._connection()
+        try:
+            connection.request("POST", self.path, payload, self.headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            # Drop the connection so the next attempt opens a fresh one
+            connection.close()
+            self._local.connection = None
+            raise DeliveryError(f"Connection error: {e}")
+
+        if response.status >= 400:
+            raise DeliveryError(f"HTTP {response.status}: {data[:200]!r}",
+                                is_retryable_status(response.status), response.status)
+        return json.loads(data).get("sid")
+
+
+class RecipientResult:
+    """Delivery state of one message to one recipient"""
+
+    __slots__ = ("to", "status", "attempts", "sid", "error", "sent_at")
+
+    def __init__(self, to):
+        self.to = to
+        self.status = PENDING
+        self.attempts = 0
+        self.sid = None
+        self.error = None
+        self.sent_at = None
+
+    def __repr__(self):
+        return f"RecipientResult({self.to!r}, {self.status}, attempts={self.attempts})"
+
+
+class AlertDelivery:
+    """Tracks the fan-out of one alert message to all its recipients"""
+
+    def __init__(self, message_id, body, recipients):
+        self.message_id = message_id
+        self.body = body
+        self.created_at = time.time()
+        self.completed_at = None
+        self.results = {to: RecipientResult(to) for to in recipients}
+        self._remaining = len(self.results)
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        if not self._remaining:
+            self._finish()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until every recipient is sent or has failed for good"""
+        return self._done.wait(timeout)
+
+    def counts(self):
+        counts = {PENDING: 0, RETRYING: 0, SENT: 0, FAILED: 0}
+        for result in self.results.values():
+            counts[result.status] += 1
+        return counts
+
+    def _recipient_finished(self):
+        with self._lock:
+            self._remaining -= 1
+            finished = self._remaining == 0
+        if finished:
+            self._finish()
+        return finished
+
+    def _finish(self):
+        self.completed_at = time.time()
+        self._done.set()
+
+
+class AlertDispatcher:
+    """Queue of alert messages sent to all recipients in parallel, with retries"""
+
+    def __init__(self, transport, workers=8, max_attempts=4, backoff=1.0, max_backoff=60.0,
+                 on_complete=None, history=1000, metrics=None):
+        self.transport = transport
+        self.max_attempts = max_attempts
+        self.backoff = backoff          # Delay before the first retry, in seconds
+        self.max_backoff = max_backoff  # Upper bound on a single retry delay
+        self.on_complete = on_complete  # Optional callback(AlertDelivery)
+        self.history = history          # Finished deliveries kept for lookup
+        self.metrics = metrics          # Optional MonitorMetrics
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="AlertWorker")
+        self._ids = itertools.count(1)
+        self._deliveries = {}
+        self._finished = deque()
+        self._lock = threading.Lock()
+
+        # Retries wait in a heap of (due time, seq, delivery, recipient) until due
+        self._retries = []
+        self._retry_seq = itertools.count()
+        self._retry_ready = threading.Condition()
+        self._closed = False
+        self._scheduler = threading.Thread(target=self._run_retries, name="AlertRetryScheduler",
+                                           daemon=True)
+        self._scheduler.start()
+
+    def submit(self, body, recipients):
+        """Queue a message for every recipient and return its AlertDelivery immediately"""
+        delivery = AlertDelivery(next(self._ids), body, dict.fromkeys(recipients))
+        with self._lock:
+            self._deliveries[delivery.message_id] = delivery
+        if delivery.done:
+            self._completed(delivery)
+        for to in delivery.results:
+            self._executor.submit(self._attempt, delivery, to)
+        return delivery
+
+    def get(self, message_id):
+        """Look up a delivery by message id (recent ones only)"""
+        with self._lock:
+            return self._deliveries.get(message_id)
+
+    def _attempt(self, delivery, to):
+        result = delivery.results[to]
+        result.attempts += 1
+        metrics = self.metrics
+        start = time.perf_counter()
+        try:
+            result.sid = self.transport.send(to, delivery.body)
+        except DeliveryError as e:
+            result.error = str(e)
+            if e.retryable and result.attempts < self.max_attempts:
+                result.status = RETRYING
+                if self._schedule_retry(delivery, to, result.attempts):
+                    if metrics is not None:
+                        metrics.sms_send_seconds.observe(time.perf_counter() - start)
+                        metrics.sms_retries.inc()
+                    return
+            result.status = FAILED
+            print(f"Alert {delivery.message_id} to {to} failed after {result.attempts} attempt(s): {e}")
+        except Exception as e:
+            # Transport bugs are not retried
+            result.error = str(e)
+            result.status = FAILED
+            print(f"Alert {delivery.message_id} to {to} failed: {e}")
+        else:
+            result.status = SENT
+            result.error = None
+            result.sent_at = time.time()
+
+        if metrics is not None:
+            metrics.sms_send_seconds.observe(time.perf_counter() - start)
+            if result.status == SENT:
+                metrics.sms_sent.inc()
+            else:
+                metrics.sms_failed.inc()
+
+        if delivery._recipient_finished():
+            self._completed(delivery)
+
+    def _schedule_retry(self, delivery, to, attempts):
+        """Queue another attempt after a backoff; False once the dispatcher is closed"""
+        # Exponential backoff with full jitter so retries do not arrive in lockstep
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+        due = time.monotonic() + random.uniform(delay / 2, delay)
+        with self._retry_ready:
+            if self._closed:
+                return False
+            heapq.heappush(self._retries, (due, next(self._retry_seq), delivery, to))
+            self._retry_ready.notify()
+        return True
+
+    def _run_retries(self):
+        with self._retry_ready:
+            while True:
+                if self._closed:
+                    return  # close() fails whatever is still queued
+                if not self._retries:
+                    self._retry_ready.wait()
+                    continue
+                due = self._retries[0][0]
+                now = time.monotonic()
+                if due > now:
+                    self._retry_ready.wait(due - now)
+                    continue
+                _, _, delivery, to = heapq.heappop(self._retries)
+                # close() sets the flag under this lock before shutting the pool down
+                self._executor.submit(self._attempt, delivery, to)
+
+    def _abandon(self, delivery, to):
+        """Fail a recipient whose retry was still waiting when the dispatcher closed"""
+        result = delivery.results[to]
+        result.status = FAILED
+        print(f"Alert {delivery.message_id} to {to} abandoned after {result.attempts} attempt(s): "
+              f"{result.error}")
+        if self.metrics is not None:
+            self.metrics.sms_failed.inc()
+        if delivery._recipient_finished():
+            self._completed(delivery)
+
+    def _completed(self, delivery):
+        with self._lock:
+            self._finished.append(delivery.message_id)
+            while len(self._finished) > self.history:
+                self._deliveries.pop(self._finished.popleft(), None)
+        if self.on_complete:
+            try:
+                self.on_complete(delivery)
+            except Exception as e:
+                print(f"Error in alert completion callback: {e}")
+
+    def close(self, wait=True):
+        """Stop scheduling retries, fail the ones still waiting and shut down the worker pool"""
+        with self._retry_ready:
+            self._closed = True
+            abandoned, self._retries = self._retries, []
+            self._retry_ready.notify()
+        for _, _, delivery, to in abandoned:
+            self._abandon(delivery, to)
+        self._executor.shutdown(wait=wait)
+
+
+def create_transport():
+    """Build the SMS transport from environment variables, or None if not configured
+
+    Raises if the Twilio client cannot be created.
+    """
+    account_sid = os.getenv('TWILIO_ACCOUNT_SID')
+    auth_token = os.getenv('TWILIO_AUTH_TOKEN')
+    from_number = os.getenv('TWILIO_FROM_NUMBER')
+    if not all([account_sid, auth_token, from_number]):
+        return None
+
+    base_url = os.getenv('TWILIO_API_BASE_URL')
+    if base_url:
+        return HttpTransport(base_url, account_sid, auth_token, from_number)
+
+    from twilio.rest import Client
+    return TwilioTransport(Client(account_sid, auth_token), from_number)
+
+
+class TwilioAlerter:
+    """Engine subscriber that sends every AlertEvent as SMS to the emergency numbers"""
+
+    def __init__(self, workers=None, metrics=None):
+        emergency_numbers_str = os.getenv('EMERGENCY_NUMBERS', '')
+        self.emergency_numbers = [num.strip() for num in emergency_numbers_str.split(',') if num.strip()]
+        if workers is None:
+            workers = int(os.getenv('ALERT_WORKERS', '8'))
+
+        # Initialize the transport only if all required environment variables are present
+        self.dispatcher = None
+        self.error = None
+        self.configured = False
+        try:
+            transport = create_transport()
+        except Exception as e:
+            print(f"Error initializing Twilio client: {e}")
+            self.configured = True
+            self.error = e
+            return
+
+        if transport is None:
+            print("Twilio configuration incomplete - SMS alerts will be disabled")
+            print("Please create a config.env file with your Twilio credentials")
+            return
+
+        self.configured = True
+        self.dispatcher = AlertDispatcher(transport, workers=workers, on_complete=self.report,
+                                          metrics=metrics)
+        print("Twilio configuration loaded successfully from environment variables")
+
+    def __call__(self, event):
+        if isinstance(event, AlertEvent):
+            self.send(event.message)
+
+    def send(self, message):
+        """Queue an SMS alert to all emergency numbers; returns the AlertDelivery or None"""
+        if not self.dispatcher:
+            print("SMS alerts disabled - Twilio client not initialized")
+            return None
+        return self.dispatcher.submit(message, self.emergency_numbers)
+
+    def report(self, delivery):
+        counts = delivery.counts()
+        if counts[FAILED]:
+            print(f"Alert {delivery.message_id} sent to {counts[SENT]} of "
+                  f"{len(delivery.results)} numbers ({counts[FAILED]} failed)")
+        else:
+            print(f"Alert sent successfully via Twilio: {delivery.body}")
+
+    def close(self):
+        if self.dispatcher:
+            self.dispatcher.close(wait=False)
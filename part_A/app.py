@@ -12,13 +12,23 @@ All credentials must be provided via environment variables in a config.env file.
 
 import tkinter as tk
 from tkinter import messagebox, ttk
-import serial
 import time
-from datetime import datetime
-from twilio.rest import Client
 import os
+from datetime import datetime
 from dotenv import load_dotenv
 
+from alerts import TwilioAlerter
+from capture import CaptureWriter
+from metrics import MetricsReporter, MetricsServer, MonitorMetrics
+from render import LabelRenderer
+from monitor_engine import (FloodMonitorEngine, StatusEvent, RiskEvent, format_time, RISKS,
+                            LEVEL_NORMAL, LEVEL_WARNING, LEVEL_ALERT)
+from scenarios import ScenarioSweep
+from timeseries import HistoryRecorder, TimeSeriesStore
+from serial_link import (SerialLink, parse_vid_pids, DEFAULT_VID_PIDS, CONNECTING, CONNECTED,
+                         WAITING, FAILED)
+from serial_reader import SampleRingBuffer
+
 # Load environment variables
 load_dotenv('config.env')
 
@@ -42,19 +52,36 @@ class FloodMonitoringApp:
         # Configure root background
         self.root.configure(bg=self.bg_color)
         
-        # Twilio Configuration - Load from environment variables only
-        # No hardcoded secrets in this application
-        self.twilio_account_sid = os.getenv('TWILIO_ACCOUNT_SID')
-        self.twilio_auth_token = os.getenv('TWILIO_AUTH_TOKEN')
-        self.twilio_from_number = os.getenv('TWILIO_FROM_NUMBER')
-        emergency_numbers_str = os.getenv('EMERGENCY_NUMBERS', '')
-        self.emergency_numbers = [num.strip() for num in emergency_numbers_str.split(',') if num.strip()]
-        
-        # Initialize Twilio client only if all required environment variables are present
-        self.twilio_client = None
-        if not all([self.twilio_account_sid, self.twilio_auth_token, self.twilio_from_number]):
-            print("Twilio configuration incomplete - SMS alerts will be disabled")
-            print("Please create a config.env file with your Twilio credentials")
+        # Label style for each engine severity level
+        self.level_styles = {
+            LEVEL_NORMAL: 'Normal.TLabel',
+            LEVEL_WARNING: 'Warning.TLabel',
+            LEVEL_ALERT: 'Alert.TLabel',
+        }
+
+        # Optional hot-path metrics: Prometheus text on METRICS_PORT and/or a printed
+        # summary every METRICS_INTERVAL seconds (see metrics.py)
+        self.metrics = None
+        self.metrics_server = None
+        self.metrics_reporter = None
+        metrics_port = os.getenv('METRICS_PORT')
+        metrics_interval = os.getenv('METRICS_INTERVAL')
+        if metrics_port or metrics_interval:
+            self.metrics = MonitorMetrics()
+            if metrics_port:
+                self.metrics_server = MetricsServer(self.metrics, port=int(metrics_port)).start()
+                print(f"Metrics available at {self.metrics_server.url}")
+            if metrics_interval:
+                self.metrics_reporter = MetricsReporter(self.metrics, float(metrics_interval))
+                self.metrics_reporter.start()
+
+        # Widget updates are diffed and capped at GUI_MAX_FPS redraws per second
+        self.renderer = LabelRenderer(self.root, max_fps=float(os.getenv('GUI_MAX_FPS', '10')),
+                                      metrics=self.metrics)
+
+        # SMS alerts - credentials are loaded from environment variables only
+        self.alerter = TwilioAlerter(metrics=self.metrics)
+        if not self.alerter.configured:
             messagebox.showinfo("SMS Configuration", 
                               "SMS alerts are not configured.\n"
                               "To enable SMS alerts, create a config.env file with:\n"
@@ -62,71 +89,51 @@ class FloodMonitoringApp:
                               "- TWILIO_AUTH_TOKEN\n"
                               "- TWILIO_FROM_NUMBER\n"
                               "- EMERGENCY_NUMBERS")
-        else:
-            try:
-                self.twilio_client = Client(self.twilio_account_sid, self.twilio_auth_token)
-                print("Twilio configuration loaded successfully from environment variables")
-            except Exception as e:
-                print(f"Error initializing Twilio client: {e}")
-                messagebox.showwarning("Twilio Error", 
-                                     f"Failed to initialize Twilio client: {e}\n"
-                                     "SMS alerts will be disabled.")
-                self.twilio_client = None
-        
-        # Alert tracking
-        self.last_alert_time = None
-        self.ALERT_COOLDOWN = 1800  # 30 minutes in seconds
-        
-        # Serial connection
-        self.serial_connection = None
-        self.rainfall_intensity = 0.0
-        
-        # Data variables
-        self.sensor_height = 0.0  # Raw sensor reading
-        self.river_height = 0.0   # Actual river height
-        self.flow_rate = 0.0
-        
-        # Constants
-        self.SENSOR_MAX_HEIGHT = 20.0  # Distance from sensor to river bed in cm
-        self.NORMAL_RIVER_HEIGHT = 10.0  # Normal river height in cm
-        self.NORMAL_FLOW_RATE = 1.0     # Normal flow rate in L/min
-        self.AREA_KM2 = 1.0  # Area in square kilometers
-        self.DAM_CAPACITY = 50000.0  # Dam capacity in cubic meters
+        elif self.alerter.error:
+            messagebox.showwarning("Twilio Error", 
+                                 f"Failed to initialize Twilio client: {self.alerter.error}\n"
+                                 "SMS alerts will be disabled.")
+
+        # Serial connection, opened and reopened on the link's own thread (see serial_link.py).
+        # SERIAL_PORT pins the port; otherwise it is discovered by USB VID:PID and handshake.
+        self.serial_link = None
+        self.sample_buffer = SampleRingBuffer(capacity=1024)
+        if self.metrics:
+            self.metrics.watch_buffer(self.sample_buffer)
+
+        # Optional raw capture of the serial link for later replay (see capture.py)
+        capture_file = os.getenv('CAPTURE_FILE')
+        self.capture = CaptureWriter(capture_file) if capture_file else None
+
+        # Flood logic lives in the GUI-free engine; this window is one of its subscribers
+        self.engine = FloodMonitorEngine(metrics=self.metrics)
+        self.engine.subscribe(self.alerter)
+        self.engine.subscribe(self.on_engine_event)
+
+        # Optional persistent reading history (see timeseries.py)
+        history_dir = os.getenv('HISTORY_DIR')
+        self.history = TimeSeriesStore(history_dir) if history_dir else None
+        if self.history:
+            self.engine.subscribe(HistoryRecorder(self.history, self.engine.station_name))
+
+        # What-if scenario sweep window (rainfall intensity x duration)
+        self.SWEEP_INTENSITIES = (0, 5, 10, 20, 50, 100)  # mm/h
+        self.SWEEP_DURATIONS = (1, 3, 6, 12, 24, 48)      # hrs
+        self.scenario_sweep = None
+        self.scenario_window = None
 
         # GUI components
         self.setup_ui()
 
-        # Attempt to establish a serial connection
+        # Start looking for the ESP32 in the background
         self.connect_to_arduino()
 
         # Update the GUI dynamically
         self.update_gui()
 
     def send_alert(self, message):
-        """Send SMS alert using Twilio credentials loaded from environment variables"""
-        # Only send alerts if Twilio client is properly initialized with environment variables
-        if not self.twilio_client:
-            print("SMS alerts disabled - Twilio client not initialized")
-            return
-
-        # Check if enough time has passed since last alert
-        current_time = time.time()
-        if (self.last_alert_time and 
-            current_time - self.last_alert_time < self.ALERT_COOLDOWN):
-            return  # Don't send alert if within cooldown period
-
-        try:
-            # Send SMS to all configured emergency numbers from environment variables
-            for number in self.emergency_numbers:
-                self.twilio_client.messages.create(
-                    body=message,
-                    from_=self.twilio_from_number,  # From environment variable
-                    to=number
-                )
-            print(f"Alert sent successfully via Twilio: {message}")
-            self.last_alert_time = current_time
-        except Exception as e:
-            print(f"Error sending SMS alert via Twilio: {e}")
+        """Send SMS alert to all emergency numbers"""
+        return self.alerter.send(message)
 
     def setup_ui(self):
         # Style configuration
@@ -199,6 +206,13 @@ class FloodMonitoringApp:
         self.status_label = ttk.Label(row3, text="N/A", style='Normal.TLabel')
         self.status_label.pack(side=tk.RIGHT)
 
+        # Trend forecast
+        row4 = ttk.Frame(data_frame)
+        row4.pack(fill=tk.X, pady=5)
+        ttk.Label(row4, text="Forecast:", style='Data.TLabel').pack(side=tk.LEFT)
+        self.forecast_label = ttk.Label(row4, text="N/A", style='Data.TLabel')
+        self.forecast_label.pack(side=tk.RIGHT)
+
     def create_input_card(self):
         """Create the input parameters card"""
         card = ttk.Frame(self.main_container, style='Card.TFrame', padding="15")
@@ -233,7 +247,55 @@ class FloodMonitoringApp:
         btn_frame = ttk.Frame(card)
         btn_frame.pack(fill=tk.X, pady=(10, 0))
         self.calculate_button = ttk.Button(btn_frame, text="Calculate Risk", command=self.calculate, style='TButton')
-        self.calculate_button.pack(pady=5, ipadx=10, ipady=5)
+        self.calculate_button.pack(side=tk.LEFT, expand=True, pady=5, ipadx=10, ipady=5)
+        self.sweep_button = ttk.Button(btn_frame, text="Scenario Sweep", command=self.open_scenario_window, style='TButton')
+        self.sweep_button.pack(side=tk.LEFT, expand=True, pady=5, ipadx=10, ipady=5)
+
+    def open_scenario_window(self):
+        """Show the risk matrix for every intensity x duration at the current flow rate"""
+        if self.scenario_window:
+            self.scenario_window.lift()
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title("Scenario Sweep")
+        window.configure(bg=self.bg_color)
+        frame = ttk.Frame(window, style='Card.TFrame', padding="15")
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        ttk.Label(frame, text="Intensity (mm/h) \\ Duration (hrs)", style='CardHeader.TLabel').grid(
+            row=0, column=0, padx=5, pady=5)
+        for col, duration in enumerate(self.SWEEP_DURATIONS, start=1):
+            ttk.Label(frame, text=f"{duration:g}", style='CardHeader.TLabel').grid(row=0, column=col, padx=5)
+
+        self.scenario_cells = []
+        for row, intensity in enumerate(self.SWEEP_INTENSITIES, start=1):
+            ttk.Label(frame, text=f"{intensity:g}", style='CardHeader.TLabel').grid(row=row, column=0, pady=2)
+            cells = []
+            for col in range(1, len(self.SWEEP_DURATIONS) + 1):
+                cell = ttk.Label(frame, text="N/A", style='Data.TLabel', width=10, anchor=tk.CENTER)
+                cell.grid(row=row, column=col, padx=2, pady=2)
+                cells.append(cell)
+            self.scenario_cells.append(cells)
+
+        self.scenario_window = window
+        self.scenario_sweep = ScenarioSweep(self.engine, self.SWEEP_INTENSITIES, self.SWEEP_DURATIONS)
+        self.scenario_sweep.subscribe(self.show_scenarios)
+        window.protocol("WM_DELETE_WINDOW", self.close_scenario_window)
+        self.scenario_sweep.update()
+
+    def close_scenario_window(self):
+        self.scenario_sweep.close()
+        self.scenario_sweep = None
+        self.scenario_window.destroy()
+        self.scenario_window = None
+
+    def show_scenarios(self, grid):
+        """Render a ScenarioGrid computed at the current flow rate"""
+        for i, cells in enumerate(self.scenario_cells):
+            for j, cell in enumerate(cells):
+                text, level = RISKS[grid.risk[i, j, 0]]
+                self.renderer.set(cell, text=text.split()[0], style=self.level_styles[level])
 
     def create_analysis_card(self):
         """Create the flood risk analysis card"""
@@ -281,6 +343,8 @@ class FloodMonitoringApp:
         ttk.Label(conn_frame, text="Connection:", style='Data.TLabel').pack(side=tk.LEFT)
         self.connection_label = ttk.Label(conn_frame, text="Not Connected", style='Alert.TLabel')
         self.connection_label.pack(side=tk.LEFT, padx=5)
+        self.reconnect_button = ttk.Button(conn_frame, text="Reconnect", command=self.reconnect, style='TButton')
+        self.reconnect_button.pack(side=tk.LEFT, padx=5)
         
         # Timestamp
         timestamp_frame = ttk.Frame(status_bar)
@@ -288,211 +352,143 @@ class FloodMonitoringApp:
         self.timestamp_label = ttk.Label(timestamp_frame, text="Last Updated: Never", style='Data.TLabel')
         self.timestamp_label.pack(side=tk.RIGHT)
 
+        # Samples received from the link and dropped by the ring buffer before being processed
+        self.samples_label = ttk.Label(timestamp_frame, text="Received: 0 | Dropped: 0", style='Data.TLabel')
+        self.samples_label.pack(side=tk.RIGHT, padx=10)
+
     def connect_to_arduino(self):
-        try:
-            self.serial_connection = serial.Serial(port="COM5", baudrate=115200, timeout=1)
-            time.sleep(2)  # Wait for Arduino to initialize
-            self.connection_label.config(text="Connected to COM5", style='Normal.TLabel')
-            print("Connected to Arduino on COM5")
-            
-            # Flush any leftover data
-            self.serial_connection.reset_input_buffer()
-            self.serial_connection.reset_output_buffer()
-            
-        except serial.SerialException as e:
-            self.connection_label.config(text=f"Connection Error: {str(e)}", style='Alert.TLabel')
-            messagebox.showerror("Connection Error", f"Could not connect to Arduino: {e}")
-
-    def check_flood_status(self):
-        """Determine flood status based on river height and flow rate"""
-        if self.river_height > self.NORMAL_RIVER_HEIGHT:
-            if self.flow_rate > self.NORMAL_FLOW_RATE * 2:  # High flow rate
-                status = "SEVERE FLOOD ALERT"
-                style = 'Alert.TLabel'
-                # Send SMS alert for severe flood
-                self.send_alert(
-                    f"SEVERE FLOOD ALERT!\n"
-                    f"River Height: {self.river_height:.1f}cm\n"
-                    f"Flow Rate: {self.flow_rate:.1f}L/min\n"
-                    f"Location: River Monitoring Station"
-                )
-            else:
-                status = "FLOOD WARNING"
-                style = 'Warning.TLabel'
-                # Send SMS alert for flood warning
-                self.send_alert(
-                    f"FLOOD WARNING!\n"
-                    f"River Height: {self.river_height:.1f}cm\n"
-                    f"Flow Rate: {self.flow_rate:.1f}L/min\n"
-                    f"Location: River Monitoring Station"
-                )
-        elif self.flow_rate > self.NORMAL_FLOW_RATE * 2:
-            status = "HIGH FLOW WARNING"
-            style = 'Warning.TLabel'
+        """Start a serial link that finds the ESP32 and keeps reconnecting in the background"""
+        vid_pids = os.getenv('SERIAL_VID_PID')
+        max_retries = os.getenv('SERIAL_MAX_RETRIES', '10')
+        self.serial_link = SerialLink(
+            self.sample_buffer,
+            port=os.getenv('SERIAL_PORT') or None,
+            baud=int(os.getenv('SERIAL_BAUD', '115200')),
+            vid_pids=parse_vid_pids(vid_pids) if vid_pids else DEFAULT_VID_PIDS,
+            handshake=os.getenv('SERIAL_HANDSHAKE') or None,
+            max_retries=int(max_retries) if max_retries else None,
+            echo=self.capture is None,
+            capture=self.capture,
+            metrics=self.metrics,
+        )
+        self.serial_link.start()
+
+    def reconnect(self):
+        """Retry now: skip the backoff delay, or start over if the link gave up"""
+        if self.serial_link and self.serial_link.is_alive():
+            self.serial_link.retry_now()
         else:
-            status = "Normal Conditions"
-            style = 'Normal.TLabel'
-        
-        return status, style
+            self.connect_to_arduino()
+
+    def show_connection(self):
+        link = self.serial_link
+        if link.state == CONNECTED:
+            self.renderer.set(self.connection_label, text=f"Connected to {link.port}", style='Normal.TLabel')
+        elif link.state == CONNECTING:
+            self.renderer.set(self.connection_label, text="Searching for ESP32...", style='Warning.TLabel')
+        elif link.state == WAITING:
+            seconds = max(0, int(link.retry_at - time.monotonic()) + 1) if link.retry_at else 0
+            self.renderer.set(self.connection_label, text=f"Disconnected - retrying in {seconds} s",
+                              style='Warning.TLabel')
+        elif link.state == FAILED:
+            self.renderer.set(self.connection_label, text=f"Connection Error: {link.error}",
+                              style='Alert.TLabel')
 
     def update_gui(self):
-        if self.serial_connection and self.serial_connection.is_open:
+        # Reconnection happens on the serial link's thread; only reflect its state here
+        self.show_connection()
+
+        # Every sample goes through the engine so trend, alerts and history see the full
+        # stream; the renderer already coalesces the resulting widget updates
+        samples = self.sample_buffer.drain()
+        if samples:
+            # Keep the engine's rainfall scenario in sync with the entry boxes
             try:
-                if self.serial_connection.in_waiting:
-                    line = self.serial_connection.readline().decode("utf-8").strip()
-                    print(f"Raw data received: {line}")  # Debug print
-                    
-                    if line:
-                        parts = line.split(",")
-                        if len(parts) == 2:
-                            try:
-                                # Parse sensor height and flow rate
-                                self.sensor_height = float(parts[0])
-                                self.flow_rate = float(parts[1])
-                                
-                                # Calculate actual river height
-                                self.river_height = self.SENSOR_MAX_HEIGHT - self.sensor_height
-                                
-                                # Update labels
-                                self.height_label.config(
-                                    text=f"{self.river_height:.1f} cm"
-                                )
-                                self.flow_rate_label.config(
-                                    text=f"{self.flow_rate:.2f} L/min"
-                                )
-                                
-                                # Update flood status
-                                status, style = self.check_flood_status()
-                                self.status_label.config(
-                                    text=status,
-                                    style=style
-                                )
-                                
-                                # Update timestamp
-                                self.timestamp_label.config(
-                                    text=f"Last Updated: {datetime.now().strftime('%H:%M:%S')}"
-                                )
-                                
-                                print(f"Processed - River Height: {self.river_height} cm, "
-                                      f"Flow Rate: {self.flow_rate} L/min")
-                                
-                                # Only auto-calculate if we have valid input
-                                try:
-                                    intensity = float(self.intensity_entry.get())
-                                    duration = float(self.duration_entry.get())
-                                    if intensity >= 0 and duration > 0:
-                                        self.calculate(show_errors=False)
-                                except ValueError:
-                                    pass
-                                    
-                            except ValueError as e:
-                                print(f"Error parsing values: {e}")
-                        else:
-                            print(f"Unexpected data format. Expected 2 values, got: {len(parts)}")
-                    
-            except Exception as e:
-                print(f"Error reading serial: {e}")
-                try:
-                    self.serial_connection.close()
-                    time.sleep(1)
-                    self.connect_to_arduino()
-                except:
-                    pass
+                self.engine.set_rainfall(float(self.intensity_entry.get()),
+                                         float(self.duration_entry.get()))
+            except ValueError:
+                self.engine.clear_rainfall()
+
+            for sample in samples:
+                self.engine.feed(sample)
+            self.renderer.set(
+                self.samples_label,
+                text=f"Received: {self.sample_buffer.received} | Dropped: {self.sample_buffer.dropped}"
+            )
 
         # Call this method again after 100ms
         self.root.after(100, self.update_gui)
 
-    def calculate_time_to_fill(self, remaining_capacity, intensity, flow_rate):
-        """Calculate time until area is filled based on flow rate and rainfall"""
-        # Convert flow rate from L/min to m³/hour
-        flow_volume_per_hour = flow_rate * 60 / 1000  # L/min -> m³/hour
-        
-        # Calculate rainfall volume per hour
-        rainfall_volume_per_hour = (intensity / 1000) * self.AREA_KM2 * 1e6  # m³/hour
-        
-        # Total inflow per hour
-        total_inflow_per_hour = flow_volume_per_hour + rainfall_volume_per_hour
-        
-        if total_inflow_per_hour <= 0:
-            return float('inf')
-            
-        # Calculate time to fill in hours
-        time_to_fill = remaining_capacity / total_inflow_per_hour
-        
-        return time_to_fill
-
-    def format_time(self, hours):
-        """Format hours into a readable time string"""
-        if hours == float('inf'):
-            return "N/A (no inflow)"
-            
-        if hours < 0:
-            return "Area Already Filled"
-            
-        days = int(hours // 24)
-        remaining_hours = int(hours % 24)
-        minutes = int((hours * 60) % 60)
-        
-        if days > 0:
-            return f"{days}d {remaining_hours}h {minutes}m"
-        elif remaining_hours > 0:
-            return f"{remaining_hours}h {minutes}m"
+    def on_engine_event(self, event):
+        """Render engine events into the dashboard widgets"""
+        if isinstance(event, StatusEvent):
+            # Update labels
+            self.renderer.set(
+                self.height_label,
+                text=f"{event.river_height:.1f} cm"
+            )
+            self.renderer.set(
+                self.flow_rate_label,
+                text=f"{event.flow_rate:.2f} L/min"
+            )
+
+            # Update flood status
+            self.renderer.set(
+                self.status_label,
+                text=event.status,
+                style=self.level_styles[event.level]
+            )
+
+            # Update trend forecast
+            self.renderer.set(self.forecast_label, text=self.format_forecast(event))
+
+            # Update timestamp
+            self.renderer.set(
+                self.timestamp_label,
+                text=f"Last Updated: {datetime.fromtimestamp(event.timestamp).strftime('%H:%M:%S')}"
+            )
+
+            print(f"Processed - River Height: {event.river_height} cm, "
+                  f"Flow Rate: {event.flow_rate} L/min")
+        elif isinstance(event, RiskEvent):
+            self.show_risk(event)
+
+    def format_forecast(self, event):
+        """Describe the rate of rise and time until the warning level is crossed"""
+        trend = self.engine.trend
+        if event.eta_warning is None or trend is None:
+            return "Collecting data..."
+        rate = f"{trend.height_slope * 60:+.2f} cm/min"
+        if event.eta_warning == 0:
+            return f"{rate}, above warning level"
+        if event.eta_warning == float('inf'):
+            return f"{rate}, no crossing forecast"
+        return f"{rate}, warning level in {format_time(event.eta_warning / 3600)}"
+
+    def show_risk(self, event):
+        time_str = format_time(event.time_to_fill)
+        if event.remaining_capacity < 0:
+            capacity_text = f"Excess Volume: {abs(event.remaining_capacity):.2f} m³"
+            time_text = f"Time to Fill: {time_str}"
         else:
-            return f"{minutes}m"
+            capacity_text = f"Remaining Capacity: {event.remaining_capacity:.2f} m³"
+            if event.time_level == LEVEL_ALERT:  # Less than 24 hours to fill
+                time_text = f"Time to Fill: {time_str} (URGENT!)"
+            elif event.time_level == LEVEL_WARNING:  # Less than 3 days to fill
+                time_text = f"Time to Fill: {time_str} (WARNING)"
+            else:
+                time_text = f"Time to Fill: {time_str}"
+            self.renderer.set(self.time_to_fill_label, style=self.level_styles[event.time_level])
+
+        self.renderer.set(self.risk_label, text=event.risk, style=self.level_styles[event.risk_level])
+        self.renderer.set(self.capacity_label, text=capacity_text)
+        self.renderer.set(self.time_to_fill_label, text=time_text)
 
     def calculate(self, show_errors=True):
         try:
             duration = float(self.duration_entry.get())
             intensity = float(self.intensity_entry.get())
-            
-            if duration <= 0 or intensity < 0:
-                raise ValueError("Duration must be positive and intensity must be non-negative")
-
-            # Calculate incoming water volume
-            incoming_volume = (intensity / 1000) * self.AREA_KM2 * 1e6 * duration
-            remaining_capacity = self.DAM_CAPACITY - incoming_volume
-
-            # Calculate time to fill
-            time_to_fill = self.calculate_time_to_fill(remaining_capacity, intensity, self.flow_rate)
-            time_str = self.format_time(time_to_fill)
-
-            # Update risk analysis based on both sensor data and calculations
-            if remaining_capacity < 0:
-                risk_text = "CRITICAL - Dam Capacity Exceeded"
-                risk_style = 'Alert.TLabel'
-                capacity_text = f"Excess Volume: {abs(remaining_capacity):.2f} m³"
-                time_text = f"Time to Fill: {time_str}"
-            else:
-                if self.river_height > self.NORMAL_RIVER_HEIGHT:
-                    if remaining_capacity < self.DAM_CAPACITY * 0.2:
-                        risk_text = "HIGH RISK - Flood Conditions with Low Capacity"
-                        risk_style = 'Alert.TLabel'
-                    else:
-                        risk_text = "MODERATE RISK - Flood Conditions"
-                        risk_style = 'Warning.TLabel'
-                else:
-                    if remaining_capacity < self.DAM_CAPACITY * 0.2:
-                        risk_text = "CAUTION - Low Dam Capacity"
-                        risk_style = 'Warning.TLabel'
-                    else:
-                        risk_text = "LOW RISK - Normal Conditions"
-                        risk_style = 'Normal.TLabel'
-                capacity_text = f"Remaining Capacity: {remaining_capacity:.2f} m³"
-                
-                if time_to_fill < 24:  # Less than 24 hours to fill
-                    time_text = f"Time to Fill: {time_str} (URGENT!)"
-                    self.time_to_fill_label.config(style='Alert.TLabel')
-                elif time_to_fill < 72:  # Less than 3 days to fill
-                    time_text = f"Time to Fill: {time_str} (WARNING)"
-                    self.time_to_fill_label.config(style='Warning.TLabel')
-                else:
-                    time_text = f"Time to Fill: {time_str}"
-                    self.time_to_fill_label.config(style='Normal.TLabel')
-            
-            self.risk_label.config(text=risk_text, style=risk_style)
-            self.capacity_label.config(text=capacity_text)
-            self.time_to_fill_label.config(text=time_text)
-
+            self.engine.calculate(intensity, duration)
         except ValueError as e:
             if show_errors:
                 messagebox.showerror("Input Error", "Please enter valid numbers for duration and intensity")
@@ -501,8 +497,21 @@ class FloodMonitoringApp:
                 messagebox.showerror("Calculation Error", f"Error: {e}")
 
     def on_closing(self):
-        if self.serial_connection and self.serial_connection.is_open:
-            self.serial_connection.close()
+        self.renderer.cancel()
+        self.alerter.close()
+        if self.metrics_reporter:
+            self.metrics_reporter.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.scenario_window:
+            self.close_scenario_window()
+        if self.serial_link:
+            self.serial_link.stop()
+            self.serial_link.join(timeout=2)
+        if self.capture:
+            self.capture.close()
+        if self.history:
+            self.history.close()
         self.root.destroy()
 
 
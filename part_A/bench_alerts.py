@@ -0,0 +1,81 @@
+"""
+Alert Fan-out Benchmark
+=======================
+
+Drives the alert path (AlertDispatcher + HttpTransport) against the local
+fake Twilio server and reports end-to-end fan-out latency, i.e. the time from
+submitting an alert until each recipient's message was accepted.
+
+    python bench_alerts.py --recipients 1 10 100 1000 10000 --workers 64 --latency 0.02
+"""
+
+import argparse
+import statistics
+import time
+
+from alerts import AlertDispatcher, HttpTransport, SENT
+from fake_twilio import FakeTwilioServer
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_once(server, recipients, workers, backoff):
+    transport = HttpTransport(server.url, "ACbenchmark", "benchmark-token", "+15005550006")
+    dispatcher = AlertDispatcher(transport, workers=workers, backoff=backoff, max_backoff=backoff * 8)
+    numbers = [f"+1555{i:07d}" for i in range(recipients)]
+    try:
+        start = time.time()
+        delivery = dispatcher.submit("FLOOD WARNING!\nBenchmark alert", numbers)
+        delivery.wait()
+        total = time.time() - start
+    finally:
+        dispatcher.close()
+
+    results = delivery.results.values()
+    latencies = sorted(r.sent_at - delivery.created_at for r in results if r.status == SENT)
+    failed = sum(1 for r in results if r.status != SENT)
+    attempts = sum(r.attempts for r in results)
+    return total, latencies, failed, attempts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SMS alert fan-out latency")
+    parser.add_argument("--recipients", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--workers", type=int, default=32, help="Dispatcher worker threads")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per recipient count")
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake API latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Fake API random extra latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of HTTP 500 responses")
+    parser.add_argument("--backoff", type=float, default=0.1, help="First retry delay (s)")
+    args = parser.parse_args(argv)
+
+    server = FakeTwilioServer(latency=args.latency, jitter=args.jitter,
+                              error_rate=args.error_rate).start()
+    print(f"Fake Twilio API on {server.url} (latency {args.latency * 1000:.0f} ms "
+          f"+ up to {args.jitter * 1000:.0f} ms, error rate {args.error_rate:.1%}), "
+          f"{args.workers} workers")
+    print(f"{'recipients':>10} {'total s':>9} {'msg/s':>9} {'p50 ms':>9} {'p90 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9} {'failed':>7} {'attempts':>9}")
+
+    try:
+        for recipients in args.recipients:
+            for _ in range(args.runs):
+                total, latencies, failed, attempts = run_once(server, recipients, args.workers,
+                                                              args.backoff)
+                ms = [latency * 1000 for latency in latencies]
+                print(f"{recipients:>10} {total:>9.3f} {recipients / total:>9.0f} "
+                      f"{statistics.median(ms) if ms else float('nan'):>9.1f} "
+                      f"{percentile(ms, 90):>9.1f} {percentile(ms, 99):>9.1f} "
+                      f"{ms[-1] if ms else float('nan'):>9.1f} {failed:>7} {attempts:>9}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Serial Capture and Replay
+=========================
+
+Records every raw line received from the serial link to a compact,
+append-only capture file, and replays a capture through the monitoring
+engine (parse -> check_flood_status -> calculate) without hardware, either
+in real time, N times faster, or as fast as possible.
+
+Capture format (UTF-8 text, one record per line):
+
+    @<epoch milliseconds>          start of a capture session
+    <delta ms>\t<raw line>         received line, ms since the previous record
+
+A file may hold several sessions appended one after another.
+"""
+
+import threading
+import time
+
+
+class CaptureWriter:
+    """Buffered, append-only writer of raw serial lines"""
+
+    def __init__(self, path, buffer_size=64 * 1024, flush_interval=5.0):
+        self.path = path
+        self.flush_interval = flush_interval  # Max seconds a record may sit in the buffer
+        self.lines = 0
+        self._file = open(path, "ab", buffering=buffer_size)
+        self._lock = threading.Lock()
+        self._last_ms = None
+        self._last_flush = time.monotonic()
+
+    def write(self, line, timestamp=None):
+        """Append one raw line received at timestamp (epoch seconds)"""
+        now_ms = int((time.time() if timestamp is None else timestamp) * 1000)
+        with self._lock:
+            if self._last_ms is None:
+                self._file.write(f"@{now_ms}\n".encode())
+                self._last_ms = now_ms
+            delta = now_ms - self._last_ms
+            self._last_ms = now_ms
+            self._file.write(f"{delta}\t{line}\n".encode("utf-8", errors="replace"))
+            self.lines += 1
+
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._file.flush()
+                self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def read_capture(path):
+    """Yield (timestamp, raw line) records from a capture file, oldest first"""
+    current_ms = None
+    with open(path, "r", encoding="utf-8", errors="replace", newline="\n") as f:
+        for record in f:
+            record = record.rstrip("\n")
+            if record.startswith("@"):
+                try:
+                    current_ms = int(record[1:])
+                except ValueError:
+                    current_ms = None  # Deltas are meaningless until the next good base time
+                continue
+            delta, _, line = record.partition("\t")
+            if current_ms is None or not delta:
+                continue  # Truncated or foreign data
+            try:
+                current_ms += int(delta)
+            except (ValueError, IndexError):
+                continue  # Corrupted record
+            yield current_ms / 1000.0, line
+
+
+def replay(path, engine, speed=None):
+    """Feed a capture through the engine and return throughput statistics
+
+    speed=None (or 0) replays as fast as possible, 1.0 in real time and N
+    compresses the original timing N times. Samples keep their captured
+    timestamps, so alert cooldowns behave as they did during the incident.
+    """
+    samples = 0
+    parse_errors = 0
+    first_ts = None
+    start = time.perf_counter()
+
+    for timestamp, line in read_capture(path):
+        if speed:
+            if first_ts is None:
+                first_ts = timestamp
+            delay = (timestamp - first_ts) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            engine.feed_line(line, timestamp)
+            samples += 1
+        except ValueError:
+            parse_errors += 1
+
+    elapsed = time.perf_counter() - start
+    return {
+        "samples": samples,
+        "parse_errors": parse_errors,
+        "elapsed": elapsed,
+        "samples_per_second": samples / elapsed if elapsed > 0 else float('inf'),
+    }
@@ -0,0 +1,162 @@
+"""
+Fake Twilio - local stand-in for the Twilio Messages API
+========================================================
+
+Implements the part of the Twilio REST API that the alert path uses
+(POST /2010-04-01/Accounts/<AccountSid>/Messages.json) so alerting can be
+exercised and benchmarked without real credentials. Latency and error
+injection are configurable.
+
+    python fake_twilio.py --port 8088 --latency 0.05 --error-rate 0.01
+
+then point the monitor at it in config.env:
+
+    TWILIO_API_BASE_URL=http://127.0.0.1:8088
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+MESSAGES_PATH = re.compile(r"^/2010-04-01/Accounts/(?P<sid>[^/]+)/Messages\.json$")
+
+
+class FakeTwilioHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, code, message):
+        self._reply(status, {"code": code, "message": message, "status": status,
+                             "more_info": f"https://www.twilio.com/docs/errors/{code}"})
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+
+        match = MESSAGES_PATH.match(self.path)
+        if not match:
+            return self._error(404, 20404, "The requested resource was not found")
+        if not self.headers.get("Authorization", "").startswith("Basic "):
+            return self._error(401, 20003, "Authenticate")
+
+        to = form.get("To", [None])[0]
+        from_ = form.get("From", [None])[0]
+        body = form.get("Body", [None])[0]
+        if not to:
+            return self._error(400, 21604, "A 'To' phone number is required.")
+        if not from_:
+            return self._error(400, 21603, "A 'From' phone number is required.")
+        if not body:
+            return self._error(400, 21602, "Message body is required.")
+
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+
+        roll = random.random()
+        if roll < server.error_rate:
+            server.count("errors")
+            return self._error(500, 20500, "Internal Server Error")
+        if roll < server.error_rate + server.throttle_rate:
+            server.count("throttled")
+            return self._error(429, 20429, "Too Many Requests")
+
+        server.count("messages")
+        sid = "SM" + uuid.uuid4().hex
+        now = time.strftime("%a, %d %b %Y %H:%M:%S +0000", time.gmtime())
+        self._reply(201, {
+            "sid": sid,
+            "account_sid": match.group("sid"),
+            "to": to,
+            "from": from_,
+            "body": body,
+            "status": "queued",
+            "num_segments": "1",
+            "direction": "outbound-api",
+            "date_created": now,
+            "date_updated": now,
+            "uri": f"/2010-04-01/Accounts/{match.group('sid')}/Messages/{sid}.json",
+        })
+
+
+class FakeTwilioServer(ThreadingHTTPServer):
+    """Threaded fake Twilio API server; use start()/stop() to run it in the background"""
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 throttle_rate=0.0, verbose=False):
+        self.request_queue_size = 1024
+        super().__init__((host, port), FakeTwilioHandler)
+        self.latency = latency              # Fixed delay per request, in seconds
+        self.jitter = jitter                # Extra uniform random delay, in seconds
+        self.error_rate = error_rate        # Fraction of requests answered with HTTP 500
+        self.throttle_rate = throttle_rate  # Fraction of requests answered with HTTP 429
+        self.verbose = verbose
+        self.counters = {"messages": 0, "errors": 0, "throttled": 0}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="FakeTwilio", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Twilio Messages API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--latency", type=float, default=0.0, help="Fixed delay per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay per request (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of HTTP 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of HTTP 429 responses")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    server = FakeTwilioServer(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                              args.throttle_rate, args.verbose)
+    print(f"Fake Twilio API listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served: {server.counters}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Flood Status - severity levels and status classification
+========================================================
+
+Shared by the monitoring engine, the multi-station table and the alert
+state machine.
+"""
+
+
+# Severity levels shared by statuses, risks and alerts ("normal" < "warning" < "alert")
+LEVEL_NORMAL = "normal"
+LEVEL_WARNING = "warning"
+LEVEL_ALERT = "alert"
+
+# Flood status codes, in increasing severity, and their (text, level)
+STATUS_NORMAL, STATUS_HIGH_FLOW, STATUS_RISING, STATUS_WARNING, STATUS_SEVERE = range(5)
+STATUSES = (
+    ("Normal Conditions", LEVEL_NORMAL),
+    ("HIGH FLOW WARNING", LEVEL_WARNING),
+    ("RISING RIVER - FLOOD FORECAST", LEVEL_WARNING),
+    ("FLOOD WARNING", LEVEL_WARNING),
+    ("SEVERE FLOOD ALERT", LEVEL_ALERT),
+)
+
+
+def classify_status(river_height, flow_rate, normal_river_height, normal_flow_rate):
+    """Return the flood status code for a river height and flow rate"""
+    if river_height > normal_river_height:
+        if flow_rate > normal_flow_rate * 2:  # High flow rate
+            return STATUS_SEVERE
+        return STATUS_WARNING
+    elif flow_rate > normal_flow_rate * 2:
+        return STATUS_HIGH_FLOW
+    return STATUS_NORMAL
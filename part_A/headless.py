@@ -0,0 +1,244 @@
+"""
+Flood Monitoring System - Headless Runner
+=========================================
+
+Runs the flood monitoring engine for one station without a display, e.g. as
+one lightweight process per station on a server:
+
+    python headless.py --port /dev/ttyUSB0 --station "North Bridge"
+
+Without --port the ESP32 is discovered by USB VID:PID (--vid-pid) and an
+optional handshake line (--handshake). A lost port is reopened in the
+background with exponential backoff (--max-retries).
+
+or for many stations in a single process (see stations.example.json):
+
+    python headless.py --stations stations.json
+
+Raw serial lines can be recorded with --capture and later replayed through
+the same pipeline without hardware (SMS is never sent during a replay):
+
+    python headless.py --port /dev/ttyUSB0 --capture incident.cap
+    python headless.py --replay incident.cap --speed 10
+
+Hot-path metrics can be served to Prometheus and/or printed periodically:
+
+    python headless.py --port /dev/ttyUSB0 --metrics-port 9108 --metrics-interval 60
+
+Status changes, risk results and alerts are printed to stdout; alerts are also
+sent by SMS when Twilio is configured in config.env.
+"""
+
+import argparse
+import time
+
+from dotenv import load_dotenv
+
+from alerts import TwilioAlerter
+from capture import CaptureWriter, replay
+from metrics import MetricsReporter, MetricsServer, MonitorMetrics
+from monitor_engine import FloodMonitorEngine, StatusEvent, RiskEvent, AlertEvent, format_time
+from serial_link import SerialLink, parse_vid_pids, DEFAULT_VID_PIDS
+from serial_reader import SampleRingBuffer
+from stations import MultiStationMonitor, load_stations
+from timeseries import HistoryRecorder, TimeSeriesStore
+
+
+class ConsoleSubscriber:
+    """Print status transitions, risk changes and alerts"""
+
+    def __init__(self):
+        self.last_status = None
+        self.last_risk = None
+
+    def __call__(self, event):
+        if isinstance(event, StatusEvent):
+            if event.status != self.last_status:
+                forecast = ""
+                if event.eta_warning not in (None, 0, float('inf')):
+                    forecast = f", warning level in {format_time(event.eta_warning / 3600)}"
+                print(f"[{time.strftime('%H:%M:%S')}] {event.status} - "
+                      f"River Height: {event.river_height:.1f} cm, Flow Rate: {event.flow_rate:.2f} L/min"
+                      f"{forecast}")
+                self.last_status = event.status
+        elif isinstance(event, RiskEvent):
+            if event.risk != self.last_risk:
+                print(f"[{time.strftime('%H:%M:%S')}] {event.risk} - "
+                      f"Remaining Capacity: {event.remaining_capacity:.2f} m³, "
+                      f"Time to Fill: {format_time(event.time_to_fill)}")
+                self.last_risk = event.risk
+        elif isinstance(event, AlertEvent):
+            print(f"[{time.strftime('%H:%M:%S')}] {event.kind.upper()} ({event.level}): {event.message}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless flood monitor")
+    parser.add_argument("--stations", help="JSON station list; monitors every station in this process")
+    parser.add_argument("--port", help="Serial port of the ESP32 (default: discover it)")
+    parser.add_argument("--baud", type=int, default=115200, help="Baud rate (default: 115200)")
+    parser.add_argument("--vid-pid", type=parse_vid_pids, default=DEFAULT_VID_PIDS,
+                        help="USB VID:PID list to look for, e.g. 10C4:EA60,1A86:7523")
+    parser.add_argument("--handshake", help="Line prefix the ESP32 sends to identify itself")
+    parser.add_argument("--max-retries", type=int,
+                        help="Give up after N consecutive failed connection attempts (default: never)")
+    parser.add_argument("--station", default="River Monitoring Station", help="Station name used in alerts")
+    parser.add_argument("--sensor-max-height", type=float, default=20.0)
+    parser.add_argument("--normal-river-height", type=float, default=10.0)
+    parser.add_argument("--dam-capacity", type=float, default=50000.0)
+    parser.add_argument("--intensity", type=float, help="Rainfall intensity (mm/h) for continuous risk analysis")
+    parser.add_argument("--duration", type=float, default=1.0, help="Rainfall duration (hrs)")
+    parser.add_argument("--no-sms", action="store_true", help="Do not send SMS alerts")
+    parser.add_argument("--capture", help="Append raw serial lines to this file "
+                                          "(a directory in multi-station mode)")
+    parser.add_argument("--history", help="Record every reading into this time-series directory")
+    parser.add_argument("--replay", help="Replay a capture file instead of reading a serial port")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="Replay speed: 1 = real time, N = N times faster, 0 = max (default)")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--metrics-interval", type=float,
+                        help="Print a metrics summary every N seconds")
+    return parser
+
+
+def start_metrics(args):
+    """Return (MonitorMetrics, services to stop) if metrics were requested, else (None, [])"""
+    if not args.metrics_port and not args.metrics_interval:
+        return None, []
+    metrics = MonitorMetrics()
+    services = []
+    if args.metrics_port:
+        server = MetricsServer(metrics, port=args.metrics_port).start()
+        print(f"Metrics available at {server.url}")
+        services.append(server)
+    if args.metrics_interval:
+        reporter = MetricsReporter(metrics, args.metrics_interval)
+        reporter.start()
+        services.append(reporter)
+    return metrics, services
+
+
+def build_engine(args, alerter=None, history=None, metrics=None):
+    engine = FloodMonitorEngine(
+        station_name=args.station,
+        sensor_max_height=args.sensor_max_height,
+        normal_river_height=args.normal_river_height,
+        dam_capacity=args.dam_capacity,
+        metrics=metrics,
+    )
+    if args.intensity is not None:
+        engine.set_rainfall(args.intensity, args.duration)
+    engine.subscribe(ConsoleSubscriber())
+    if alerter:
+        engine.subscribe(alerter)
+    if history:
+        engine.subscribe(HistoryRecorder(history, args.station))
+    return engine
+
+
+def run_stations(args):
+    """Multi-station mode: one process, one serial link thread per port"""
+    history = TimeSeriesStore(args.history) if args.history else None
+    metrics, services = start_metrics(args)
+    monitor = MultiStationMonitor(load_stations(args.stations), capture_dir=args.capture,
+                                  history=history, metrics=metrics, max_retries=args.max_retries)
+    if args.intensity is not None:
+        monitor.set_rainfall(args.intensity, args.duration)
+
+    def print_event(station_name, event):
+        if isinstance(event, StatusEvent):
+            forecast = ""
+            if event.eta_warning not in (None, 0, float('inf')):
+                forecast = f", warning level in {format_time(event.eta_warning / 3600)}"
+            print(f"[{time.strftime('%H:%M:%S')}] [{station_name}] {event.status} - "
+                  f"River Height: {event.river_height:.1f} cm, Flow Rate: {event.flow_rate:.2f} L/min"
+                  f"{forecast}")
+        elif isinstance(event, RiskEvent):
+            print(f"[{time.strftime('%H:%M:%S')}] [{station_name}] {event.risk} - "
+                  f"Remaining Capacity: {event.remaining_capacity:.2f} m³, "
+                  f"Time to Fill: {format_time(event.time_to_fill)}")
+        elif isinstance(event, AlertEvent):
+            print(f"[{time.strftime('%H:%M:%S')}] [{station_name}] {event.kind.upper()} ({event.level}): {event.message}")
+
+    monitor.subscribe(print_event)
+    alerter = None
+    if not args.no_sms:
+        alerter = TwilioAlerter(metrics=metrics)
+        monitor.subscribe(lambda station_name, event: alerter(event))
+
+    try:
+        monitor.run()
+    except KeyboardInterrupt:
+        monitor.stop()
+    finally:
+        if alerter:
+            alerter.close()
+        for service in services:
+            service.stop()
+
+
+def run_replay(args):
+    """Feed a capture file through the engine and report throughput"""
+    history = TimeSeriesStore(args.history) if args.history else None
+    metrics, services = start_metrics(args)
+    engine = build_engine(args, history=history, metrics=metrics)
+    stats = replay(args.replay, engine, args.speed or None)
+    if history:
+        history.close()
+    print(f"Replayed {stats['samples']} samples ({stats['parse_errors']} parse errors) "
+          f"in {stats['elapsed']:.3f} s - {stats['samples_per_second']:.0f} samples/s")
+    if metrics:
+        print(metrics.summary())
+    for service in services:
+        service.stop()
+    return stats
+
+
+def main(argv=None):
+    load_dotenv('config.env')
+    args = build_parser().parse_args(argv)
+    if args.stations:
+        return run_stations(args)
+    if args.replay:
+        return run_replay(args)
+
+    metrics, services = start_metrics(args)
+    alerter = None if args.no_sms else TwilioAlerter(metrics=metrics)
+    history = TimeSeriesStore(args.history) if args.history else None
+    engine = build_engine(args, alerter, history, metrics)
+
+    buffer = SampleRingBuffer(capacity=4096)
+    if metrics:
+        metrics.watch_buffer(buffer)
+    capture = CaptureWriter(args.capture) if args.capture else None
+    link = SerialLink(buffer, port=args.port, baud=args.baud, vid_pids=args.vid_pid,
+                      handshake=args.handshake, max_retries=args.max_retries, echo=False,
+                      capture=capture, metrics=metrics)
+    link.start()
+
+    try:
+        # Runs until interrupted, or until the link gives up after --max-retries failures
+        while link.is_alive():
+            # Unlike the GUI, every sample goes through the engine
+            for sample in buffer.drain():
+                engine.feed(sample)
+            time.sleep(0.05)
+        # Samples read before the link gave up are still processed
+        for sample in buffer.drain():
+            engine.feed(sample)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        link.stop()
+        link.join(timeout=2)
+        if capture:
+            capture.close()
+        if history:
+            history.close()
+        if alerter:
+            alerter.close()
+        for service in services:
+            service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Monitor Metrics - low-overhead hot-path instrumentation
+=======================================================
+
+Counters and fixed-bucket latency histograms for each stage a reading goes
+through on its way from the serial port to an SMS:
+
+    serial line -> parse -> ring buffer -> status check -> risk calculation
+                                                        -> alert -> SMS send
+
+plus end-to-end latency from the moment a line arrived to its status event
+and to any alert it raised. Components take an optional `metrics` argument
+and skip all instrumentation when it is None.
+
+Timings use time.perf_counter(). The per-sample cost is a few list appends:
+histograms collect raw durations and bucket them in bulk (see Histogram).
+Nothing is locked; under heavy contention an occasional lost increment is an
+acceptable price for staying under 1 µs per sample.
+
+Metrics are exposed as Prometheus text on a local HTTP endpoint
+(MetricsServer, GET /metrics) and as a periodic printed summary
+(MetricsReporter).
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from alert_state import ALERT, ESCALATION, REMINDER, ALL_CLEAR
+
+
+# Histogram bucket upper bounds in seconds: 1 µs to ~67 s in powers of two, then +Inf
+BUCKET_BOUNDS = tuple(2.0 ** k * 1e-6 for k in range(27))
+_OVERFLOW = len(BUCKET_BOUNDS)
+
+# Raw observations kept before they are folded into the buckets
+FOLD_SIZE = 4096
+
+
+class Counter:
+    """Monotonically increasing count"""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Histogram:
+    """Latency distribution over the power-of-two BUCKET_BOUNDS
+
+    observe() only appends to a list; the raw values are bucketed in bulk with
+    numpy by fold(), which runs when FOLD_SIZE values are pending and before
+    every read.
+    """
+
+    __slots__ = ('counts', 'sum', 'pending')
+
+    def __init__(self):
+        self.counts = np.zeros(_OVERFLOW + 1, dtype=np.int64)
+        self.sum = 0.0
+        self.pending = []
+
+    def observe(self, seconds):
+        pending = self.pending
+        pending.append(seconds)
+        if len(pending) >= FOLD_SIZE:
+            self.fold()
+
+    def fold(self):
+        # Swap first: values appended by another thread meanwhile land in the new list
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+        values = np.array(pending)
+        # Bucket k counts [2**(k-1), 2**k) whole µs, i.e. the bit length of the µs value
+        _, buckets = np.frexp(np.floor(values * 1e6))
+        self.counts += np.bincount(np.clip(buckets, 0, _OVERFLOW), minlength=_OVERFLOW + 1)
+        self.sum += float(values.sum())
+
+    @property
+    def count(self):
+        self.fold()
+        return int(self.counts.sum())
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None if empty)"""
+        total = self.count
+        if not total:
+            return None
+        index = int(np.searchsorted(np.cumsum(self.counts), q * total))
+        return BUCKET_BOUNDS[index] if index < _OVERFLOW else float('inf')
+
+
+# (attribute, Prometheus name, help) of every metric MonitorMetrics exposes
+COUNTERS = (
+    ('lines', 'flood_serial_lines_total', 'Raw serial lines received'),
+    ('parse_errors', 'flood_parse_errors_total', 'Serial lines that could not be parsed'),
+    ('reconnects', 'flood_serial_reconnects_total', 'Serial port reconnections after a lost link'),
+    ('sms_sent', 'flood_sms_sent_total', 'SMS messages delivered to a recipient'),
+    ('sms_failed', 'flood_sms_failed_total', 'SMS messages given up on'),
+    ('sms_retries', 'flood_sms_retries_total', 'SMS send attempts scheduled for retry'),
+)
+HISTOGRAMS = (
+    ('parse_seconds', 'flood_parse_seconds', 'Decoding and parsing one serial line'),
+    ('status_seconds', 'flood_status_check_seconds', 'Trend update, status check and alert decision'),
+    ('risk_seconds', 'flood_risk_calculation_seconds', 'Flood risk calculation for one sample'),
+    ('render_seconds', 'flood_gui_render_seconds', 'Drawing one dashboard frame'),
+    ('sms_send_seconds', 'flood_sms_send_seconds', 'One SMS send attempt to one recipient'),
+    ('sample_to_status_seconds', 'flood_sample_to_status_seconds',
+     'From serial line arrival to its status event'),
+    ('sample_to_alert_seconds', 'flood_sample_to_alert_seconds',
+     'From serial line arrival to the alert it raised'),
+)
+ALERT_KINDS = (ALERT, ESCALATION, REMINDER, ALL_CLEAR)
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    if seconds == float('inf'):
+        return "inf"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.0f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds:.1f}s"
+
+
+class MonitorMetrics:
+    """All counters and histograms of one monitoring process"""
+
+    def __init__(self):
+        self.started = time.time()
+        for attribute, _, _ in COUNTERS:
+            setattr(self, attribute, Counter())
+        for attribute, _, _ in HISTOGRAMS:
+            setattr(self, attribute, Histogram())
+        self.alerts = {kind: Counter() for kind in ALERT_KINDS}
+        self._buffers = []  # SampleRingBuffers whose received/dropped/coalesced are reported
+
+    def sample_processed(self, received, start, checked, risk_start=None, risk_end=None):
+        """Record the stage timings of one processed sample (perf_counter() values)"""
+        pending = self.status_seconds.pending
+        pending.append(checked - start)
+        if received is not None:
+            self.sample_to_status_seconds.pending.append(checked - received)
+        if risk_start is not None:
+            self.risk_seconds.pending.append(risk_end - risk_start)
+        if len(pending) >= FOLD_SIZE:
+            self.fold()
+
+    def fold(self):
+        """Bucket every histogram's pending observations"""
+        for attribute, _, _ in HISTOGRAMS:
+            getattr(self, attribute).fold()
+
+    def watch_buffer(self, buffer):
+        """Report a SampleRingBuffer's received, dropped and coalesced counts"""
+        self._buffers.append(buffer)
+        return buffer
+
+    def buffer_totals(self):
+        return {
+            'received': sum(buffer.received for buffer in self._buffers),
+            'dropped': sum(buffer.dropped for buffer in self._buffers),
+            'coalesced': sum(buffer.coalesced for buffer in self._buffers),
+        }
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+
+        def counter(name, help_text, value, labels=""):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{labels} {value}")
+
+        for attribute, name, help_text in COUNTERS:
+            counter(name, help_text, getattr(self, attribute).value)
+        for key, value in self.buffer_totals().items():
+            counter(f"flood_samples_{key}_total", f"Samples {key} by the ring buffers", value)
+
+        lines.append("# HELP flood_alerts_total Alert decisions by kind")
+        lines.append("# TYPE flood_alerts_total counter")
+        for kind, alert_counter in self.alerts.items():
+            lines.append(f'flood_alerts_total{{kind="{kind}"}} {alert_counter.value}')
+
+        for attribute, name, help_text in HISTOGRAMS:
+            histogram = getattr(self, attribute)
+            histogram.fold()
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            counts = histogram.counts.tolist()
+            cumulative = 0
+            for bound, count in zip(BUCKET_BOUNDS, counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{le="{bound:.6g}"}} {cumulative}')
+            cumulative += counts[_OVERFLOW]
+            lines.append(f'{name}_bucket{{le="+Inf"}} {cumulative}')
+            lines.append(f"{name}_sum {histogram.sum:.9f}")
+            lines.append(f"{name}_count {cumulative}")
+
+        lines.append("# HELP flood_uptime_seconds Seconds since metrics collection started")
+        lines.append("# TYPE flood_uptime_seconds gauge")
+        lines.append(f"flood_uptime_seconds {time.time() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """One-line human readable summary: counts and p50/p99 of each non-empty stage"""
+        totals = self.buffer_totals()
+        parts = [f"{self.lines.value} lines", f"{self.parse_errors.value} parse errors",
+                 f"{totals['dropped']} dropped", f"{self.reconnects.value} reconnects",
+                 f"{sum(c.value for c in self.alerts.values())} alerts",
+                 f"{self.sms_sent.value} sms sent", f"{self.sms_failed.value} sms failed"]
+        for attribute, _, _ in HISTOGRAMS:
+            histogram = getattr(self, attribute)
+            if histogram.count:
+                parts.append(f"{attribute[:-len('_seconds')]} p50 {_format_seconds(histogram.quantile(0.5))}"
+                             f" p99 {_format_seconds(histogram.quantile(0.99))}")
+        return "Metrics: " + ", ".join(parts)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Local HTTP endpoint serving GET /metrics; use start()/stop() to run it in the background"""
+
+    daemon_threads = True
+
+    def __init__(self, metrics, host="127.0.0.1", port=9108):
+        super().__init__((host, port), MetricsHandler)
+        self.metrics = metrics
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class MetricsReporter(threading.Thread):
+    """Print metrics.summary() every `interval` seconds"""
+
+    def __init__(self, metrics, interval=60.0):
+        super().__init__(name="MetricsReporter", daemon=True)
+        self.metrics = metrics
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            print(self.metrics.summary())
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,333 @@
+"""
+Flood Monitoring Engine - GUI-free core of the Flood Monitoring System
+=====================================================================
+
+Holds the river state for one station and turns sensor samples into status,
+risk and alert events. It has no tkinter dependency so it can run headless
+on a server, be benchmarked on its own, or drive the desktop window, which
+is just one subscriber among several.
+"""
+
+import time
+from collections import namedtuple
+
+from alert_state import AlertStateMachine, ESCALATION, REMINDER, ALL_CLEAR
+from flood_status import (LEVEL_NORMAL, LEVEL_WARNING, LEVEL_ALERT, STATUS_RISING, STATUSES,
+                          classify_status)
+from serial_reader import parse_line
+from trend import TrendTracker
+
+
+# eta_warning / eta_severe: forecast seconds until the thresholds are crossed (None = no trend)
+StatusEvent = namedtuple('StatusEvent', ['timestamp', 'river_height', 'flow_rate', 'status', 'level',
+                                         'eta_warning', 'eta_severe'])
+StatusEvent.__new__.__defaults__ = (None, None)
+RiskEvent = namedtuple('RiskEvent', ['timestamp', 'intensity', 'duration', 'remaining_capacity',
+                                     'time_to_fill', 'risk', 'risk_level', 'time_level'])
+# kind: "alert", "escalation", "reminder" or "all_clear" (see alert_state.py)
+AlertEvent = namedtuple('AlertEvent', ['timestamp', 'level', 'message', 'kind'])
+AlertEvent.__new__.__defaults__ = ("alert",)
+
+# Flood risk classes, in increasing severity, and their (text, level)
+RISK_LOW, RISK_CAUTION, RISK_MODERATE, RISK_HIGH, RISK_CRITICAL = range(5)
+RISKS = (
+    ("LOW RISK - Normal Conditions", LEVEL_NORMAL),
+    ("CAUTION - Low Dam Capacity", LEVEL_WARNING),
+    ("MODERATE RISK - Flood Conditions", LEVEL_WARNING),
+    ("HIGH RISK - Flood Conditions with Low Capacity", LEVEL_ALERT),
+    ("CRITICAL - Dam Capacity Exceeded", LEVEL_ALERT),
+)
+
+# Fraction of dam capacity below which remaining capacity counts as low
+LOW_CAPACITY_FRACTION = 0.2
+
+
+def time_to_fill(remaining_capacity, intensity, flow_rate, area_km2=1.0):
+    """Hours until the remaining capacity is filled by the river flow (L/min) and rainfall (mm/h)"""
+    # Convert flow rate from L/min to m³/hour
+    flow_volume_per_hour = flow_rate * 60 / 1000  # L/min -> m³/hour
+
+    # Calculate rainfall volume per hour
+    rainfall_volume_per_hour = (intensity / 1000) * area_km2 * 1e6  # m³/hour
+
+    # Total inflow per hour
+    total_inflow_per_hour = flow_volume_per_hour + rainfall_volume_per_hour
+
+    if total_inflow_per_hour <= 0:
+        return float('inf')
+
+    # Calculate time to fill in hours
+    return remaining_capacity / total_inflow_per_hour
+
+
+def assess_risk(intensity, duration, river_height, flow_rate, normal_river_height, dam_capacity,
+                area_km2=1.0):
+    """Return (remaining capacity, time to fill, risk code, time level) for a rainfall scenario"""
+    # Calculate incoming water volume
+    incoming_volume = (intensity / 1000) * area_km2 * 1e6 * duration
+    remaining_capacity = dam_capacity - incoming_volume
+
+    # Calculate time to fill
+    hours = time_to_fill(remaining_capacity, intensity, flow_rate, area_km2)
+
+    # Risk analysis based on both sensor data and calculations
+    if remaining_capacity < 0:
+        return remaining_capacity, hours, RISK_CRITICAL, None
+
+    low_capacity = remaining_capacity < dam_capacity * LOW_CAPACITY_FRACTION
+    if river_height > normal_river_height:
+        code = RISK_HIGH if low_capacity else RISK_MODERATE
+    else:
+        code = RISK_CAUTION if low_capacity else RISK_LOW
+
+    if hours < 24:  # Less than 24 hours to fill
+        time_level = LEVEL_ALERT
+    elif hours < 72:  # Less than 3 days to fill
+        time_level = LEVEL_WARNING
+    else:
+        time_level = LEVEL_NORMAL
+    return remaining_capacity, hours, code, time_level
+
+
+def alert_message(status, river_height, flow_rate, station_name):
+    """SMS body for a flood alert"""
+    return (f"{status}!\n"
+            f"River Height: {river_height:.1f}cm\n"
+            f"Flow Rate: {flow_rate:.1f}L/min\n"
+            f"Location: {station_name}")
+
+
+def all_clear_message(river_height, flow_rate, station_name):
+    """SMS body closing an alert episode"""
+    return (f"ALL CLEAR\n"
+            f"River back below warning levels\n"
+            f"River Height: {river_height:.1f}cm\n"
+            f"Flow Rate: {flow_rate:.1f}L/min\n"
+            f"Location: {station_name}")
+
+
+def forecast_message(eta_seconds, river_height, slope_per_second, station_name):
+    """SMS body for a forecast that the warning level will be crossed"""
+    return (f"FLOOD FORECAST!\n"
+            f"River expected above warning level in {format_time(eta_seconds / 3600)}\n"
+            f"River Height: {river_height:.1f}cm, rising {slope_per_second * 60:.2f}cm/min\n"
+            f"Location: {station_name}")
+
+
+def decision_message(kind, code, river_height, flow_rate, station_name, trend=None):
+    """SMS body for an alert state machine decision (kind, status code)"""
+    if kind == ALL_CLEAR:
+        message = all_clear_message(river_height, flow_rate, station_name)
+    elif code == STATUS_RISING:
+        message = forecast_message(trend.eta_warning, river_height, trend.height_slope, station_name)
+    else:
+        message = alert_message(STATUSES[code][0], river_height, flow_rate, station_name)
+    if kind == ESCALATION:
+        message = f"ESCALATION: {message}"
+    elif kind == REMINDER:
+        message = f"REMINDER: {message}"
+    return message
+
+
+def format_time(hours):
+    """Format hours into a readable time string"""
+    if hours == float('inf'):
+        return "N/A (no inflow)"
+
+    if hours < 0:
+        return "Area Already Filled"
+
+    days = int(hours // 24)
+    remaining_hours = int(hours % 24)
+    minutes = int((hours * 60) % 60)
+
+    if days > 0:
+        return f"{days}d {remaining_hours}h {minutes}m"
+    elif remaining_hours > 0:
+        return f"{remaining_hours}h {minutes}m"
+    else:
+        return f"{minutes}m"
+
+
+class FloodMonitorEngine:
+    """Per-station flood monitor: feed samples in, receive events via subscribers"""
+
+    def __init__(self, station_name="River Monitoring Station", sensor_max_height=20.0,
+                 normal_river_height=10.0, normal_flow_rate=1.0, area_km2=1.0,
+                 dam_capacity=50000.0, alert_cooldown=1800, trend_window=120,
+                 forecast_horizon=1800, metrics=None):
+        self.station_name = station_name
+
+        # Constants
+        self.SENSOR_MAX_HEIGHT = sensor_max_height      # Distance from sensor to river bed in cm
+        self.NORMAL_RIVER_HEIGHT = normal_river_height  # Normal river height in cm
+        self.NORMAL_FLOW_RATE = normal_flow_rate        # Normal flow rate in L/min
+        self.AREA_KM2 = area_km2                        # Area in square kilometers
+        self.DAM_CAPACITY = dam_capacity                # Dam capacity in cubic meters
+        self.ALERT_COOLDOWN = alert_cooldown            # Seconds before repeating an alert level
+        self.FORECAST_HORIZON = forecast_horizon        # Forecast crossings this close raise RISING
+
+        # Data variables
+        self.sensor_height = 0.0  # Raw sensor reading
+        self.river_height = 0.0   # Actual river height
+        self.flow_rate = 0.0
+        self.last_sample_time = None
+
+        # Rainfall scenario used for the automatic risk calculation (None = not set)
+        self.intensity = None
+        self.duration = None
+
+        # Streaming rate-of-rise statistics (None disables forecasting)
+        self.trend = None
+        if trend_window:
+            self.trend = TrendTracker(normal_river_height, normal_flow_rate * 2, window=trend_window)
+
+        # Alert tracking: hysteresis, escalation and all-clear (see alert_state.py)
+        self.alert_state = AlertStateMachine(normal_river_height, normal_flow_rate,
+                                             cooldown=alert_cooldown,
+                                             forecast_horizon=forecast_horizon)
+
+        # Optional MonitorMetrics timing each stage of feed() (see metrics.py)
+        self.metrics = metrics
+        self._arrived = None  # Arrival time of the sample being processed, for alert latency
+
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """Register a callable that receives every emitted event"""
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def _emit(self, event):
+        for callback in self._subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error in engine subscriber {callback!r}: {e}")
+
+    def set_rainfall(self, intensity, duration):
+        """Set the rainfall scenario used on every sample, or raise ValueError"""
+        if duration <= 0 or intensity < 0:
+            raise ValueError("Duration must be positive and intensity must be non-negative")
+        self.intensity = intensity
+        self.duration = duration
+
+    def clear_rainfall(self):
+        self.intensity = None
+        self.duration = None
+
+    def feed_line(self, line, timestamp=None):
+        """Parse a raw serial line and process it; raises ValueError on bad input"""
+        metrics = self.metrics
+        if metrics is None:
+            return self.feed(parse_line(line, timestamp))
+
+        metrics.lines.inc()
+        start = time.perf_counter()
+        try:
+            sample = parse_line(line, timestamp)
+        except ValueError:
+            metrics.parse_errors.inc()
+            raise
+        metrics.parse_seconds.observe(time.perf_counter() - start)
+        return self.feed(sample)
+
+    def feed(self, sample):
+        """Process one Sample and emit the resulting status (and risk) events"""
+        metrics = self.metrics
+        if metrics is not None:
+            start = time.perf_counter()
+            self._arrived = sample.received
+
+        self.sensor_height = sample.sensor_height
+        self.flow_rate = sample.flow_rate
+        self.last_sample_time = sample.timestamp
+
+        # Calculate actual river height
+        self.river_height = self.SENSOR_MAX_HEIGHT - self.sensor_height
+
+        trend = self.trend
+        if trend is not None:
+            trend.update(sample.timestamp, self.river_height, self.flow_rate)
+
+        status, level = self.check_flood_status(sample.timestamp)
+        if trend is not None and trend.ready:
+            event = StatusEvent(sample.timestamp, self.river_height, self.flow_rate, status, level,
+                                trend.eta_warning, trend.eta_severe)
+        else:
+            event = StatusEvent(sample.timestamp, self.river_height, self.flow_rate, status, level)
+        if metrics is not None:
+            checked = time.perf_counter()
+        self._emit(event)
+
+        # Only auto-calculate if a valid rainfall scenario is set
+        if self.intensity is not None:
+            if metrics is None:
+                self.calculate(self.intensity, self.duration, sample.timestamp)
+            else:
+                risk_start = time.perf_counter()
+                self.calculate(self.intensity, self.duration, sample.timestamp)
+                metrics.sample_processed(sample.received, start, checked, risk_start,
+                                         time.perf_counter())
+        elif metrics is not None:
+            metrics.sample_processed(sample.received, start, checked)
+
+        return event
+
+    def raise_alert(self, code, kind, timestamp=None):
+        """Emit an AlertEvent for an alert state machine decision"""
+        current_time = time.time() if timestamp is None else timestamp
+        level = STATUSES[code][1]
+        message = decision_message(kind, code, self.river_height, self.flow_rate, self.station_name,
+                                   self.trend)
+
+        event = AlertEvent(current_time, level, message, kind)
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.alerts[kind].inc()
+            if self._arrived is not None:
+                metrics.sample_to_alert_seconds.observe(time.perf_counter() - self._arrived)
+        self._emit(event)
+        return event
+
+    def check_flood_status(self, timestamp=None):
+        """Determine flood status based on river height, flow rate and trend forecast"""
+        code = classify_status(self.river_height, self.flow_rate,
+                               self.NORMAL_RIVER_HEIGHT, self.NORMAL_FLOW_RATE)
+
+        # Forecast: warn ahead of time when the river is on course to cross the warning level
+        trend = self.trend
+        eta_warning = trend.eta_warning if trend is not None and trend.ready else None
+        if code < STATUS_RISING and eta_warning is not None and eta_warning <= self.FORECAST_HORIZON:
+            code = STATUS_RISING
+
+        # Outbound alerts go through the state machine, which smooths out noisy readings
+        decision = self.alert_state.update(time.time() if timestamp is None else timestamp,
+                                           self.river_height, self.flow_rate, eta_warning)
+        if decision is not None:
+            kind, alert_code = decision
+            self.raise_alert(alert_code, kind, timestamp)
+
+        return STATUSES[code]
+
+    def calculate_time_to_fill(self, remaining_capacity, intensity, flow_rate):
+        """Calculate time until area is filled based on flow rate and rainfall"""
+        return time_to_fill(remaining_capacity, intensity, flow_rate, self.AREA_KM2)
+
+    def calculate(self, intensity, duration, timestamp=None):
+        """Evaluate flood risk for a rainfall scenario and emit a RiskEvent"""
+        if duration <= 0 or intensity < 0:
+            raise ValueError("Duration must be positive and intensity must be non-negative")
+
+        remaining_capacity, time_to_fill_hours, code, time_level = assess_risk(
+            intensity, duration, self.river_height, self.flow_rate, self.NORMAL_RIVER_HEIGHT,
+            self.DAM_CAPACITY, self.AREA_KM2)
+        risk, risk_level = RISKS[code]
+
+        event = RiskEvent(time.time() if timestamp is None else timestamp, intensity, duration,
+                          remaining_capacity, time_to_fill_hours, risk, risk_level, time_level)
+        self._emit(event)
+        return event
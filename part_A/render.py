@@ -0,0 +1,66 @@
+"""
+Dashboard Rendering - coalesced, change-driven widget updates
+=============================================================
+
+Widgets are not configured directly on every sample. Instead the desired
+text/style of each widget is recorded, and at most `max_fps` times per
+second the renderer diffs it against what is already on screen and only
+calls .config() for the options that actually changed.
+"""
+
+import time
+
+
+class LabelRenderer:
+    """Diff-and-coalesce renderer for Tk widget text and style"""
+
+    def __init__(self, root, max_fps=10, metrics=None):
+        self.root = root
+        self.metrics = metrics  # Optional MonitorMetrics, times each frame
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.frames = 0       # Frames actually drawn
+        self.updates = 0      # Widget .config() calls made
+        self.skipped = 0      # Requested changes that matched what was on screen
+        self._pending = {}    # widget -> {option: value} requested since the last frame
+        self._rendered = {}   # widget -> {option: value} currently on screen
+        self._scheduled = None
+        self._last_frame = 0.0
+
+    def set(self, widget, **options):
+        """Request new option values (e.g. text=..., style=...) for a widget"""
+        pending = self._pending.get(widget)
+        if pending is None:
+            self._pending[widget] = options
+        else:
+            pending.update(options)
+
+        if self._scheduled is None:
+            delay = self._last_frame + self.min_interval - time.monotonic()
+            self._scheduled = self.root.after(max(0, int(delay * 1000)), self.flush)
+
+    def flush(self):
+        """Draw one frame: apply only the options that differ from the screen"""
+        self._scheduled = None
+        start = time.perf_counter()
+        self._last_frame = time.monotonic()
+        pending, self._pending = self._pending, {}
+
+        drew = False
+        for widget, options in pending.items():
+            rendered = self._rendered.setdefault(widget, {})
+            changed = {key: value for key, value in options.items() if rendered.get(key) != value}
+            self.skipped += len(options) - len(changed)
+            if changed:
+                widget.config(**changed)
+                rendered.update(changed)
+                self.updates += 1
+                drew = True
+        if drew:
+            self.frames += 1
+            if self.metrics is not None:
+                self.metrics.render_seconds.observe(time.perf_counter() - start)
+
+    def cancel(self):
+        if self._scheduled is not None:
+            self.root.after_cancel(self._scheduled)
+            self._scheduled = None
@@ -0,0 +1,108 @@
+"""
+Scenario Sweep - vectorized what-if flood analysis
+==================================================
+
+Evaluates the same model as FloodMonitorEngine.calculate() for a whole grid
+of rainfall intensities x durations x flow rates in one batched NumPy pass,
+so the full matrix can be recomputed on every sensor update.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from monitor_engine import (StatusEvent, RISK_LOW, RISK_CAUTION, RISK_MODERATE, RISK_HIGH,
+                            RISK_CRITICAL, LOW_CAPACITY_FRACTION)
+
+
+# Per-cell results are indexed [intensity, duration, flow_rate]
+ScenarioGrid = namedtuple('ScenarioGrid', ['intensities', 'durations', 'flow_rates',
+                                           'remaining_capacity', 'time_to_fill', 'risk'])
+
+
+def sweep_scenarios(intensities, durations, flow_rates, river_height, normal_river_height,
+                    dam_capacity, area_km2=1.0):
+    """Evaluate every (intensity, duration, flow rate) combination at once
+
+    intensities in mm/h, durations in hours, flow rates in L/min. Returns a
+    ScenarioGrid whose result arrays all have shape
+    (len(intensities), len(durations), len(flow_rates)). remaining_capacity and
+    risk do not depend on the flow rate and are read-only broadcast views.
+    """
+    intensities = np.asarray(intensities, dtype=np.float64)
+    durations = np.asarray(durations, dtype=np.float64)
+    flow_rates = np.asarray(flow_rates, dtype=np.float64)
+    if (durations <= 0).any() or (intensities < 0).any():
+        raise ValueError("Duration must be positive and intensity must be non-negative")
+
+    shape = (intensities.size, durations.size, flow_rates.size)
+
+    # Rainfall volume per hour in m³ (mm/h -> m/h over the catchment area)
+    rainfall_per_hour = intensities * (area_km2 * 1e3)
+
+    # Remaining capacity after the rain: [intensity, duration]
+    remaining = dam_capacity - np.multiply.outer(rainfall_per_hour, durations)
+
+    # Total inflow per hour (flow rate L/min -> m³/hour plus rainfall): [intensity, flow]
+    inflow = np.add.outer(rainfall_per_hour, flow_rates * 0.06)
+
+    # Time to fill in hours; no inflow means it never fills
+    time_to_fill = np.full(shape, np.inf)
+    np.divide(remaining[:, :, None], inflow[:, None, :], out=time_to_fill,
+              where=(inflow > 0)[:, None, :])
+
+    # Risk class per (intensity, duration), same rules as the scalar calculation
+    flooding = river_height > normal_river_height
+    low_capacity = remaining < dam_capacity * LOW_CAPACITY_FRACTION
+    risk = np.where(low_capacity,
+                    np.int8(RISK_HIGH if flooding else RISK_CAUTION),
+                    np.int8(RISK_MODERATE if flooding else RISK_LOW)).astype(np.int8)
+    risk[remaining < 0] = RISK_CRITICAL
+
+    return ScenarioGrid(intensities, durations, flow_rates,
+                        np.broadcast_to(remaining[:, :, None], shape),
+                        time_to_fill,
+                        np.broadcast_to(risk[:, :, None], shape))
+
+
+class ScenarioSweep:
+    """Engine subscriber that recomputes a scenario grid on every status update
+
+    If flow_rates is None the station's current flow rate is used, giving a
+    (intensities x durations x 1) grid. Subscribers receive each new ScenarioGrid.
+    """
+
+    def __init__(self, engine, intensities, durations, flow_rates=None):
+        self.engine = engine
+        self.intensities = np.asarray(intensities, dtype=np.float64)
+        self.durations = np.asarray(durations, dtype=np.float64)
+        self.flow_rates = None if flow_rates is None else np.asarray(flow_rates, dtype=np.float64)
+        self.grid = None
+        self._subscribers = []
+        engine.subscribe(self)
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def close(self):
+        """Stop following the engine"""
+        self.engine.unsubscribe(self)
+
+    def __call__(self, event):
+        if isinstance(event, StatusEvent):
+            self.update()
+
+    def update(self):
+        """Recompute the grid from the engine's current state and notify subscribers"""
+        engine = self.engine
+        flow_rates = self.flow_rates if self.flow_rates is not None else (engine.flow_rate,)
+        self.grid = sweep_scenarios(self.intensities, self.durations, flow_rates,
+                                    engine.river_height, engine.NORMAL_RIVER_HEIGHT,
+                                    engine.DAM_CAPACITY, engine.AREA_KM2)
+        for callback in self._subscribers:
+            callback(self.grid)
+        return self.grid
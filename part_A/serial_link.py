@@ -0,0 +1,208 @@
+"""
+Serial Link - port discovery and automatic reconnection
+=======================================================
+
+Keeps the ESP32 connected without blocking the GUI or processing loop.
+Everything happens on the link's own thread:
+
+- the port is either given explicitly or discovered: ports whose USB
+  VID:PID matches a known USB-serial bridge are probed first, and a port is
+  accepted once it sends the configured handshake line (or, without one,
+  any valid sensor line); ports used elsewhere (e.g. by the other links of
+  a multi-station monitor) can be excluded;
+- a lost connection is reopened with exponential backoff (with jitter) up
+  to `max_retries` consecutive failures, after which the link gives up;
+- the ring buffer outlives the connection, so samples already buffered are
+  still processed after a reconnect.
+
+State is exposed as plain attributes (state, port, failures, retry_at) for
+the GUI to poll; no dialogs are shown.
+"""
+
+import random
+import threading
+import time
+
+import serial
+from serial.tools import list_ports
+
+from serial_reader import SerialReader, parse_line
+
+
+# USB-serial bridges found on ESP32 boards: CP210x, CH340, CH9102, FTDI FT232
+DEFAULT_VID_PIDS = ((0x10C4, 0xEA60), (0x1A86, 0x7523), (0x1A86, 0x55D4), (0x0403, 0x6001))
+
+# Link states
+CONNECTING = "connecting"  # Opening or probing ports
+CONNECTED = "connected"
+WAITING = "waiting"        # Backing off before the next attempt
+FAILED = "failed"          # Gave up after max_retries consecutive failures
+STOPPED = "stopped"
+
+
+def parse_vid_pids(text):
+    """Parse "10C4:EA60,1A86:7523" into ((0x10C4, 0xEA60), (0x1A86, 0x7523)); raises ValueError"""
+    vid_pids = []
+    for entry in text.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        vid, sep, pid = entry.partition(":")
+        if not sep:
+            raise ValueError(f"Expected VID:PID in hex, got: {entry}")
+        vid_pids.append((int(vid, 16), int(pid, 16)))
+    return tuple(vid_pids)
+
+
+def candidate_ports(vid_pids=DEFAULT_VID_PIDS, exclude=()):
+    """Device names of the serial ports to probe, VID:PID matches first, skipping `exclude`"""
+    matching = []
+    others = []
+    for port in sorted(list_ports.comports(), key=lambda p: p.device):
+        if port.device in exclude:
+            continue
+        if port.vid is not None and (port.vid, port.pid) in vid_pids:
+            matching.append(port.device)
+        else:
+            others.append(port.device)
+    return matching + others
+
+
+class SerialLink(SerialReader):
+    """SerialReader that finds, opens and reopens its own port"""
+
+    def __init__(self, buffer, port=None, baud=115200, vid_pids=DEFAULT_VID_PIDS, handshake=None,
+                 backoff=1.0, max_backoff=60.0, max_retries=10, settle=2.0, probe_timeout=5.0,
+                 notify=None, name="SerialLink", echo=True, capture=None, metrics=None, exclude=None):
+        super().__init__(None, buffer, notify=notify, name=name, echo=echo, capture=capture,
+                         metrics=metrics)
+        self.requested_port = port        # None = discover
+        self.baud = baud
+        self.vid_pids = tuple(vid_pids)
+        self.handshake = handshake        # Line prefix identifying the ESP32 (None = any valid sample)
+        self.backoff = backoff            # Delay after the first failure, in seconds
+        self.max_backoff = max_backoff    # Upper bound on a single delay
+        self.max_retries = max_retries    # Consecutive failures before giving up (None = never)
+        self.settle = settle              # Seconds to wait after opening (the ESP32 resets on open)
+        self.probe_timeout = probe_timeout  # Seconds to wait for the handshake on a probed port
+        self.exclude = exclude            # Optional callable returning ports discovery must skip
+
+        self.state = CONNECTING
+        self.port = None        # Port of the current (or last) connection
+        self.failures = 0       # Consecutive failed attempts
+        self.connects = 0       # Successful connections so far
+        self.retry_at = None    # time.monotonic() of the next attempt while WAITING
+        self._wake = threading.Event()
+
+    def _open(self, port):
+        """Open a port and let the board settle; returns the connection or None"""
+        try:
+            connection = serial.Serial(port=port, baudrate=self.baud, timeout=1)
+        except (serial.SerialException, OSError) as e:
+            self.error = e
+            return None
+        if self._stop_event.wait(self.settle):
+            connection.close()
+            return None
+        connection.reset_input_buffer()
+        return connection
+
+    def _identify(self, connection):
+        """Wait for the handshake; returns the first data line to keep, "" or None if not ours"""
+        deadline = time.monotonic() + self.probe_timeout
+        while time.monotonic() < deadline and not self._stop_event.is_set():
+            try:
+                raw = connection.readline()
+            except (serial.SerialException, OSError) as e:
+                self.error = e
+                return None
+            line = raw.decode("utf-8", errors="replace").strip()
+            if not line:
+                continue
+            if self.handshake is not None:
+                if line.startswith(self.handshake):
+                    return ""
+                continue
+            try:
+                parse_line(line)
+            except ValueError:
+                continue
+            return line
+        return None
+
+    def _connect(self):
+        """Open the configured port, or probe candidates; returns (connection, first line)"""
+        self.error = None
+        if self.requested_port is not None:
+            ports = [self.requested_port]
+        else:
+            ports = candidate_ports(self.vid_pids, self.exclude() if self.exclude else ())
+
+        for port in ports:
+            if self._stop_event.is_set():
+                break
+            connection = self._open(port)
+            if connection is None:
+                continue
+            if self.requested_port is not None and self.handshake is None:
+                return connection, ""
+            first = self._identify(connection)
+            if first is not None:
+                return connection, first
+            connection.close()
+            self.error = serial.SerialException(f"No handshake from {port}")
+
+        if self.error is None:
+            self.error = serial.SerialException("No serial ports found")
+        return None, ""
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                self.state = CONNECTING
+                self.retry_at = None
+                connection, first = self._connect()
+                if connection is None:
+                    if self._stop_event.is_set():
+                        break
+                    self.failures += 1
+                    if self.max_retries is not None and self.failures > self.max_retries:
+                        self.state = FAILED
+                        print(f"{self.name}: giving up after {self.failures} failed attempts: {self.error}")
+                        return
+                    # Exponential backoff with jitter so several links do not retry in lockstep
+                    delay = min(self.max_backoff, self.backoff * 2 ** (self.failures - 1))
+                    delay = random.uniform(delay / 2, delay)
+                    self.state = WAITING
+                    self.retry_at = time.monotonic() + delay
+                    print(f"{self.name}: connection failed ({self.error}); retrying in {delay:.1f} s")
+                    self._wake.wait(delay)
+                    self._wake.clear()
+                    continue
+
+                self.port = connection.port
+                self.serial_connection = connection
+                self.failures = 0
+                self.connects += 1
+                self.error = None
+                if self.connects > 1 and self.metrics is not None:
+                    self.metrics.reconnects.inc()
+                self.state = CONNECTED
+                print(f"{self.name}: connected to ESP32 on {self.port}")
+                try:
+                    if first:
+                        self._handle_line(first)
+                    self._pump(connection)
+                finally:
+                    connection.close()
+        finally:
+            if self.state != FAILED:
+                self.state = STOPPED
+
+    def retry_now(self):
+        """Skip the remaining backoff delay"""
+        self._wake.set()
+
+    def stop(self):
+        super().stop()
+        self._wake.set()
@@ -0,0 +1,137 @@
+"""
+Serial Reader - Background acquisition for the Flood Monitoring System
+======================================================================
+
+Drains the ESP32 serial link on a dedicated thread so that the Tk main loop
+never blocks on (or falls behind) the sensor. Parsed samples are kept in a
+bounded ring buffer; consumers either take the newest sample or drain the
+whole backlog.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+
+import serial
+
+
+# One parsed reading from the ESP32: "<sensor_height>,<flow_rate>"
+# received: time.perf_counter() when the line arrived (None for replayed or injected data)
+Sample = namedtuple('Sample', ['timestamp', 'sensor_height', 'flow_rate', 'received'])
+Sample.__new__.__defaults__ = (None,)
+
+
+def parse_line(line, timestamp=None, received=None):
+    """Parse one raw serial line into a Sample, or raise ValueError"""
+    parts = line.split(",")
+    if len(parts) != 2:
+        raise ValueError(f"Unexpected data format. Expected 2 values, got: {len(parts)}")
+    sensor_height = float(parts[0])
+    flow_rate = float(parts[1])
+    return Sample(time.time() if timestamp is None else timestamp, sensor_height, flow_rate, received)
+
+
+class SampleRingBuffer:
+    """Thread-safe bounded buffer of samples, overwriting the oldest when full"""
+
+    def __init__(self, capacity=1024):
+        self._samples = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.capacity = capacity
+        self.received = 0   # Samples ever appended
+        self.dropped = 0    # Overwritten before anyone consumed them
+        self.coalesced = 0  # Skipped because a newer sample superseded them
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+    def append(self, sample):
+        with self._lock:
+            if len(self._samples) == self.capacity:
+                self.dropped += 1
+            self._samples.append(sample)
+            self.received += 1
+
+    def latest(self):
+        """Return the newest sample (or None) and discard the older backlog"""
+        with self._lock:
+            if not self._samples:
+                return None
+            sample = self._samples[-1]
+            self.coalesced += len(self._samples) - 1
+            self._samples.clear()
+            return sample
+
+    def drain(self):
+        """Return every buffered sample, oldest first, and empty the buffer"""
+        with self._lock:
+            samples = list(self._samples)
+            self._samples.clear()
+            return samples
+
+
+class SerialReader(threading.Thread):
+    """Continuously read and parse lines from an open serial connection"""
+
+    def __init__(self, serial_connection, buffer, notify=None, name="SerialReader", echo=True,
+                 capture=None, metrics=None):
+        super().__init__(name=name, daemon=True)
+        self.serial_connection = serial_connection
+        self.buffer = buffer
+        self.notify = notify  # Optional threading.Event set whenever a sample arrives
+        self.echo = echo      # Print every raw line (debugging a single station)
+        self.capture = capture  # Optional CaptureWriter recording every raw line
+        self.metrics = metrics  # Optional MonitorMetrics
+        self.parse_errors = 0
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        self._pump(self.serial_connection)
+
+    def _pump(self, connection):
+        """Read lines until stop() (returns True) or a serial error (stored in self.error)"""
+        while not self._stop_event.is_set():
+            try:
+                # Blocks for at most the port timeout, so stop() is honoured promptly
+                raw = connection.readline()
+            except (serial.SerialException, OSError) as e:
+                print(f"Error reading serial: {e}")
+                self.error = e
+                return False
+            if raw:
+                self._handle_line(raw.decode("utf-8", errors="replace").strip())
+        return True
+
+    def _handle_line(self, line):
+        """Capture, parse and buffer one received line"""
+        arrived = time.perf_counter()
+        received = time.time()
+        if self.echo:
+            print(f"Raw data received: {line}")  # Debug print
+        if not line:
+            return
+        if self.capture is not None:
+            self.capture.write(line, received)
+
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.lines.inc()
+        try:
+            sample = parse_line(line, received, arrived)
+        except ValueError as e:
+            self.parse_errors += 1
+            if metrics is not None:
+                metrics.parse_errors.inc()
+            print(f"Error parsing values: {e}")
+            return
+        if metrics is not None:
+            metrics.parse_seconds.observe(time.perf_counter() - arrived)
+        self.buffer.append(sample)
+
+        if self.notify is not None:
+            self.notify.set()
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,286 @@
+"""
+Multi-Station Monitoring - many serial ports in one process
+===========================================================
+
+Reads every configured station concurrently (one lightweight serial link thread
+per port, each reconnecting with its own backoff, all feeding a single
+processing loop) and keeps per-station state in a
+compact column-oriented table backed by `array` buffers instead of one engine
+object per station. Each station still gets the single-station behaviour:
+rate-of-rise forecasts (RISING), the alert state machine and, with a rainfall
+scenario set, the dam capacity risk assessment.
+
+A station without a "port" is discovered like the single-station link, skipping
+ports configured for or held by the other stations.
+
+Stations are described in a JSON file, see stations.example.json:
+
+    [{"name": "North Bridge", "port": "/dev/ttyUSB0", "baud": 115200,
+      "sensor_max_height": 20.0, "normal_river_height": 10.0, "dam_capacity": 50000.0}]
+"""
+
+import json
+import os
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+from capture import CaptureWriter
+from alert_state import AlertStateMachine
+from flood_status import STATUS_RISING
+from monitor_engine import (StatusEvent, RiskEvent, AlertEvent, STATUSES, RISKS, classify_status,
+                            decision_message, assess_risk)
+from serial_link import SerialLink, CONNECTED
+from serial_reader import SampleRingBuffer
+from trend import TrendTracker
+
+
+StationConfig = namedtuple('StationConfig', ['name', 'port', 'baud', 'sensor_max_height',
+                                             'normal_river_height', 'dam_capacity', 'normal_flow_rate',
+                                             'area_km2'])
+StationConfig.__new__.__defaults__ = (None, 115200, 20.0, 10.0, 50000.0, 1.0, 1.0)
+
+
+def load_stations(path):
+    """Read a list of StationConfig from a JSON file"""
+    with open(path) as f:
+        entries = json.load(f)
+    return [StationConfig(**entry) for entry in entries]
+
+
+class StationTable:
+    """Column-oriented per-station state; row i belongs to stations[i]"""
+
+    def __init__(self, stations):
+        self.names = [station.name for station in stations]
+        n = len(stations)
+
+        # Static configuration
+        self.sensor_max_height = array('d', (s.sensor_max_height for s in stations))
+        self.normal_river_height = array('d', (s.normal_river_height for s in stations))
+        self.normal_flow_rate = array('d', (s.normal_flow_rate for s in stations))
+        self.dam_capacity = array('d', (s.dam_capacity for s in stations))
+        self.area_km2 = array('d', (s.area_km2 for s in stations))
+
+        # Live state
+        self.river_height = array('d', bytes(8 * n))
+        self.flow_rate = array('d', bytes(8 * n))
+        self.last_update = array('d', bytes(8 * n))
+        self.status = array('b', [-1] * n)   # -1 = no sample yet
+        self.risk = array('b', [-1] * n)     # -1 = no rainfall scenario assessed yet
+        self.samples = array('Q', bytes(8 * n))
+
+    def __len__(self):
+        return len(self.names)
+
+    def update(self, i, sample, rising=False):
+        """Apply one sample to row i and return (previous status, new status)
+
+        rising: the trend forecast crosses the warning level soon, which raises
+        a status below STATUS_RISING to it.
+        """
+        river_height = self.sensor_max_height[i] - sample.sensor_height
+        code = classify_status(river_height, sample.flow_rate,
+                               self.normal_river_height[i], self.normal_flow_rate[i])
+        if rising and code < STATUS_RISING:
+            code = STATUS_RISING
+        self.river_height[i] = river_height
+        self.flow_rate[i] = sample.flow_rate
+        self.last_update[i] = sample.timestamp
+        self.samples[i] += 1
+        previous = self.status[i]
+        self.status[i] = code
+        return previous, code
+
+    def row(self, i):
+        """Return row i as a dict, e.g. for display or JSON output"""
+        code = self.status[i]
+        return {
+            'station': self.names[i],
+            'river_height': self.river_height[i],
+            'flow_rate': self.flow_rate[i],
+            'status': STATUSES[code][0] if code >= 0 else None,
+            'last_update': self.last_update[i],
+            'samples': self.samples[i],
+        }
+
+
+class MultiStationMonitor:
+    """Monitor many stations from one process; subscribers get (station_name, event)"""
+
+    def __init__(self, stations, alert_cooldown=1800, buffer_capacity=1024, capture_dir=None,
+                 history=None, metrics=None, max_retries=None, trend_window=120,
+                 forecast_horizon=1800):
+        self.stations = list(stations)
+        self.table = StationTable(self.stations)
+        self.ALERT_COOLDOWN = alert_cooldown
+        self.FORECAST_HORIZON = forecast_horizon  # Forecast crossings this close raise RISING
+        self.alert_states = [AlertStateMachine(s.normal_river_height, s.normal_flow_rate,
+                                               cooldown=alert_cooldown,
+                                               forecast_horizon=forecast_horizon)
+                             for s in self.stations]
+        # Streaming rate-of-rise statistics per station (None disables forecasting)
+        self.trends = [TrendTracker(s.normal_river_height, s.normal_flow_rate * 2, window=trend_window)
+                       if trend_window else None
+                       for s in self.stations]
+        # Rainfall scenario applied to every station's dam capacity (None = not set)
+        self.intensity = None
+        self.duration = None
+        self.buffers = [SampleRingBuffer(buffer_capacity) for _ in self.stations]
+        self.max_retries = max_retries  # Per-link consecutive failures before giving up (None = never)
+        self.links = [None] * len(self.stations)
+        # One capture file per station, "<capture_dir>/<station name>.cap"
+        self.captures = [None] * len(self.stations)
+        if capture_dir:
+            os.makedirs(capture_dir, exist_ok=True)
+            self.captures = [CaptureWriter(os.path.join(capture_dir, f"{station.name}.cap"))
+                             for station in self.stations]
+        self.history = history  # Optional TimeSeriesStore receiving every reading
+        self.metrics = metrics  # Optional MonitorMetrics
+        if metrics is not None:
+            for buffer in self.buffers:
+                metrics.watch_buffer(buffer)
+        self.data_ready = threading.Event()
+        self._stop_event = threading.Event()
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """Register a callable taking (station_name, event)"""
+        self._subscribers.append(callback)
+        return callback
+
+    def _emit(self, station_name, event):
+        for callback in self._subscribers:
+            try:
+                callback(station_name, event)
+            except Exception as e:
+                print(f"Error in station subscriber {callback!r}: {e}")
+
+    def set_rainfall(self, intensity, duration):
+        """Set the rainfall scenario assessed on every sample, or raise ValueError"""
+        if duration <= 0 or intensity < 0:
+            raise ValueError("Duration must be positive and intensity must be non-negative")
+        self.intensity = intensity
+        self.duration = duration
+        self.table.risk = array('b', [-1] * len(self.table))  # Report every station's new risk
+
+    def clear_rainfall(self):
+        self.intensity = None
+        self.duration = None
+
+    def claimed_ports(self, i):
+        """Ports station i must not probe: configured for or connected by other stations"""
+        claimed = set()
+        for j, (station, link) in enumerate(zip(self.stations, self.links)):
+            if j == i:
+                continue
+            if station.port is not None:
+                claimed.add(station.port)
+            elif link is not None and link.state == CONNECTED:
+                claimed.add(link.port)
+        return claimed
+
+    def connect(self, i):
+        """Start station i's serial link; it opens and reopens the port on its own thread"""
+        station = self.stations[i]
+        link = SerialLink(self.buffers[i], port=station.port, baud=station.baud,
+                          max_retries=self.max_retries, notify=self.data_ready,
+                          name=f"SerialLink-{station.name}", echo=False,
+                          capture=self.captures[i], metrics=self.metrics,
+                          exclude=lambda: self.claimed_ports(i))
+        link.start()
+        self.links[i] = link
+        return link
+
+    def process(self, i, sample):
+        """Apply one sample to station i and emit status changes and alerts"""
+        metrics = self.metrics
+        if metrics is not None:
+            start = time.perf_counter()
+        table = self.table
+        trend = self.trends[i]
+        eta_warning = None
+        if trend is not None:
+            trend.update(sample.timestamp, table.sensor_max_height[i] - sample.sensor_height,
+                         sample.flow_rate)
+            if trend.ready:
+                eta_warning = trend.eta_warning
+        previous, code = table.update(i, sample, eta_warning is not None and
+                                      eta_warning <= self.FORECAST_HORIZON)
+        status, level = STATUSES[code]
+        name = table.names[i]
+
+        decision = self.alert_states[i].update(sample.timestamp, table.river_height[i],
+                                               table.flow_rate[i], eta_warning)
+        if metrics is not None:
+            metrics.sample_processed(sample.received, start, time.perf_counter())
+
+        if self.history is not None:
+            self.history.append(name, sample.timestamp, table.river_height[i], table.flow_rate[i])
+
+        if code != previous:
+            if eta_warning is not None:
+                self._emit(name, StatusEvent(sample.timestamp, table.river_height[i],
+                                             table.flow_rate[i], status, level,
+                                             eta_warning, trend.eta_severe))
+            else:
+                self._emit(name, StatusEvent(sample.timestamp, table.river_height[i],
+                                             table.flow_rate[i], status, level))
+
+        # Dam capacity risk for the rainfall scenario, emitted when a station's risk class changes
+        if self.intensity is not None:
+            remaining_capacity, time_to_fill, risk_code, time_level = assess_risk(
+                self.intensity, self.duration, table.river_height[i], table.flow_rate[i],
+                table.normal_river_height[i], table.dam_capacity[i], table.area_km2[i])
+            if risk_code != table.risk[i]:
+                table.risk[i] = risk_code
+                risk, risk_level = RISKS[risk_code]
+                self._emit(name, RiskEvent(sample.timestamp, self.intensity, self.duration,
+                                           remaining_capacity, time_to_fill, risk, risk_level,
+                                           time_level))
+
+        if decision is not None:
+            kind, alert_code = decision
+            alert_level = STATUSES[alert_code][1]
+            message = decision_message(kind, alert_code, table.river_height[i], table.flow_rate[i], name,
+                                       trend)
+            if metrics is not None:
+                metrics.alerts[kind].inc()
+                if sample.received is not None:
+                    metrics.sample_to_alert_seconds.observe(time.perf_counter() - sample.received)
+            self._emit(name, AlertEvent(sample.timestamp, alert_level, message, kind))
+
+    def poll(self, timeout=0.5):
+        """Wait for data from any station, then process every buffered sample"""
+        self.data_ready.wait(timeout)
+        self.data_ready.clear()
+
+        processed = 0
+        for i, buffer in enumerate(self.buffers):
+            for sample in buffer.drain():
+                self.process(i, sample)
+                processed += 1
+        return processed
+
+    def run(self):
+        """Process samples until stop() is called"""
+        for i in range(len(self.stations)):
+            self.connect(i)
+        try:
+            while not self._stop_event.is_set():
+                self.poll()
+        finally:
+            for link in self.links:
+                link.stop()
+            for link in self.links:
+                link.join(timeout=2)
+            for capture in self.captures:
+                if capture is not None:
+                    capture.close()
+            if self.history is not None:
+                self.history.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.data_ready.set()
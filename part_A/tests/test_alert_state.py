@@ -0,0 +1,43 @@
+from alert_state import ALERT, ALL_CLEAR, ESCALATION, REMINDER, AlertStateMachine
+from flood_status import STATUS_RISING, STATUS_SEVERE, STATUS_WARNING
+
+
+def machine(**options):
+    return AlertStateMachine(normal_river_height=10.0, normal_flow_rate=1.0, **options)
+
+
+def test_quiet_readings_send_nothing():
+    state = machine()
+    assert all(state.update(t, 5.0, 1.0) is None for t in range(100))
+
+
+def test_hysteresis_suppresses_flapping():
+    state = machine(cooldown=1800)
+    assert state.update(0, 10.2, 1.0) == (ALERT, STATUS_WARNING)
+    # Noise around the threshold stays inside the 0.5 cm band: no new messages
+    for t in range(1, 100):
+        assert state.update(t, 10.2 if t % 2 else 9.8, 1.0) is None
+    assert state.state == STATUS_WARNING
+    # Falling past the band leaves the level
+    assert state.update(100, 9.4, 1.0) is None
+    assert state.state < STATUS_WARNING
+
+
+def test_escalation_ignores_cooldown_and_reminders_wait_for_it():
+    state = machine(cooldown=600)
+    assert state.update(0, 11.0, 1.0) == (ALERT, STATUS_WARNING)
+    assert state.update(10, 11.0, 3.0) == (ESCALATION, STATUS_SEVERE)
+    assert state.update(20, 11.0, 3.0) is None
+    assert state.update(610, 11.0, 3.0) == (REMINDER, STATUS_SEVERE)
+
+
+def test_forecast_enters_rising_and_all_clear_after_hold():
+    state = machine(forecast_horizon=1800, clear_hold=300)
+    assert state.update(0, 8.0, 1.0, eta_warning=900) == (ALERT, STATUS_RISING)
+    # Leaving RISING needs the forecast beyond horizon x 1.5
+    assert state.update(10, 8.0, 1.0, eta_warning=2000) is None
+    assert state.state == STATUS_RISING
+    assert state.update(20, 8.0, 1.0, eta_warning=None) is None
+    assert state.update(319, 8.0, 1.0) is None
+    assert state.update(320, 8.0, 1.0)[0] == ALL_CLEAR
+    assert state.update(400, 8.0, 1.0) is None
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from alerts import FAILED, SENT, AlertDispatcher, DeliveryError
+
+
+class FakeTransport:
+    """Fails the first `failures` sends to each number, then succeeds"""
+
+    def __init__(self, failures=0, retryable=True):
+        self.failures = failures
+        self.retryable = retryable
+        self.sends = {}
+        self.lock = threading.Lock()
+
+    def send(self, to, body):
+        with self.lock:
+            times = self.sends.setdefault(to, [])
+            times.append(time.monotonic())
+            attempt = len(times)
+        if attempt <= self.failures:
+            raise DeliveryError(f"attempt {attempt} refused", self.retryable, 503 if self.retryable else 400)
+        return f"SM{attempt}"
+
+
+def dispatcher(transport, **options):
+    options = dict(dict(workers=2, max_attempts=4, backoff=0.05, max_backoff=0.2), **options)
+    return AlertDispatcher(transport, **options)
+
+
+def test_transient_failures_are_retried_with_backoff():
+    transport = FakeTransport(failures=2)
+    alerts = dispatcher(transport)
+    delivery = alerts.submit("Flood alert", ["+100", "+200"])
+    assert delivery.wait(5)
+    alerts.close()
+    assert delivery.counts()[SENT] == 2
+    for to, times in transport.sends.items():
+        assert len(times) == 3 and delivery.results[to].attempts == 3 and delivery.results[to].sid == "SM3"
+        # Full jitter: each delay is between half and all of 0.05 s, then 0.1 s
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        assert 0.025 <= gaps[0] < 0.5 and 0.05 <= gaps[1] < 0.5
+
+
+def test_retries_stop_after_max_attempts():
+    transport = FakeTransport(failures=10)
+    alerts = dispatcher(transport, max_attempts=3)
+    delivery = alerts.submit("Flood alert", ["+100"])
+    assert delivery.wait(5)
+    alerts.close()
+    result = delivery.results["+100"]
+    assert result.status == FAILED and result.attempts == 3 and "attempt 3" in result.error
+
+
+def test_permanent_errors_are_not_retried():
+    transport = FakeTransport(failures=1, retryable=False)
+    alerts = dispatcher(transport)
+    delivery = alerts.submit("Flood alert", ["+100"])
+    assert delivery.wait(5)
+    alerts.close()
+    assert delivery.results["+100"].status == FAILED and len(transport.sends["+100"]) == 1
+
+
+def test_close_fails_queued_retries():
+    completed = []
+    transport = FakeTransport(failures=1)
+    alerts = dispatcher(transport, backoff=60, max_backoff=60, on_complete=completed.append)
+    delivery = alerts.submit("Flood alert", ["+100", "+200"])
+    deadline = time.monotonic() + 5
+    while len(alerts._retries) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    alerts.close()
+    assert delivery.wait(0)  # Nobody is left waiting on a retry that will never run
+    assert delivery.counts()[FAILED] == 2 and completed == [delivery]
+    assert all(len(times) == 1 for times in transport.sends.values())
+    alerts._scheduler.join(1)
+    assert not alerts._scheduler.is_alive()
@@ -0,0 +1,25 @@
+from capture import CaptureWriter, read_capture
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "capture.log"
+    writer = CaptureWriter(path)
+    writer.write("H:12.0,F:1.5", 1000.0)
+    writer.write("H:11.5,F:1.6", 1000.25)
+    writer.close()
+    assert list(read_capture(path)) == [(1000.0, "H:12.0,F:1.5"), (1000.25, "H:11.5,F:1.6")]
+
+
+def test_corrupted_records_are_skipped(tmp_path):
+    path = tmp_path / "capture.log"
+    path.write_text("@1000000\n"
+                    "0\tH:12.0,F:1.5\n"
+                    "1x\tgarbled delta\n"
+                    "250\tH:11.5,F:1.6\n"
+                    "@10OO\n"             # Corrupted session start: its records have no base time
+                    "5\tlost\n"
+                    "@2000000\n"
+                    "\x00\x00\n"          # Torn write
+                    "100\tH:11.0,F:1.7\n", encoding="utf-8")
+    assert list(read_capture(path)) == [(1000.0, "H:12.0,F:1.5"), (1000.25, "H:11.5,F:1.6"),
+                                        (2000.1, "H:11.0,F:1.7")]
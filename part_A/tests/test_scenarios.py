@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from monitor_engine import RISKS, FloodMonitorEngine
+from scenarios import sweep_scenarios
+
+
+@pytest.mark.parametrize('river_height', [5.0, 12.0])
+def test_sweep_matches_scalar_calculation(river_height):
+    intensities = [0.0, 0.5, 5.0, 40.0]
+    durations = [0.5, 1.0, 6.0]
+    flow_rates = [0.0, 1.0, 250.0]
+    engine = FloodMonitorEngine(normal_river_height=10.0, dam_capacity=50000.0, area_km2=2.0, trend_window=0)
+    grid = sweep_scenarios(intensities, durations, flow_rates, river_height, 10.0, 50000.0, area_km2=2.0)
+    assert grid.time_to_fill.shape == (4, 3, 3)
+
+    engine.river_height = river_height
+    for i, intensity in enumerate(intensities):
+        for d, duration in enumerate(durations):
+            for f, flow_rate in enumerate(flow_rates):
+                engine.flow_rate = flow_rate
+                event = engine.calculate(intensity, duration)
+                assert grid.remaining_capacity[i, d, f] == pytest.approx(event.remaining_capacity)
+                assert grid.time_to_fill[i, d, f] == pytest.approx(event.time_to_fill)
+                assert RISKS[grid.risk[i, d, f]][0] == event.risk
+
+
+def test_sweep_rejects_invalid_scenarios():
+    with pytest.raises(ValueError):
+        sweep_scenarios([1.0], [0.0], [1.0], 5.0, 10.0, 50000.0)
+    with pytest.raises(ValueError):
+        sweep_scenarios([-1.0], [1.0], [1.0], 5.0, 10.0, 50000.0)
+
+
+def test_no_inflow_never_fills():
+    grid = sweep_scenarios([0.0], [1.0], [0.0], 5.0, 10.0, 50000.0)
+    assert np.isinf(grid.time_to_fill[0, 0, 0])
@@ -0,0 +1,91 @@
+import serial
+
+import serial_link
+from serial_link import FAILED, STOPPED, SerialLink
+from serial_reader import SampleRingBuffer
+
+
+class FakePort:
+    """Connection that returns its lines, then loses the link (or stops it when `last`)"""
+
+    def __init__(self, port, lines, link, last):
+        self.port = port
+        self.lines = list(lines)
+        self.link = link
+        self.last = last
+
+    def reset_input_buffer(self):
+        pass
+
+    def readline(self):
+        if self.lines:
+            return self.lines.pop(0).encode() + b"\n"
+        if self.last:
+            self.link.stop()
+            return b""
+        raise serial.SerialException("device disconnected")
+
+    def close(self):
+        pass
+
+
+class RecordedWait:
+    """Stands in for the link's wake event: records each backoff instead of sleeping"""
+
+    def __init__(self):
+        self.delays = []
+
+    def wait(self, delay):
+        self.delays.append(delay)
+
+    def set(self):
+        pass
+
+    def clear(self):
+        pass
+
+
+def fake_link(monkeypatch, script, **options):
+    """SerialLink whose opens follow `script`: None fails, a list of lines connects"""
+    buffer = SampleRingBuffer()
+    link = SerialLink(buffer, port="/dev/ttyUSB0", settle=0, echo=False, **options)
+    link._wake = RecordedWait()
+    opens = iter(script)
+    connections = sum(lines is not None for lines in script)
+
+    def open_port(port, baudrate, timeout):
+        lines = next(opens)
+        if lines is None:
+            raise serial.SerialException(f"could not open port {port}")
+        nonlocal connections
+        connections -= 1
+        return FakePort(port, lines, link, last=connections == 0)
+
+    jitter = []
+
+    def upper_bound(low, high):
+        jitter.append((low, high))
+        return high
+
+    monkeypatch.setattr(serial_link.serial, "Serial", open_port)
+    monkeypatch.setattr(serial_link.random, "uniform", upper_bound)
+    return link, jitter
+
+
+def test_reconnects_with_backoff_and_resumes_delivery(monkeypatch):
+    link, jitter = fake_link(monkeypatch, [None, None, None, ["5.0,1.0", "6.0,1.5"], None, ["7.0,2.0"]],
+                             backoff=1.0, max_backoff=3.0)
+    link.run()
+    # Doubling from `backoff`, capped at max_backoff, and back to `backoff` after a good connection
+    assert link._wake.delays == [1.0, 2.0, 3.0, 1.0]
+    assert jitter == [(0.5, 1.0), (1.0, 2.0), (1.5, 3.0), (0.5, 1.0)]
+    assert [sample.sensor_height for sample in link.buffer.drain()] == [5.0, 6.0, 7.0]
+    assert link.connects == 2 and link.failures == 0 and link.state == STOPPED
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    link, _ = fake_link(monkeypatch, [None] * 3, backoff=0.5, max_retries=2)
+    link.run()
+    assert link.state == FAILED and link.failures == 3
+    assert link._wake.delays == [0.5, 1.0]
+    assert "could not open port" in str(link.error)
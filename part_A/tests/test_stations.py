@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import serial_link
+from serial_link import CONNECTED, WAITING, candidate_ports
+from serial_reader import Sample
+from stations import MultiStationMonitor, StationConfig
+
+
+def collect(monitor):
+    events = []
+    monitor.subscribe(lambda name, event: events.append((name, event)))
+    return events
+
+
+def test_rising_forecast_alert_per_station():
+    monitor = MultiStationMonitor([StationConfig('North', 'COM5'), StationConfig('Weir', 'COM6')])
+    events = collect(monitor)
+    for t in range(1500):
+        # North rises 0.003 cm/s from 5 cm towards the 10 cm warning level, Weir stays flat
+        monitor.process(0, Sample(1000.0 + t, 15.0 - 0.003 * t, 1.0))
+        monitor.process(1, Sample(1000.0 + t, 15.0, 1.0))
+
+    statuses = [event.status for name, event in events if name == 'North' and hasattr(event, 'status')]
+    assert statuses[:2] == ['Normal Conditions', 'RISING RIVER - FLOOD FORECAST']
+    rising = next(event for name, event in events if name == 'North' and hasattr(event, 'status')
+                  and event.status.startswith('RISING'))
+    assert 0 < rising.eta_warning <= monitor.FORECAST_HORIZON
+    alerts = [event.message for name, event in events if hasattr(event, 'kind')]
+    assert alerts[0].startswith('FLOOD FORECAST')
+    assert all(name == 'North' for name, event in events if hasattr(event, 'kind'))
+
+
+def test_rising_reminder_matches_single_station_message():
+    monitor = MultiStationMonitor([StationConfig('North', 'COM5')])
+    monitor.alert_states[0].cooldown = 60
+    events = collect(monitor)
+    for t in range(1500):
+        monitor.process(0, Sample(1000.0 + t, 15.0 - 0.003 * t, 1.0))
+    alerts = [event for name, event in events if hasattr(event, 'kind')]
+    assert alerts[0].kind == 'alert' and alerts[1].kind == 'reminder'
+    assert alerts[1].message.startswith('REMINDER: FLOOD FORECAST!')
+
+
+def test_rainfall_risk_uses_each_dam_capacity():
+    monitor = MultiStationMonitor([StationConfig('Small', 'COM5', dam_capacity=1000.0),
+                                   StationConfig('Large', 'COM6', dam_capacity=1e9)])
+    events = collect(monitor)
+    monitor.set_rainfall(10, 2)
+    for t in range(3):
+        monitor.process(0, Sample(1000.0 + t, 15.0, 1.0))
+        monitor.process(1, Sample(1000.0 + t, 15.0, 1.0))
+    risks = {name: event.risk for name, event in events if hasattr(event, 'risk')}
+    assert risks == {'Small': 'CRITICAL - Dam Capacity Exceeded', 'Large': 'LOW RISK - Normal Conditions'}
+    assert len([event for _, event in events if hasattr(event, 'risk')]) == 2  # Only changes
+
+
+def test_discovery_skips_ports_of_other_stations(monkeypatch):
+    monitor = MultiStationMonitor([StationConfig('Fixed', '/dev/ttyUSB0'), StationConfig('Found'),
+                                   StationConfig('Other')])
+    monitor.links = [None, SimpleNamespace(state=CONNECTED, port='/dev/ttyUSB1'),
+                     SimpleNamespace(state=WAITING, port='/dev/ttyUSB2')]
+    assert monitor.claimed_ports(2) == {'/dev/ttyUSB0', '/dev/ttyUSB1'}
+    assert monitor.claimed_ports(1) == {'/dev/ttyUSB0'}
+
+    ports = [SimpleNamespace(device=f'/dev/ttyUSB{n}', vid=0x10C4, pid=0xEA60) for n in range(4)]
+    monkeypatch.setattr(serial_link.list_ports, 'comports', lambda: ports)
+    assert candidate_ports(exclude=monitor.claimed_ports(2)) == ['/dev/ttyUSB2', '/dev/ttyUSB3']
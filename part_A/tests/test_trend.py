@@ -0,0 +1,46 @@
+import pytest
+
+from trend import INF, TrendTracker
+
+
+def feed_ramp(tracker, samples, slope, start=1000.0, height=5.0):
+    levels = []
+    for i in range(samples):
+        tracker.update(start + i, height + slope * i, 1.0)
+        levels.append(tracker.height_level)
+    return levels
+
+
+def test_linear_ramp_slope_and_level():
+    tracker = TrendTracker(warning_height=100, severe_flow=100, window=120)
+    feed_ramp(tracker, 300, 0.01)
+    assert tracker.height_slope == pytest.approx(0.01)
+    assert tracker.height_level == pytest.approx(5.0 + 0.01 * 299)
+    assert tracker.flow_slope == pytest.approx(0.0, abs=1e-12)
+
+
+def test_level_stays_continuous_through_rebase():
+    # The window is rebased every 8 * window samples; the level must not jump there
+    tracker = TrendTracker(warning_height=100, severe_flow=100, window=120)
+    levels = feed_ramp(tracker, 8 * 120 * 3 + 10, 0.01)
+    steps = [b - a for a, b in zip(levels[tracker.min_samples:], levels[tracker.min_samples + 1:])]
+    assert max(steps) == pytest.approx(0.01, abs=1e-6)
+    assert min(steps) == pytest.approx(0.01, abs=1e-6)
+    assert tracker.height_level == pytest.approx(5.0 + 0.01 * (len(levels) - 1), abs=1e-6)
+
+
+def test_eta_warning_forecast():
+    tracker = TrendTracker(warning_height=20.0, severe_flow=100, window=60)
+    feed_ramp(tracker, 1000, 0.01)
+    # Level 5 + 9.99 = 14.99, 5.01 cm to go at 0.01 cm/s
+    assert tracker.eta_warning == pytest.approx(501.0, rel=1e-6)
+
+
+def test_no_forecast_before_min_samples_or_when_falling():
+    tracker = TrendTracker(warning_height=20.0, severe_flow=100, window=60, min_samples=10)
+    feed_ramp(tracker, 5, 0.5)
+    assert not tracker.ready
+    assert tracker.eta_warning == INF
+    tracker.reset()
+    feed_ramp(tracker, 50, -0.01, height=10.0)
+    assert tracker.eta_warning == INF
@@ -0,0 +1,324 @@
+"""
+River Reading History - embedded time-series store
+==================================================
+
+Append-only, columnar storage of station readings with pre-computed
+1 minute and 1 hour rollups, so trend analysis and post-event reports can
+query months of history without scanning raw samples.
+
+Layout, one directory per station:
+
+    <root>/<station>/raw/<YYYYMMDD>.ts       float64 epoch seconds   } one segment
+    <root>/<station>/raw/<YYYYMMDD>.height   float32 river height cm } per UTC day,
+    <root>/<station>/raw/<YYYYMMDD>.flow     float32 flow rate L/min } one file per column
+    <root>/<station>/rollup_60.dat           1 minute buckets  (ROLLUP_DTYPE records)
+    <root>/<station>/rollup_3600.dat         1 hour buckets    (ROLLUP_DTYPE records)
+
+Writes are buffered in small fixed-size arrays and reads memory-map the
+files, so memory use in the monitoring process stays bounded no matter how
+much history accumulates.
+"""
+
+import argparse
+import os
+import time
+from array import array
+
+import numpy as np
+
+from monitor_engine import StatusEvent
+
+
+ROLLUP_RESOLUTIONS = (60, 3600)  # Seconds per rollup bucket
+
+ROLLUP_DTYPE = np.dtype([
+    ('start', '<f8'), ('count', '<u4'),
+    ('height_min', '<f4'), ('height_max', '<f4'), ('height_sum', '<f8'),
+    ('flow_min', '<f4'), ('flow_max', '<f4'), ('flow_sum', '<f8'),
+])
+
+RAW_COLUMNS = (('ts', '<f8', 'd'), ('height', '<f4', 'f'), ('flow', '<f4', 'f'))
+
+
+def _segment_name(timestamp):
+    return time.strftime("%Y%m%d", time.gmtime(timestamp))
+
+
+def _map(path, dtype):
+    """Read-only memory map of a column file (empty array if missing or empty)"""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return np.empty(0, dtype)
+    rows = size // np.dtype(dtype).itemsize
+    if not rows:
+        return np.empty(0, dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+
+
+class _Bucket:
+    """Running min/max/sum of one open rollup bucket"""
+
+    __slots__ = ('start', 'count', 'height_min', 'height_max', 'height_sum',
+                 'flow_min', 'flow_max', 'flow_sum')
+
+    def __init__(self, start):
+        self.start = start
+        self.count = 0
+        self.height_min = self.flow_min = float('inf')
+        self.height_max = self.flow_max = float('-inf')
+        self.height_sum = self.flow_sum = 0.0
+
+    def add(self, height, flow):
+        self.count += 1
+        if height < self.height_min:
+            self.height_min = height
+        if height > self.height_max:
+            self.height_max = height
+        self.height_sum += height
+        if flow < self.flow_min:
+            self.flow_min = flow
+        if flow > self.flow_max:
+            self.flow_max = flow
+        self.flow_sum += flow
+
+    def record(self):
+        return np.array([(self.start, self.count, self.height_min, self.height_max, self.height_sum,
+                          self.flow_min, self.flow_max, self.flow_sum)], dtype=ROLLUP_DTYPE)
+
+
+class StationSeries:
+    """History of one station: buffered appends, memory-mapped range queries"""
+
+    def __init__(self, path, flush_rows=4096, flush_interval=10.0):
+        self.path = path
+        self.raw_path = os.path.join(path, "raw")
+        os.makedirs(self.raw_path, exist_ok=True)
+        self.flush_rows = flush_rows          # Rows buffered before writing
+        self.flush_interval = flush_interval  # Max seconds rows stay buffered
+        self.out_of_order = 0                 # Samples older than the last one, skipped
+
+        self._segment = None
+        self._buffers = {name: array(code) for name, _, code in RAW_COLUMNS}
+        self._last_flush = time.monotonic()
+        self.last_timestamp = float('-inf')
+        self._buckets = {}
+        self._recover()
+
+    def _rollup_path(self, resolution):
+        return os.path.join(self.path, f"rollup_{resolution}.dat")
+
+    def _column_path(self, segment, column):
+        return os.path.join(self.raw_path, f"{segment}.{column}")
+
+    def segments(self):
+        """Names of the raw segments on disk, oldest first"""
+        return sorted({name.split('.')[0] for name in os.listdir(self.raw_path)})
+
+    def _recover(self):
+        """Repair a torn tail and rebuild the open rollup buckets after a restart"""
+        # Drop partial records left by a crash in the middle of a write
+        for resolution in ROLLUP_RESOLUTIONS:
+            path = self._rollup_path(resolution)
+            if os.path.exists(path):
+                os.truncate(path, os.path.getsize(path) // ROLLUP_DTYPE.itemsize * ROLLUP_DTYPE.itemsize)
+
+        segments = self.segments()
+        if not segments:
+            return
+        last = segments[-1]
+        columns = {name: _map(self._column_path(last, name), dtype) for name, dtype, _ in RAW_COLUMNS}
+        rows = min(len(column) for column in columns.values())
+        for name, dtype, _ in RAW_COLUMNS:
+            if len(columns[name]) != rows:
+                os.truncate(self._column_path(last, name), rows * np.dtype(dtype).itemsize)
+        if not rows:
+            return
+        self.last_timestamp = float(columns['ts'][rows - 1])
+
+        # Re-aggregate raw rows newer than the last closed bucket of each resolution.
+        # Buckets never span UTC days, so the latest segment holds all of them.
+        ts = np.asarray(columns['ts'][:rows])
+        for resolution in ROLLUP_RESOLUTIONS:
+            closed = _map(self._rollup_path(resolution), ROLLUP_DTYPE)
+            after = closed['start'][-1] + resolution if len(closed) else float('-inf')
+            first = int(np.searchsorted(ts, after, side='left'))
+            for i in range(first, rows):
+                self._add_to_bucket(resolution, float(ts[i]), float(columns['height'][i]),
+                                    float(columns['flow'][i]))
+        del columns
+
+    def _add_to_bucket(self, resolution, timestamp, height, flow):
+        start = timestamp - timestamp % resolution
+        bucket = self._buckets.get(resolution)
+        if bucket is None or bucket.start != start:
+            if bucket is not None:
+                with open(self._rollup_path(resolution), "ab") as f:
+                    f.write(bucket.record().tobytes())
+            bucket = self._buckets[resolution] = _Bucket(start)
+        bucket.add(height, flow)
+
+    def append(self, timestamp, river_height, flow_rate):
+        """Record one reading; returns False if it was older than the last one"""
+        if timestamp < self.last_timestamp:
+            self.out_of_order += 1
+            return False
+
+        segment = _segment_name(timestamp)
+        if segment != self._segment:
+            self.flush()
+            self._segment = segment
+
+        self.last_timestamp = timestamp
+        self._buffers['ts'].append(timestamp)
+        self._buffers['height'].append(river_height)
+        self._buffers['flow'].append(flow_rate)
+        for resolution in ROLLUP_RESOLUTIONS:
+            self._add_to_bucket(resolution, timestamp, river_height, flow_rate)
+
+        if (len(self._buffers['ts']) >= self.flush_rows or
+                time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+        return True
+
+    def flush(self):
+        """Write buffered raw rows to the current segment"""
+        self._last_flush = time.monotonic()
+        if not self._buffers['ts']:
+            return
+        for name, _, _ in RAW_COLUMNS:
+            buffer = self._buffers[name]
+            with open(self._column_path(self._segment, name), "ab") as f:
+                buffer.tofile(f)
+            del buffer[:]
+
+    def query_raw(self, start, end):
+        """Raw readings with start <= timestamp < end as numpy arrays"""
+        parts = {name: [] for name, _, _ in RAW_COLUMNS}
+        first, last = _segment_name(start), _segment_name(end)
+        for segment in self.segments():
+            if not first <= segment <= last:
+                continue
+            ts = _map(self._column_path(segment, 'ts'), '<f8')
+            lo, hi = np.searchsorted(ts, [start, end], side='left')
+            if lo == hi:
+                continue
+            parts['ts'].append(np.array(ts[lo:hi]))
+            for name, dtype, _ in RAW_COLUMNS[1:]:
+                parts[name].append(np.array(_map(self._column_path(segment, name), dtype)[lo:hi]))
+
+        # Rows still in the write buffer
+        if self._buffers['ts']:
+            ts = np.frombuffer(self._buffers['ts'], dtype='<f8')
+            lo, hi = np.searchsorted(ts, [start, end], side='left')
+            for name, dtype, _ in RAW_COLUMNS:
+                parts[name].append(np.frombuffer(self._buffers[name], dtype=dtype)[lo:hi].copy())
+
+        columns = {name: np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype)
+                   for name, dtype, _ in RAW_COLUMNS}
+        return {'timestamp': columns['ts'], 'river_height': columns['height'],
+                'flow_rate': columns['flow']}
+
+    def query_rollup(self, start, end, resolution=3600):
+        """Rollup buckets starting in [start, end) with min/max/mean per column"""
+        if resolution not in ROLLUP_RESOLUTIONS:
+            raise ValueError(f"Resolution must be one of {ROLLUP_RESOLUTIONS}")
+        records = _map(self._rollup_path(resolution), ROLLUP_DTYPE)
+        lo, hi = np.searchsorted(records['start'], [start, end], side='left')
+        records = np.array(records[lo:hi])
+
+        bucket = self._buckets.get(resolution)
+        if bucket is not None and start <= bucket.start < end:
+            records = np.concatenate([records, bucket.record()])
+
+        count = records['count'].astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {
+                'timestamp': records['start'],
+                'count': records['count'],
+                'height_min': records['height_min'],
+                'height_max': records['height_max'],
+                'height_mean': records['height_sum'] / count,
+                'flow_min': records['flow_min'],
+                'flow_max': records['flow_max'],
+                'flow_mean': records['flow_sum'] / count,
+            }
+
+    def query(self, start, end, resolution=None):
+        """Range query choosing raw, 1 min or 1 h data by span unless resolution is given"""
+        if resolution is None:
+            span = end - start
+            if span <= 6 * 3600:
+                resolution = 0
+            elif span <= 31 * 86400:
+                resolution = 60
+            else:
+                resolution = 3600
+        if resolution == 0:
+            return self.query_raw(start, end)
+        return self.query_rollup(start, end, resolution)
+
+
+class TimeSeriesStore:
+    """Directory of per-station histories"""
+
+    def __init__(self, root, **series_options):
+        self.root = root
+        self.series_options = series_options
+        self._series = {}
+        os.makedirs(root, exist_ok=True)
+
+    def series(self, station):
+        series = self._series.get(station)
+        if series is None:
+            # Keep station names usable as directory names
+            safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in station)
+            series = self._series[station] = StationSeries(os.path.join(self.root, safe),
+                                                           **self.series_options)
+        return series
+
+    def append(self, station, timestamp, river_height, flow_rate):
+        return self.series(station).append(timestamp, river_height, flow_rate)
+
+    def flush(self):
+        for series in self._series.values():
+            series.flush()
+
+    def close(self):
+        self.flush()
+
+
+class HistoryRecorder:
+    """Engine subscriber that records every StatusEvent into a TimeSeriesStore"""
+
+    def __init__(self, store, station):
+        self.store = store
+        self.station = station
+
+    def __call__(self, event):
+        if isinstance(event, StatusEvent):
+            self.store.append(self.station, event.timestamp, event.river_height, event.flow_rate)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a station's recorded river history")
+    parser.add_argument("root", help="History directory (HISTORY_DIR)")
+    parser.add_argument("station", help="Station name")
+    parser.add_argument("--hours", type=float, default=24, help="Report the last N hours (default 24)")
+    parser.add_argument("--resolution", type=int, choices=ROLLUP_RESOLUTIONS, default=3600)
+    args = parser.parse_args(argv)
+
+    series = TimeSeriesStore(args.root).series(args.station)
+    end = time.time()
+    rows = series.query_rollup(end - args.hours * 3600, end, args.resolution)
+    print(f"{'bucket start':<20} {'samples':>8} {'height min/mean/max (cm)':>26} "
+          f"{'flow min/mean/max (L/min)':>27}")
+    for i in range(len(rows['timestamp'])):
+        print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(rows['timestamp'][i])):<20} "
+              f"{rows['count'][i]:>8} "
+              f"{rows['height_min'][i]:>8.1f} {rows['height_mean'][i]:>8.1f} {rows['height_max'][i]:>8.1f} "
+              f"{rows['flow_min'][i]:>8.2f} {rows['flow_mean'][i]:>8.2f} {rows['flow_max'][i]:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
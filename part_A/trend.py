@@ -0,0 +1,163 @@
+"""
+Trend Detection - streaming rate-of-rise and time-to-threshold forecasts
+========================================================================
+
+Keeps O(1)-per-sample rolling statistics of river height and flow rate:
+an EWMA, and a least-squares slope and variance over a fixed window of the
+most recent samples (running sums over preallocated ring buffers, so
+nothing grows or is allocated per sample). From the fitted trend it
+forecasts how long until the warning (height above normal) and severe
+(height above normal and flow above twice normal) thresholds are crossed.
+"""
+
+from array import array
+
+INF = float('inf')
+
+
+def _eta(level, slope, threshold):
+    """Seconds until a linear trend reaches threshold (0 if already there)"""
+    if level >= threshold:
+        return 0.0
+    if slope > 0:
+        return (threshold - level) / slope
+    return INF
+
+
+class TrendTracker:
+    """Rolling EWMA, windowed regression slope and variance of height and flow"""
+
+    __slots__ = ('window', 'alpha', 'min_samples', 'warning_height', 'severe_flow',
+                 '_t', '_h', '_f', '_i', '_n', '_t0', '_updates',
+                 '_st', '_stt', '_sh', '_shh', '_sth', '_sf', '_sff', '_stf',
+                 'height_ewma', 'flow_ewma', 'height_slope', 'flow_slope',
+                 'height_var', 'flow_var', 'height_level', 'flow_level',
+                 'eta_warning', 'eta_severe')
+
+    def __init__(self, warning_height, severe_flow, window=120, alpha=0.1, min_samples=10):
+        self.window = window            # Samples in the regression window
+        self.alpha = alpha              # EWMA smoothing factor
+        self.min_samples = min_samples  # Samples needed before forecasting
+        self.warning_height = warning_height
+        self.severe_flow = severe_flow
+
+        # Ring buffers of (time since _t0, height, flow)
+        self._t = array('d', bytes(8 * window))
+        self._h = array('d', bytes(8 * window))
+        self._f = array('d', bytes(8 * window))
+        self.reset()
+
+    def reset(self):
+        self._i = 0
+        self._n = 0
+        self._t0 = None
+        self._updates = 0
+        self._st = self._stt = self._sh = self._shh = self._sth = 0.0
+        self._sf = self._sff = self._stf = 0.0
+        self.height_ewma = self.flow_ewma = None
+        self.height_slope = self.flow_slope = 0.0   # Units per second
+        self.height_var = self.flow_var = 0.0
+        self.height_level = self.flow_level = None  # Trend line value at the newest sample
+        self.eta_warning = self.eta_severe = INF    # Seconds until threshold crossing
+
+    @property
+    def ready(self):
+        return self._n >= self.min_samples
+
+    def update(self, timestamp, height, flow):
+        """Add one sample and refresh all statistics and forecasts"""
+        if self._t0 is None:
+            self._t0 = timestamp
+            self.height_ewma = height
+            self.flow_ewma = flow
+        else:
+            self.height_ewma += self.alpha * (height - self.height_ewma)
+            self.flow_ewma += self.alpha * (flow - self.flow_ewma)
+
+        x = timestamp - self._t0
+        i = self._i
+        if self._n == self.window:
+            # Slide the window: remove the oldest sample's contribution
+            ox, oh, of = self._t[i], self._h[i], self._f[i]
+            self._st -= ox
+            self._stt -= ox * ox
+            self._sh -= oh
+            self._shh -= oh * oh
+            self._sth -= ox * oh
+            self._sf -= of
+            self._sff -= of * of
+            self._stf -= ox * of
+        else:
+            self._n += 1
+
+        self._t[i] = x
+        self._h[i] = height
+        self._f[i] = flow
+        self._st += x
+        self._stt += x * x
+        self._sh += height
+        self._shh += height * height
+        self._sth += x * height
+        self._sf += flow
+        self._sff += flow * flow
+        self._stf += x * flow
+        self._i = (i + 1) % self.window
+
+        # Running sums drift as values are added and removed; rebuild them now
+        # and then (amortized O(1)) relative to the oldest sample in the window
+        self._updates += 1
+        if self._updates >= 8 * self.window:
+            x -= self._rebase()
+
+        self._refresh(x)
+
+    def _rebase(self):
+        """Rebuild the sums with times relative to the oldest sample; returns the shift"""
+        n = self._n
+        start = (self._i - n) % self.window
+        shift = self._t[start]
+        self._t0 += shift
+        self._st = self._stt = self._sh = self._shh = self._sth = 0.0
+        self._sf = self._sff = self._stf = 0.0
+        for k in range(n):
+            j = (start + k) % self.window
+            x = self._t[j] - shift
+            self._t[j] = x
+            h = self._h[j]
+            f = self._f[j]
+            self._st += x
+            self._stt += x * x
+            self._sh += h
+            self._shh += h * h
+            self._sth += x * h
+            self._sf += f
+            self._sff += f * f
+            self._stf += x * f
+        self._updates = 0
+        return shift
+
+    def _refresh(self, x):
+        n = self._n
+        mean_t = self._st / n
+        mean_h = self._sh / n
+        mean_f = self._sf / n
+        self.height_var = max(0.0, self._shh / n - mean_h * mean_h)
+        self.flow_var = max(0.0, self._sff / n - mean_f * mean_f)
+
+        denom = n * self._stt - self._st * self._st
+        if n < 2 or denom <= 0:
+            self.height_slope = self.flow_slope = 0.0
+            self.height_level = self.height_ewma
+            self.flow_level = self.flow_ewma
+        else:
+            self.height_slope = (n * self._sth - self._st * self._sh) / denom
+            self.flow_slope = (n * self._stf - self._st * self._sf) / denom
+            self.height_level = mean_h + self.height_slope * (x - mean_t)
+            self.flow_level = mean_f + self.flow_slope * (x - mean_t)
+
+        if n < self.min_samples:
+            self.eta_warning = self.eta_severe = INF
+            return
+        self.eta_warning = _eta(self.height_level, self.height_slope, self.warning_height)
+        eta_flow = _eta(self.flow_level, self.flow_slope, self.severe_flow)
+        self.eta_severe = self.eta_warning if self.eta_warning > eta_flow else eta_flow
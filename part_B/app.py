@@ -1,20 +1,34 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
-from datetime import datetime
+from flask import (Blueprint, Flask, Response, current_app, render_template, request, redirect, url_for, flash,
+                   session, jsonify, make_response, stream_with_context)
+from datetime import datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import or_, tuple_
 from werkzeug.security import generate_password_hash, check_password_hash
 import threading
+import atexit
+import csv
+import difflib
+import gzip
+import hashlib
+import heapq
+import io
+import re
 import os
-from functools import wraps
+import hmac
+import json
+import math
+import time
+from collections import deque, OrderedDict
+from functools import lru_cache, wraps
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-here'  # Required for sessions and flash messages
+# Importing this module has no side effects: create_app() builds the application and the
+# database is opened, migrated and loaded on the first request (or by `flask --app app init-db`).
+# The submission journal, admin page cache, live feed and triage queue live in this process,
+# so the application is served by a single worker process (with as many threads as needed).
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Ensure the database is created in the correct location
-db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'disaster_management.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db = SQLAlchemy(app)
+db = SQLAlchemy()
+bp = Blueprint('main', __name__)
 
 # Database Models
 class User(db.Model):
@@ -39,18 +53,162 @@ class Report(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     solved = db.Column(db.Boolean, default=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Parsed from `coordinates` (NULL for legacy rows that do not parse); `cell` is the grid cell
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    cell = db.Column(db.Integer)
+    # Near-duplicate detection (see store_reports): hash of the normalized phone, rounded location
+    # and time bucket, and the number of re-submissions merged into this report
+    dedup_key = db.Column(db.String(16))
+    duplicates = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Keyset pagination of the admin view, newest first, with and without the status filter,
+    # and the spatial grid index
+    __table_args__ = (
+        db.Index('ix_report_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_report_solved_timestamp_id', 'solved', 'timestamp', 'id'),
+        db.Index('ix_report_cell', 'cell'),
+        db.Index('ix_report_dedup_key', 'dedup_key'),
+    )
 
     @property
     def maps_url(self):
         return f"https://www.google.com/maps?q={self.coordinates}"
 
-# Admin credentials
-ADMIN_USERNAME = "admin"
-ADMIN_PASSWORD = "admin123"
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'phone': self.phone,
+            'coordinates': self.coordinates,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'description': self.description,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'solved': bool(self.solved),
+            'duplicates': self.duplicates or 0,
+        }
+
+class Reading(db.Model):
+    # River readings uploaded by the part_A flood monitors
+    id = db.Column(db.Integer, primary_key=True)
+    station = db.Column(db.String(100), nullable=False)
+    timestamp = db.Column(db.Float, nullable=False)  # Unix epoch seconds, as sent by the monitors
+    river_height = db.Column(db.Float, nullable=False)  # cm
+    flow_rate = db.Column(db.Float, nullable=False)  # L/min
+
+    __table_args__ = (db.Index('ix_reading_station_timestamp', 'station', 'timestamp'),)
+
+class AppliedSubmission(db.Model):
+    # Journaled report submissions committed to the database (as a report or merged into one as
+    # a repeat), recorded in the same transaction, so a journal segment replayed after a crash
+    # between a batch's commit and the removal of its segment does not apply them twice. Rows
+    # are dropped once their segment is gone.
+    __tablename__ = 'applied_submission'
+    id = db.Column(db.String(32), primary_key=True)
+
+# Spatial index: the globe is cut into GRID_DEG x GRID_DEG degree cells (about 1.1 km at the
+# equator), numbered row by row from (-90, -180). A bounding box maps to one contiguous range
+# of cell numbers per grid row, each an index range scan on Report.cell.
+GRID_DEG = 0.01
+GRID_COLUMNS = int(round(360 / GRID_DEG))
+GRID_ROWS = int(round(180 / GRID_DEG))
+MAX_GRID_ROWS = 200  # Bounding boxes taller than this many rows filter on latitude/longitude instead
+EARTH_RADIUS_KM = 6371.0
+
+def grid_row(latitude):
+    return min(int((latitude + 90) / GRID_DEG), GRID_ROWS - 1)
+
+def grid_column(longitude):
+    return min(int((longitude + 180) / GRID_DEG), GRID_COLUMNS - 1)
+
+def grid_cell(latitude, longitude):
+    return grid_row(latitude) * GRID_COLUMNS + grid_column(longitude)
 
-# Create tables
-with app.app_context():
+def parse_coordinates(coordinates):
+    # "lat,long" -> (lat, long) floats, or None if malformed or out of range
+    coords = coordinates.replace(' ', '').strip()
+    try:
+        lat, long = map(float, coords.split(','))
+    except ValueError:
+        return None
+    if -90 <= lat <= 90 and -180 <= long <= 180:
+        return lat, long
+    return None
+
+def distance_km(lat1, lon1, lat2, lon2):
+    # Great-circle (haversine) distance
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+class SchemaVersion(db.Model):
+    # Single row: number of MIGRATIONS applied to this database
+    __tablename__ = 'schema_version'
+    version = db.Column(db.Integer, primary_key=True)
+
+def add_columns(connection, table, columns):
+    # ALTER TABLE ADD COLUMN for the (name, SQL type) pairs the table does not have yet
+    existing = {column['name'] for column in db.inspect(connection).get_columns(table)}
+    for name, sql_type in columns:
+        if name not in existing:
+            connection.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {name} {sql_type}')
+
+def migrate_report_location(connection):
+    add_columns(connection, 'report', (('latitude', 'FLOAT'), ('longitude', 'FLOAT'), ('cell', 'INTEGER')))
+    # Fill in the numeric location of reports filed before it was stored
+    rows = connection.execute(db.select(Report.id, Report.coordinates).where(Report.latitude.is_(None))).all()
+    updates = []
+    for report_id, coordinates in rows:
+        location = parse_coordinates(coordinates or '')
+        if location:
+            updates.append({'report_id': report_id, 'lat': location[0], 'lon': location[1],
+                            'grid_cell': grid_cell(*location)})
+    if updates:
+        connection.execute(db.update(Report).where(Report.id == db.bindparam('report_id'))
+                           .values(latitude=db.bindparam('lat'), longitude=db.bindparam('lon'),
+                                   cell=db.bindparam('grid_cell')), updates)
+
+def migrate_report_duplicates(connection):
+    add_columns(connection, 'report', (('dedup_key', 'VARCHAR(16)'), ('duplicates', 'INTEGER NOT NULL DEFAULT 0')))
+
+def migrate_indexes(connection):
+    for table in (Report.__table__, Reading.__table__):
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+# Forward migrations, applied in order; the schema version is the number applied. Append new
+# ones at the end and never reorder or remove them. They tolerate the changes they make being
+# present already: databases from before schema versioning start at version 0.
+MIGRATIONS = (
+    migrate_report_location,
+    migrate_report_duplicates,
+    migrate_indexes,
+)
+
+def migrate_database():
+    # New databases get the current schema from create_all() and the latest version; existing
+    # ones get their missing tables from create_all() and then every pending migration
+    fresh = not db.inspect(db.engine).has_table('report')
     db.create_all()
+    with db.engine.begin() as connection:
+        current = connection.scalar(db.select(SchemaVersion.version))
+        if current is None:
+            current = len(MIGRATIONS) if fresh else 0
+            connection.execute(db.insert(SchemaVersion).values(version=current))
+    for version, migration in enumerate(MIGRATIONS[current:], start=current + 1):
+        # Each migration commits together with its version (SQLite DDL is transactional)
+        with db.engine.begin() as connection:
+            migration(connection)
+            connection.execute(db.update(SchemaVersion).values(version=version))
+        print(f"Migrated database to schema version {version} ({migration.__name__})")
+
+def init_database():
+    # WAL lets the admin pages read while the submission writer commits (the mode is stored in the file)
+    with db.engine.connect() as connection:
+        connection.exec_driver_sql('PRAGMA journal_mode=WAL')
+    migrate_database()
     # Create admin user if not exists
     admin = User.query.filter_by(username=ADMIN_USERNAME).first()
     if not admin:
@@ -58,13 +216,931 @@ with app.app_context():
         admin.set_password(ADMIN_PASSWORD)
         db.session.add(admin)
         db.session.commit()
+    # Replay reports journaled but not committed by the previous run before loading the triage queue
+    current_app.extensions['submissions'].start()
+    current_app.extensions['triage'].rebuild()
+    current_app.extensions['archive'].start()
+
+class SubmissionQueue:
+    # Write-behind report submission: requests append the validated report to a journal
+    # segment on disk and return at once; a single writer thread inserts the queued reports
+    # in batches of up to `batch_size`, one transaction (and one fsync) per batch, at most
+    # `interval` seconds after the first report of a batch arrived. The journal segment of a
+    # batch is deleted once the batch is committed, so reports acknowledged but not yet
+    # committed are replayed from the journal at the next start. With fsync=False a journal
+    # append survives a crash of the process but not a power failure. The journal directory
+    # belongs to one process: replay() takes over every segment in it.
+    #
+    # A failed batch is retried `retries` times with backoff and then stored report by report;
+    # reports that still fail (e.g. a malformed journal line) are set aside in the journal's
+    # rejected/ directory, so one bad report cannot block the queue. Moving a file from there
+    # back into the journal directory replays it at the next start.
+
+    def __init__(self, directory=None, batch_size=200, interval=0.05, fsync=False, retries=8):
+        self.app = None
+        self.directory = directory
+        self.batch_size = batch_size
+        self.interval = interval
+        self.fsync = fsync
+        self.retries = retries  # Retries of a failed batch before it is stored report by report
+        self.pending = []
+        self.segment = None  # Journal file of the pending reports
+        self.first_at = None  # time.monotonic() the oldest pending report was queued
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopping = False
+        self.exit_handler = False  # atexit hook registered
+        self.removed_ids = []  # Submission ids whose segment is removed; forgotten by the next batch
+
+        # Metrics
+        self.submitted = 0
+        self.committed = 0
+        self.merged = 0  # Submissions merged into an existing report as duplicates
+        self.rejected = 0  # Submissions set aside because they could not be stored
+        self.batches = 0
+        self.failures = 0
+        self.commit_seconds = deque(maxlen=1000)  # Recent batch commit durations
+        self.wait_seconds = deque(maxlen=1000)  # Recent queue-to-commit delays (oldest report of each batch)
+
+    def init_app(self, app):
+        self.app = app
+        self.directory = app.config['SUBMISSION_JOURNAL']
+        self.batch_size = app.config['SUBMIT_BATCH_SIZE']
+        self.interval = app.config['SUBMIT_BATCH_INTERVAL']
+        self.fsync = app.config['SUBMIT_FSYNC']
+        app.extensions['submissions'] = self
+
+    @property
+    def rejected_directory(self):
+        return os.path.join(self.directory, 'rejected')
+
+    def start(self):
+        with self.condition:
+            if self.thread is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self.replay()
+            self.forget_applied()
+            self.segment = self.open_segment()
+            self.thread = threading.Thread(target=self.run, name='SubmissionWriter', daemon=True)
+            self.thread.start()
+            if not self.exit_handler:
+                atexit.register(self.stop)
+                self.exit_handler = True
+
+    def open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        return open(os.path.join(self.directory, f'{time.time_ns()}.ndjson'), 'a', encoding='utf-8')
+
+    def submit(self, name, phone, coordinates, description, user_id):
+        # Queue a validated report; it is durable (journaled) when this returns
+        if self.thread is None:
+            self.start()
+        record = {'submission_id': os.urandom(16).hex(), 'name': name, 'phone': phone,
+                  'coordinates': coordinates, 'description': description, 'user_id': user_id,
+                  'timestamp': datetime.utcnow().isoformat()}
+        line = json.dumps(record) + '\n'
+        with self.condition:
+            self.segment.write(line)
+            self.segment.flush()
+            if self.fsync:
+                os.fsync(self.segment.fileno())
+            if not self.pending:
+                self.first_at = time.monotonic()
+            self.pending.append(record)
+            self.submitted += 1
+            # Wake the writer to start a batch's interval, or to write a full batch now
+            if len(self.pending) == 1 or len(self.pending) >= self.batch_size:
+                self.condition.notify()
+
+    def run(self):
+        # An unexpected error (e.g. the journal directory vanished) is logged and the batch is
+        # tried again; the pending reports and their segment are kept until it is written
+        while True:
+            try:
+                if not self.write_next():
+                    return
+            except Exception as e:
+                print(f"Submission writer error, retrying in 1 s: {e}")
+                time.sleep(1.0)
+
+    def write_next(self):
+        # Write the next batch; returns False once stopping with nothing left to write
+        with self.condition:
+            while not self.pending and not self.stopping:
+                self.condition.wait()
+            # Group commit: wait for a full batch or until the oldest report has waited `interval`
+            while len(self.pending) < self.batch_size and not self.stopping:
+                remaining = self.first_at + self.interval - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            if not self.pending:  # Stopping and drained
+                self.segment.close()
+                try:
+                    os.remove(self.segment.name)
+                except OSError:
+                    pass
+                return False
+            next_segment = self.open_segment()  # Before taking the batch, so a failure loses nothing
+            batch, self.pending = self.pending, []
+            segment, self.segment = self.segment, next_segment
+            first_at = self.first_at
+        segment.close()
+        self.finish_segment(segment.name, batch, self.write(batch, first_at))
+        return True
+
+    def finish_segment(self, path, records, rejected):
+        # The segment's reports are stored: set the rejected ones aside and remove it
+        if rejected:
+            os.makedirs(self.rejected_directory, exist_ok=True)
+            target = os.path.join(self.rejected_directory, os.path.basename(path))
+            with open(target, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(record) + '\n' for record in rejected)
+                f.flush()
+                os.fsync(f.fileno())
+            print(f"Set aside {len(rejected)} report submissions that could not be stored in {target}")
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # The journal directory was removed under us
+        with self.condition:
+            self.removed_ids.extend(record['submission_id'] for record in records
+                                    if isinstance(record, dict) and 'submission_id' in record)
+
+    def store(self, records):
+        # Insert records in one transaction; returns (created, merged) as store_reports() does
+        forget = []
+        with self.app.app_context():
+            try:
+                rows = [report_row(record) for record in records]  # Fresh rows: store_reports() updates them
+                created, merged = store_reports(rows)
+                applied = [{'id': record['submission_id']} for record in records if 'submission_id' in record]
+                if applied:
+                    db.session.execute(db.insert(AppliedSubmission), applied)
+                with self.condition:
+                    forget, self.removed_ids = self.removed_ids, []
+                if forget:
+                    db.session.execute(db.delete(AppliedSubmission).where(AppliedSubmission.id.in_(forget)))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                if forget:
+                    with self.condition:
+                        self.removed_ids.extend(forget)
+                raise
+        return created, merged
+
+    def forget_applied(self):
+        # Once no journal segment is left, no applied submission can be replayed again
+        if any(name.endswith('.ndjson') for name in os.listdir(self.directory)):
+            return
+        with self.app.app_context():
+            db.session.execute(db.delete(AppliedSubmission))
+            db.session.commit()
+        with self.condition:
+            self.removed_ids = []
+
+    def stored(self, records, created, merged):
+        self.committed += len(records)
+        self.merged += len(records) - len(created)
+        with self.app.app_context():
+            if created:
+                reports_changed('created', reports=[Report(id=report_id, **row).to_dict()
+                                                    for report_id, row in created])
+            if merged:
+                reports_changed('duplicated', duplicates=merged)
+
+    def write(self, records, first_at=None):
+        # Store a batch, retrying failures with backoff; once `retries` are used up the reports
+        # are stored one at a time. Malformed records are rejected without retrying. Returns the
+        # records that could not be stored.
+        rejected = [record for record in records if not self.well_formed(record)]
+        if rejected:
+            print(f"Rejected {len(rejected)} malformed report submissions")
+            self.rejected += len(rejected)
+            records = [record for record in records if self.well_formed(record)]
+            if not records:
+                return rejected
+        delay = 0.1
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+            try:
+                created, merged = self.store(records)
+                break
+            except Exception as e:
+                self.failures += 1
+                if attempt == self.retries:
+                    print(f"Submission batch of {len(records)} failed {attempt + 1} times, "
+                          f"storing its reports one by one: {e}")
+                    return rejected + self.write_each(records)
+                print(f"Submission batch of {len(records)} failed, retrying in {delay:.1f} s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, 5.0)
+        self.commit_seconds.append(time.perf_counter() - started)
+        if first_at is not None:
+            self.wait_seconds.append(time.monotonic() - first_at)
+        self.batches += 1
+        self.stored(records, created, merged)
+        return rejected
+
+    def well_formed(self, record):
+        try:
+            report_row(record)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return False
+        return True
+
+    def write_each(self, records):
+        rejected = []
+        for record in records:
+            try:
+                created, merged = self.store([record])
+            except Exception as e:
+                self.failures += 1
+                print(f"Report submission could not be stored: {e}")
+                rejected.append(record)
+                continue
+            self.batches += 1
+            self.stored([record], created, merged)
+        self.rejected += len(rejected)
+        return rejected
+
+    def already_stored(self, record):
+        try:
+            if 'submission_id' in record:
+                return db.session.get(AppliedSubmission, record['submission_id']) is not None
+            # Journals written before submissions had ids: a report from the same user and time
+            timestamp = datetime.fromisoformat(record['timestamp'])
+            return Report.query.filter_by(user_id=record['user_id'], timestamp=timestamp).first() is not None
+        except (KeyError, TypeError, ValueError):
+            return False  # Malformed: write() sets it aside
+
+    def replay(self):
+        # Insert the reports of journal segments left behind by a previous run. A crash between
+        # a batch's commit and the removal of its segment leaves committed reports in the
+        # journal, so submissions already applied (see AppliedSubmission) are skipped.
+        for filename in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, filename)
+            if not filename.endswith('.ndjson'):
+                continue
+            records = []
+            with open(path, encoding='utf-8') as segment:
+                for line in segment:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        pass  # Torn final line of a crashed append
+            with self.app.app_context():
+                pending = [record for record in records if not self.already_stored(record)]
+            rejected = []
+            if pending:
+                print(f"Replaying {len(pending)} journaled report submissions from {filename}")
+                rejected = self.write(pending)
+            self.finish_segment(path, records, rejected)
+
+    def stop(self):
+        # Commit everything still queued and stop the writer; start() may be called again afterwards
+        with self.condition:
+            thread = self.thread
+            if thread is None:
+                return
+            self.stopping = True
+            self.condition.notify()
+        if thread is threading.current_thread():
+            return
+        thread.join()
+        with self.condition:
+            self.thread = None
+            self.stopping = False
+
+    def stats(self):
+        def percentile(values, q):
+            values = sorted(values)
+            return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+        return {
+            'queue_depth': len(self.pending),
+            'submitted': self.submitted,
+            'committed': self.committed,
+            'merged_duplicates': self.merged,
+            'rejected': self.rejected,
+            'batches': self.batches,
+            'failed_commits': self.failures,
+            'mean_batch_size': self.committed / self.batches if self.batches else None,
+            'commit_seconds': {'p50': percentile(self.commit_seconds, 0.5),
+                               'p99': percentile(self.commit_seconds, 0.99),
+                               'max': max(self.commit_seconds, default=None)},
+            'queue_wait_seconds': {'p50': percentile(self.wait_seconds, 0.5),
+                                   'p99': percentile(self.wait_seconds, 0.99),
+                                   'max': max(self.wait_seconds, default=None)},
+        }
+
+class ReportEvents:
+    # Live admin feed: the most recent report changes, already formatted as Server-Sent Events.
+    # Each change is serialized once and every connected dashboard is woken to send it, so
+    # hundreds of open dashboards cost one fan-out per change rather than one query each.
+    # Event ids are "<boot id>:<version>"; a client resuming from an id that is no longer
+    # buffered (or from before a restart) is sent a "reset" event and reloads the page.
+
+    def __init__(self, size=1000, keepalive=15.0):
+        self.boot_id = os.urandom(4).hex()  # New for every application instance
+        self.events = deque(maxlen=size)  # (version, formatted event)
+        self.latest = 0  # Version of the newest event
+        self.condition = threading.Condition()
+        self.keepalive = keepalive
+
+    def publish(self, version, kind, data):
+        text = f"id: {self.boot_id}:{version}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
+        with self.condition:
+            self.events.append((version, text))
+            self.latest = version
+            self.condition.notify_all()
+
+    def parse_id(self, event_id):
+        # "<boot id>:<version>" -> version, or None if it is not from this application instance
+        boot, _, version = event_id.partition(':')
+        if boot != self.boot_id or not version.isdigit():
+            return None
+        return int(version)
+
+    def after(self, version):
+        # Buffered events newer than `version`, or None if some of them are no longer buffered
+        if version >= self.latest:
+            return []
+        if not self.events or self.events[0][0] > version + 1:
+            return None
+        return [event for event in self.events if event[0] > version]
+
+    def stream(self, version):
+        # Event stream for a client that has seen everything up to `version` (None: unknown)
+        yield "retry: 3000\n\n"
+        while True:
+            with self.condition:
+                events = self.after(version) if version is not None else None
+                if events == []:
+                    self.condition.wait(self.keepalive)
+                    events = self.after(version)
+                latest = self.latest
+            if events is None:
+                yield f"id: {self.boot_id}:{latest}\nevent: reset\ndata: {{}}\n\n"
+                return
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            version = events[-1][0]
+            yield ''.join(text for _, text in events)
+
+ADMIN_CACHE_SIZE = 256  # Cached admin pages (distinct filter/page URLs)
+
+class AdminPageCache:
+    # Rendered admin pages keyed by URL, valid while no report has changed since. Every write
+    # to the report table calls reports_changed(), which bumps the version; the version (with
+    # the live feed's boot id, so ETags do not survive a restart) is also the pages' ETag.
+
+    def __init__(self, size=ADMIN_CACHE_SIZE):
+        self.version = 0  # Report version
+        self.lock = threading.Lock()
+        self.pages = OrderedDict()  # URL -> (version, html)
+        self.size = size
+
+    def get(self, url, version):
+        cached = self.pages.get(url)
+        return cached[1] if cached and cached[0] == version else None
+
+    def put(self, url, version, html):
+        with self.lock:
+            # Pages rendered while a write committed carry the old version and are never served
+            if version == self.version:
+                self.pages[url] = (version, html)
+                if len(self.pages) > self.size:
+                    self.pages.popitem(last=False)
+
+def reports_changed(kind, **data):
+    # Called after every committed write to reports, inside the application's context: bumps
+    # the version and publishes the change to the live admin feed as the event with that
+    # version as its id
+    state = current_app.extensions
+    cache = state['admin_cache']
+    with cache.lock:
+        cache.version += 1
+        cache.pages.clear()
+        state['report_events'].publish(cache.version, kind, data)
+    state['triage'].apply(kind, data)
+
+def report_etag(version):
+    return f"{current_app.extensions['report_events'].boot_id}-{version}"
+
+def report_row(record):
+    # Journaled submission -> Report row for a bulk insert
+    latitude, longitude = parse_coordinates(record['coordinates'])
+    timestamp = datetime.fromisoformat(record['timestamp'])
+    record = {key: value for key, value in record.items() if key != 'submission_id'}
+    return dict(record, timestamp=timestamp, solved=False, duplicates=0,
+                latitude=latitude, longitude=longitude, cell=grid_cell(latitude, longitude),
+                dedup_key=dedup_key(record['phone'], latitude, longitude, duplicate_bucket(timestamp)))
+
+# Near-duplicate reports: the same phone, within DUPLICATE_RADIUS_KM and DUPLICATE_WINDOW, with
+# descriptions at least DUPLICATE_SIMILARITY alike, are merged into the first pending report as
+# a counter. Candidates are found through the indexed hash of (phone, location rounded to
+# DUPLICATE_PRECISION decimals, time bucket); a submission looks up its own and the neighbouring
+# rounded locations in its own and the previous bucket, so matches are not lost at cell or
+# bucket edges.
+DUPLICATE_WINDOW = timedelta(hours=1)
+DUPLICATE_PRECISION = 3  # About 110 m
+DUPLICATE_RADIUS_KM = 0.1
+DUPLICATE_SIMILARITY = 0.8
+
+def duplicate_bucket(timestamp):
+    return int(timestamp.timestamp() // DUPLICATE_WINDOW.total_seconds())
+
+def dedup_key(phone, latitude, longitude, bucket):
+    digits = re.sub(r'\D', '', phone)[-10:]  # Ignore formatting and country prefix
+    key = f'{digits}|{round(latitude, DUPLICATE_PRECISION)}|{round(longitude, DUPLICATE_PRECISION)}|{bucket}'
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+def normalize_text(text):
+    return ' '.join(text.lower().split())
+
+def similar_text(a, b):
+    matcher = difflib.SequenceMatcher(None, normalize_text(a), normalize_text(b))
+    # quick_ratio() is an upper bound of ratio() and much cheaper
+    return matcher.quick_ratio() >= DUPLICATE_SIMILARITY and matcher.ratio() >= DUPLICATE_SIMILARITY
+
+def store_reports(rows):
+    # Insert a batch of new report rows, merging near-duplicates into pending reports (stored or
+    # earlier in the batch). Returns ([(id, row)] inserted, {id: duplicates} of merged-into reports).
+    step = 10 ** -DUPLICATE_PRECISION
+
+    def lookup_keys(row):
+        bucket = duplicate_bucket(row['timestamp'])
+        return [dedup_key(row['phone'], row['latitude'] + dlat * step, row['longitude'] + dlon * step, b)
+                for b in (bucket, bucket - 1) for dlat in (0, -1, 1) for dlon in (0, -1, 1)]
+
+    keys = {key for row in rows for key in lookup_keys(row)}
+    candidates = {}  # dedup key -> [candidate dicts]; 'id' is None for rows of this batch
+    for report in db.session.execute(
+            db.select(Report.id, Report.dedup_key, Report.description, Report.timestamp, Report.duplicates,
+                      Report.latitude, Report.longitude)
+            .where(Report.dedup_key.in_(keys), Report.solved == False)).mappings():
+        candidates.setdefault(report['dedup_key'], []).append(dict(report))
+
+    new_rows = []
+    merged = {}
+    for row in rows:
+        match = None
+        for key in lookup_keys(row):
+            for candidate in candidates.get(key, ()):
+                if (row['timestamp'] - candidate['timestamp'] <= DUPLICATE_WINDOW
+                        and distance_km(row['latitude'], row['longitude'],
+                                        candidate['latitude'], candidate['longitude']) <= DUPLICATE_RADIUS_KM
+                        and similar_text(row['description'], candidate['description'])):
+                    match = candidate
+                    break
+            if match:
+                break
+        if match:
+            match['duplicates'] += 1
+            if match['id'] is not None:
+                merged[match['id']] = match['duplicates']
+            continue
+        new_rows.append(row)
+        candidates.setdefault(row['dedup_key'], []).append(row)  # Its 'duplicates' counts in-batch repeats
+        row['id'] = None
+
+    created = []
+    if new_rows:
+        for row in new_rows:
+            del row['id']
+        ids = db.session.execute(Report.__table__.insert().returning(
+            Report.id, sort_by_parameter_order=True), new_rows).scalars().all()
+        created = list(zip(ids, new_rows))
+    if merged:
+        db.session.execute(db.update(Report), [{'id': report_id, 'duplicates': duplicates}
+                                               for report_id, duplicates in merged.items()])
+    return created, merged
+
+# Triage priority of a pending report:
+#   age        per hour since it was submitted
+#   people     per person mentioned ("5 people", "family of 4", ...), up to TRIAGE_MAX_PEOPLE
+#   repeats    per duplicate submission merged into it
+#   density    per other pending report in the same TRIAGE_BLOCK_CELLS x TRIAGE_BLOCK_CELLS grid cells,
+#              up to TRIAGE_MAX_NEARBY
+# plus the weight of every TRIAGE_KEYWORDS entry found in the description. Weights can be
+# overridden with TRIAGE_WEIGHTS, e.g. TRIAGE_WEIGHTS='{"age": 2, "density": 0}'.
+TRIAGE_WEIGHTS = {'age': 1.0, 'people': 3.0, 'repeats': 2.0, 'density': 1.0}
+TRIAGE_WEIGHTS.update(json.loads(os.environ.get('TRIAGE_WEIGHTS', '{}')))
+TRIAGE_KEYWORDS = {
+    'trapped': 30, 'drowning': 40, 'unconscious': 30, 'injured': 25, 'bleeding': 25,
+    'collapsed': 25, 'pregnant': 20, 'medical': 20, 'fire': 20, 'stranded': 15,
+    'elderly': 10, 'child': 10, 'children': 10, 'baby': 15, 'disabled': 10, 'rising': 10,
+}
+TRIAGE_MAX_PEOPLE = 50
+TRIAGE_BLOCK_CELLS = 5  # 0.05 degrees, about 5.5 km
+TRIAGE_MAX_NEARBY = 20  # Reports beyond this many in a block add no more priority
+PEOPLE_PATTERN = re.compile(r'\b(?:family of|group of)\s+(\d+)|\b(\d+)\s+(?:people|persons|person|adults|'
+                            r'children|kids|members|families|residents|elderly)\b')
+
+KEYWORD_PATTERN = re.compile(r'\b(' + '|'.join(TRIAGE_KEYWORDS) + r')\b')
+
+@lru_cache(maxsize=4096)  # Repeated stock phrases ("need help") are common
+def description_priority(description):
+    # -> (people mentioned, sorted keywords)
+    text = description.lower()
+    people = min(TRIAGE_MAX_PEOPLE, sum(int(a or b) for a, b in PEOPLE_PATTERN.findall(text)))
+    return people, tuple(sorted(set(KEYWORD_PATTERN.findall(text))))
+
+class TriageQueue:
+    # Pending reports in a max-heap on priority. Age grows at the same rate for every report,
+    # so it is folded into a fixed key (score minus age_weight * now, in hours) and heap entries
+    # never have to be rescored as time passes. Changed reports get a new heap entry and the old
+    # one is skipped when it surfaces (lazy deletion), so every change is O(log n); a density
+    # change rescores the reports of one grid block, which only matters while the block holds
+    # at most TRIAGE_MAX_NEARBY others. The queue is rebuilt from the database at startup and
+    # kept current through reports_changed().
+
+    def __init__(self):
+        self.heap = []  # (-key, report id, stamp)
+        self.entries = {}  # report id -> (key, stamp, details)
+        self.blocks = {}  # grid block -> ids of its pending reports
+        self.stamp = 0
+        self.lock = threading.Lock()
+
+    def details(self, report):
+        # report: mapping with id, timestamp (datetime or ISO string), description, duplicates and
+        # either cell or latitude/longitude
+        timestamp = report['timestamp']
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        if 'cell' in report:
+            cell = report['cell']
+        else:  # Live feed event
+            cell = grid_cell(report['latitude'], report['longitude']) if report['latitude'] is not None else None
+        people, keywords = description_priority(report['description'])
+        return {'submitted': timestamp.timestamp(), 'people': people,
+                'keywords': keywords, 'repeats': report['duplicates'] or 0,
+                'block': None if cell is None else (cell // GRID_COLUMNS // TRIAGE_BLOCK_CELLS,
+                                                    cell % GRID_COLUMNS // TRIAGE_BLOCK_CELLS)}
+
+    def nearby(self, details):
+        if details['block'] is None:
+            return 0
+        return min(TRIAGE_MAX_NEARBY, len(self.blocks[details['block']]) - 1)
+
+    def key(self, details):
+        return (TRIAGE_WEIGHTS['people'] * details['people'] + TRIAGE_WEIGHTS['repeats'] * details['repeats'] +
+                TRIAGE_WEIGHTS['density'] * self.nearby(details) +
+                sum(TRIAGE_KEYWORDS[word] for word in details['keywords']) -
+                TRIAGE_WEIGHTS['age'] * details['submitted'] / 3600)
+
+    def push(self, report_id, details):
+        key = self.key(details)
+        self.stamp += 1
+        self.entries[report_id] = (key, self.stamp, details)
+        heapq.heappush(self.heap, (-key, report_id, self.stamp))
+
+    def block_changed(self, block, skip=None):
+        # Rescore a block's reports after it gained or lost one, unless their density is capped
+        members = self.blocks.get(block, ())
+        if len(members) <= TRIAGE_MAX_NEARBY + 1:
+            for report_id in members:
+                if report_id != skip:
+                    self.push(report_id, self.entries[report_id][2])
+
+    def add(self, report):
+        details = self.details(report)
+        with self.lock:
+            if report['id'] in self.entries:
+                self.discard(report['id'])
+            if details['block'] is not None:
+                self.blocks.setdefault(details['block'], set()).add(report['id'])
+            self.push(report['id'], details)
+            if details['block'] is not None:
+                self.block_changed(details['block'], skip=report['id'])
+            self.compact()
+
+    def discard(self, report_id):
+        # Caller holds the lock; the heap entry becomes stale
+        entry = self.entries.pop(report_id, None)
+        if entry and entry[2]['block'] is not None:
+            block = entry[2]['block']
+            self.blocks[block].discard(report_id)
+            if self.blocks[block]:
+                self.block_changed(block)
+            else:
+                del self.blocks[block]
+
+    def compact(self):
+        # Drop the stale entries once they are most of the heap
+        if len(self.heap) > 2 * len(self.entries) + 1000:
+            self.heap = [(-key, report_id, stamp) for report_id, (key, stamp, _) in self.entries.items()]
+            heapq.heapify(self.heap)
+
+    def remove(self, ids):
+        with self.lock:
+            for report_id in ids:
+                self.discard(report_id)
+            self.compact()
+
+    def set_repeats(self, report_id, repeats):
+        with self.lock:
+            entry = self.entries.get(report_id)
+            if entry:
+                entry[2]['repeats'] = repeats
+                self.push(report_id, entry[2])
+                self.compact()
+
+    def rows(self, query):
+        return db.session.execute(query.with_entities(
+            Report.id, Report.timestamp, Report.description, Report.duplicates, Report.cell).statement).mappings()
+
+    def rebuild(self):
+        # All pending reports, scored once and heapified in O(n)
+        loaded = {report['id']: self.details(report) for report in self.rows(Report.query.filter(Report.solved == False))}
+        with self.lock:
+            self.blocks = {}
+            for report_id, details in loaded.items():
+                if details['block'] is not None:
+                    self.blocks.setdefault(details['block'], set()).add(report_id)
+            self.entries = {}
+            for report_id, details in loaded.items():
+                self.stamp += 1
+                self.entries[report_id] = (self.key(details), self.stamp, details)
+            self.heap = [(-key, report_id, stamp) for report_id, (key, stamp, _) in self.entries.items()]
+            heapq.heapify(self.heap)
+
+    def apply(self, kind, data):
+        # Follow a committed change (see reports_changed)
+        if kind == 'created':
+            for report in data['reports']:
+                self.add(report)
+        elif kind in ('solved', 'deleted'):
+            self.remove(data['ids'])
+        elif kind == 'reopened':  # Only from requests, inside an app context
+            for report in self.rows(Report.query.filter(Report.id.in_(data['ids']))):
+                self.add(report)
+        elif kind == 'duplicated':
+            for report_id, repeats in data['duplicates'].items():
+                self.set_repeats(report_id, repeats)
+
+    def top(self, n):
+        # The n highest-priority pending reports as [(score, id, details, nearby)], in O(n log size):
+        # pop them (dropping stale entries on the way) and push them back
+        now = datetime.utcnow().timestamp() / 3600
+        with self.lock:
+            best = []
+            while self.heap and len(best) < n:
+                item = heapq.heappop(self.heap)
+                entry = self.entries.get(item[1])
+                if entry and entry[1] == item[2]:
+                    best.append(item)
+            for item in best:
+                heapq.heappush(self.heap, item)
+            return [(-negative_key + TRIAGE_WEIGHTS['age'] * now, report_id, self.entries[report_id][2],
+                     self.nearby(self.entries[report_id][2])) for negative_key, report_id, _ in best]
+
+    def __len__(self):
+        return len(self.entries)
+
+ARCHIVE_FIELDS = ('id', 'timestamp', 'name', 'phone', 'coordinates', 'latitude', 'longitude', 'description',
+                  'solved', 'duplicates', 'user_id')
+ARCHIVE_CHUNK_ROWS = 5000  # Reports moved per transaction, and at most per archive member
+MAX_ARCHIVE_AGE_DAYS = 36500  # Largest older_than_days accepted by /api/archive/run
+
+class ReportArchive:
+    # Cold storage for solved reports. Solved reports older than `after` are moved out of the
+    # report table into one append-only archive segment per month (reports-YYYY-MM.ndjson.gz).
+    # Every archiving pass appends a gzip member of at most ARCHIVE_CHUNK_ROWS reports to the
+    # segment of their month (concatenated members are still one valid gzip file), and records
+    # the member's offset, length, time span, id range and bounding box in index.ndjson. Searches
+    # read the index and decompress only the members that can match.
+    #
+    # A member and its index line are fsynced before the deletion of its reports is committed,
+    # so a crash in between leaves them both archived and in the table; they are archived again
+    # by the next pass and searches skip the repeated ids.
+
+    def __init__(self, directory=None, after=timedelta(days=30), interval=timedelta(hours=24)):
+        self.app = None
+        self.directory = directory
+        self.after = after  # Age (by submission time) at which a solved report is archived
+        self.interval = interval  # Between automatic passes; None disables them
+        self.lock = threading.Lock()  # One pass at a time
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def init_app(self, app):
+        self.app = app
+        self.directory = app.config['ARCHIVE_DIR']
+        self.after = timedelta(days=app.config['ARCHIVE_AFTER_DAYS'])
+        hours = app.config['ARCHIVE_INTERVAL_HOURS']
+        self.interval = timedelta(hours=hours) if hours > 0 else None
+        app.extensions['archive'] = self
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, 'index.ndjson')
+
+    def start(self):
+        # Archive in the background every `interval`, starting now
+        if self.interval is None or self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.run, name='ReportArchiver', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    archived = self.archive(datetime.utcnow() - self.after)
+                if archived:
+                    print(f"Archived {archived} solved reports")
+            except Exception as e:  # Try again at the next pass
+                print(f"Report archiving failed: {e}")
+            if self.stop_event.wait(self.interval.total_seconds()):
+                return
+
+    def append(self, month, records):
+        # Write one gzip member to the month's segment and its index line; both are durable on return
+        segment = f'reports-{month}.ndjson.gz'
+        data = gzip.compress(''.join(json.dumps(record) + '\n' for record in records).encode())
+        with open(os.path.join(self.directory, segment), 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        located = [record for record in records if record['latitude'] is not None]
+        entry = {
+            'segment': segment, 'offset': offset, 'length': len(data), 'count': len(records),
+            'first': records[0]['timestamp'], 'last': records[-1]['timestamp'],
+            'min_id': min(record['id'] for record in records), 'max_id': max(record['id'] for record in records),
+            'south': min((r['latitude'] for r in located), default=None),
+            'north': max((r['latitude'] for r in located), default=None),
+            'west': min((r['longitude'] for r in located), default=None),
+            'east': max((r['longitude'] for r in located), default=None),
+        }
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def archive(self, cutoff):
+        # Move solved reports submitted before `cutoff` into the archive; returns how many moved.
+        # Each chunk is deleted first and archived from the rows the DELETE returned, then
+        # committed once its members are durable: a report that was reopened or deleted in the
+        # meantime is neither archived nor removed, and a failed write leaves the table unchanged.
+        os.makedirs(self.directory, exist_ok=True)
+        columns = [getattr(Report, field) for field in ARCHIVE_FIELDS]
+        moved = 0
+        with self.lock:
+            while True:
+                oldest = (db.select(Report.id).where(Report.solved == True, Report.timestamp < cutoff)
+                          .order_by(Report.timestamp, Report.id).limit(ARCHIVE_CHUNK_ROWS))
+                try:
+                    rows = db.session.execute(
+                        db.delete(Report).where(Report.solved == True, Report.timestamp < cutoff,
+                                                Report.id.in_(oldest)).returning(*columns),
+                        execution_options={'synchronize_session': False}).all()
+                    if not rows:
+                        db.session.rollback()
+                        return moved
+                    months = {}
+                    for row in sorted(rows, key=lambda row: (row.timestamp, row.id)):
+                        record = dict(zip(ARCHIVE_FIELDS, row), timestamp=row.timestamp.isoformat())
+                        months.setdefault(row.timestamp.strftime('%Y-%m'), []).append(record)
+                    for month, records in months.items():
+                        self.append(month, records)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+
+                ids = [row.id for row in rows]
+                reports_changed('archived', ids=ids)
+                moved += len(ids)
+
+    def members(self):
+        if not os.path.exists(self.index_path):
+            return []
+        with open(self.index_path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def search(self, start=None, end=None, box=None, text=None, report_id=None, limit=100):
+        # Archived reports, newest member first, matching every given filter: submission time in
+        # [start, end), inside box (south, west, north, east; west <= east), description, name or
+        # phone containing `text`, or a single id
+        start = start.isoformat() if start else None
+        end = end.isoformat() if end else None
+        text = text.lower() if text else None
+        found = []
+        seen = set()
+        for member in sorted(self.members(), key=lambda m: m['last'], reverse=True):
+            if ((start and member['last'] < start) or (end and member['first'] >= end) or
+                    (report_id is not None and not member['min_id'] <= report_id <= member['max_id'])):
+                continue
+            if box and (member['south'] is None or member['north'] < box[0] or member['south'] > box[2] or
+                        member['east'] < box[1] or member['west'] > box[3]):
+                continue
+            with open(os.path.join(self.directory, member['segment']), 'rb') as f:
+                f.seek(member['offset'])
+                lines = gzip.decompress(f.read(member['length'])).decode().splitlines()
+            for line in reversed(lines):
+                record = json.loads(line)
+                if record['id'] in seen:
+                    continue
+                if ((start and record['timestamp'] < start) or (end and record['timestamp'] >= end) or
+                        (report_id is not None and record['id'] != report_id)):
+                    continue
+                if box and (record['latitude'] is None or not box[0] <= record['latitude'] <= box[2] or
+                            not box[1] <= record['longitude'] <= box[3]):
+                    continue
+                if text and not any(text in record[field].lower() for field in ('description', 'name', 'phone')):
+                    continue
+                seen.add(record['id'])
+                found.append(record)
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def stats(self):
+        members = self.members()
+        return {
+            'segments': len({member['segment'] for member in members}),
+            'members': len(members),
+            'reports': sum(member['count'] for member in members),
+            'compressed_bytes': sum(member['length'] for member in members),
+            'oldest': min((member['first'] for member in members), default=None),
+            'newest': max((member['last'] for member in members), default=None),
+        }
+
+# Admin credentials
+ADMIN_USERNAME = "admin"
+ADMIN_PASSWORD = "admin123"
+
+MAX_INGEST_BATCH = 100000  # Readings per request
+
+ADMIN_PAGE_SIZE = 50  # Reports per admin page
+
+MAX_API_RESULTS = 1000  # Reports per spatial API response
+EXPORT_CHUNK_ROWS = 1000  # Rows fetched from the cursor and sent per chunk of an export
+MAX_BULK_IDS = 10000  # Report ids per bulk action request
+BULK_ACTIONS = ('solve', 'reopen', 'delete', 'reassign')
+
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')  # Required for sessions and flash messages
+    # Ensure the database is created in the correct location
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(BASE_DIR, 'disaster_management.db')}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Reading ingest: monitors authenticate with "Authorization: Bearer <INGEST_TOKEN>".
+    # The endpoint is disabled while INGEST_TOKEN is not set.
+    app.config['INGEST_TOKEN'] = os.environ.get('INGEST_TOKEN')
+    app.config['SUBMISSION_JOURNAL'] = os.path.join(BASE_DIR, 'submission_journal')
+    app.config['SUBMIT_BATCH_SIZE'] = int(os.environ.get('SUBMIT_BATCH_SIZE', 200))
+    app.config['SUBMIT_BATCH_INTERVAL'] = float(os.environ.get('SUBMIT_BATCH_INTERVAL', 0.05))
+    app.config['SUBMIT_FSYNC'] = os.environ.get('SUBMIT_FSYNC', '0') == '1'
+    app.config['ARCHIVE_DIR'] = os.path.join(BASE_DIR, 'archive')
+    app.config['ARCHIVE_AFTER_DAYS'] = float(os.environ.get('ARCHIVE_AFTER_DAYS', 30))
+    app.config['ARCHIVE_INTERVAL_HOURS'] = float(os.environ.get('ARCHIVE_INTERVAL_HOURS', 24))  # 0 disables
+    app.config.update(config or {})
+
+    db.init_app(app)
+    # Per-application state: every app built by this factory has its own submission queue
+    # (see SubmissionQueue), triage heap (TriageQueue), archive (ReportArchive), live feed
+    # (ReportEvents) and admin page cache (AdminPageCache)
+    SubmissionQueue().init_app(app)
+    ReportArchive().init_app(app)
+    app.extensions['triage'] = TriageQueue()
+    app.extensions['report_events'] = ReportEvents()
+    app.extensions['admin_cache'] = AdminPageCache()
+    app.register_blueprint(bp)
+    app.extensions['database_ready'] = False
+    app.extensions['database_lock'] = threading.Lock()
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create or migrate the database and load the triage queue."""
+        init_database()
+        app.extensions['database_ready'] = True
+        print('Database ready')
+
+    return app
+
+@bp.before_app_request
+def ensure_database():
+    # Lazy initialization: the first request of a process migrates the database and loads state
+    app = current_app._get_current_object()
+    if not app.extensions['database_ready']:
+        with app.extensions['database_lock']:
+            if not app.extensions['database_ready']:
+                init_database()
+                app.extensions['database_ready'] = True
 
 def login_required(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
         if 'user_id' not in session:
             flash('Please login first.')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         return f(*args, **kwargs)
     return wrapper
 
@@ -73,26 +1149,19 @@ def admin_required(f):
     def wrapper(*args, **kwargs):
         if 'admin' not in session:
             flash('Admin access required.')
-            return redirect(url_for('admin_login'))
+            return redirect(url_for('main.admin_login'))
         return f(*args, **kwargs)
     return wrapper
 
 def validate_coordinates(coordinates):
     # Clean and validate coordinates
-    coords = coordinates.replace(' ', '').strip()
-    try:
-        lat, long = map(float, coords.split(','))
-        if -90 <= lat <= 90 and -180 <= long <= 180:
-            return True
-        return False
-    except:
-        return False
+    return parse_coordinates(coordinates) is not None
 
-@app.route('/')
+@bp.route('/')
 def home():
     return render_template('home.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -101,11 +1170,11 @@ def register():
         
         if User.query.filter_by(username=username).first():
             flash('Username already exists')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
         
         if User.query.filter_by(email=email).first():
             flash('Email already registered')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
         
         user = User(username=username, email=email)
         user.set_password(password)
@@ -113,11 +1182,11 @@ def register():
         db.session.commit()
         
         flash('Registration successful! Please login.')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     return render_template('register.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -127,12 +1196,12 @@ def login():
         if user and user.check_password(password):
             session['user_id'] = user.id
             flash('Logged in successfully!')
-            return redirect(url_for('home'))
+            return redirect(url_for('main.home'))
         
         flash('Invalid username or password')
     return render_template('login.html')
 
-@app.route('/admin_login', methods=['GET', 'POST'])
+@bp.route('/admin_login', methods=['GET', 'POST'])
 def admin_login():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -141,20 +1210,20 @@ def admin_login():
         if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
             session['admin'] = True
             flash('Admin logged in successfully!')
-            return redirect(url_for('admin'))
+            return redirect(url_for('main.admin'))
         else:
             flash('Invalid admin credentials')
     
     return render_template('admin_login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     session.pop('user_id', None)
     session.pop('admin', None)
     flash('Logged out successfully!')
-    return redirect(url_for('home'))
+    return redirect(url_for('main.home'))
 
-@app.route('/user', methods=['GET', 'POST'])
+@bp.route('/user', methods=['GET', 'POST'])
 @login_required
 def user():
     if request.method == 'POST':
@@ -168,29 +1237,113 @@ def user():
                 flash('Invalid coordinates format. Please use format: latitude,longitude (e.g., 12.922835,77.50111)')
                 return render_template('user.html')
             
-            report = Report(
-                name=name,
-                phone=phone,
-                coordinates=coordinates,
-                description=description,
-                user_id=session['user_id']
-            )
-            db.session.add(report)
-            db.session.commit()
+            # Queued for the next group commit; the report is journaled before we acknowledge
+            current_app.extensions['submissions'].submit(name, phone, coordinates, description, session['user_id'])
             flash('Report submitted successfully!')
-            return redirect(url_for('submission_success'))
+            return redirect(url_for('main.submission_success'))
         else:
             flash('All fields are required!')
     
     return render_template('user.html')
 
-@app.route('/admin')
+def encode_cursor(report):
+    return f"{report.timestamp.isoformat()}_{report.id}"
+
+def decode_cursor(cursor):
+    # "<ISO timestamp>_<id>" -> (datetime, id); raises ValueError
+    timestamp, _, report_id = cursor.rpartition('_')
+    return datetime.fromisoformat(timestamp), int(report_id)
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+def filter_reports(query, status=None, start=None, end=None):
+    # status: 'pending', 'solved' or None for all; start/end: datetime range [start, end)
+    if status == 'pending':
+        query = query.filter(Report.solved == False)
+    elif status == 'solved':
+        query = query.filter(Report.solved == True)
+    if start:
+        query = query.filter(Report.timestamp >= start)
+    if end:
+        query = query.filter(Report.timestamp < end)
+    return query
+
+def report_page(query, before=None, after=None, limit=ADMIN_PAGE_SIZE):
+    # Seek (keyset) pagination on (timestamp, id), newest first: each page is an index range
+    # scan of `limit` rows no matter how deep it is. Returns (reports, newer cursor, older cursor).
+    key = tuple_(Report.timestamp, Report.id)
+    if after is not None:
+        # Page of newer reports: walk the index upwards, then flip back to newest first
+        rows = query.filter(key > after).order_by(Report.timestamp.asc(), Report.id.asc()).limit(limit + 1).all()
+        has_newer, has_older = len(rows) > limit, True
+        reports = rows[:limit][::-1]
+    else:
+        if before is not None:
+            query = query.filter(key < before)
+        rows = query.order_by(Report.timestamp.desc(), Report.id.desc()).limit(limit + 1).all()
+        has_newer, has_older = before is not None, len(rows) > limit
+        reports = rows[:limit]
+
+    newer = encode_cursor(reports[0]) if reports and has_newer else None
+    older = encode_cursor(reports[-1]) if reports and has_older else None
+    return reports, newer, older
+
+@bp.route('/admin')
 @admin_required
 def admin():
-    reports = Report.query.order_by(Report.timestamp.desc()).all()
-    return render_template('admin.html', reports=reports)
+    status = request.args.get('status')
+    if status not in ('pending', 'solved'):
+        status = None
+    try:
+        start = parse_date(request.args.get('from'))
+        end = parse_date(request.args.get('to'))
+        before = decode_cursor(request.args['before']) if request.args.get('before') else None
+        after = decode_cursor(request.args['after']) if request.args.get('after') else None
+    except ValueError:
+        flash('Invalid filter or page')
+        return redirect(url_for('main.admin'))
+    if end:
+        end += timedelta(days=1)  # "to" date is inclusive
+
+    # Unchanged since the client's copy: 304 without touching the database or the template
+    cache = current_app.extensions['admin_cache']
+    version = cache.version
+    etag = report_etag(version)
+    if request.if_none_match.contains(etag):
+        return cached_page(etag, status=304)
+    html = cache.get(request.full_path, version)
+    if html is not None:
+        return cached_page(etag, html)
+
+    query = filter_reports(Report.query, status, start, end)
+    reports, newer, older = report_page(query, before, after)
+    filters = {key: request.args[key] for key in ('status', 'from', 'to') if request.args.get(key)}
+    html = render_template('admin.html', reports=reports, newer=newer, older=older, filters=filters,
+                           since=f"{current_app.extensions['report_events'].boot_id}:{version}",
+                           live=not before and not after)
+    cache.put(request.full_path, version, html)
+    return cached_page(etag, html)
+
+def cached_page(etag, html='', status=200):
+    response = make_response(html, status)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'  # Browsers revalidate on every load
+    return response
+
+@bp.route('/admin/events')
+@admin_required
+def admin_events():
+    # EventSource reconnects send Last-Event-ID; the first connection passes the page's version
+    event_id = request.headers.get('Last-Event-ID') or request.args.get('since')
+    report_events = current_app.extensions['report_events']
+    version = report_events.parse_id(event_id) if event_id else report_events.latest
+    response = Response(report_events.stream(version), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Do not let a proxy buffer the stream
+    return response
 
-@app.route('/admin_action', methods=['POST'])
+@bp.route('/admin_action', methods=['POST'])
 @admin_required
 def admin_action():
     report_id = request.form.get('report_id')
@@ -198,36 +1351,421 @@ def admin_action():
     
     if not report_id or not action:
         flash('Invalid request')
-        return redirect(url_for('admin'))
+        return redirect(url_for('main.admin'))
     
     report = Report.query.get_or_404(report_id)
     
     if action == 'solve':
         report.solved = True
         db.session.commit()
+        reports_changed('solved', ids=[report.id])
         flash('Report marked as solved')
     elif action == 'delete':
+        report_id = report.id
         db.session.delete(report)
         db.session.commit()
+        reports_changed('deleted', ids=[report_id])
         flash('Report deleted')
     
-    return redirect(url_for('admin'))
+    return redirect(url_for('main.admin'))
+
+def bulk_query(data):
+    # Reports selected by a bulk action: explicit "ids", a "filter" (status, from, to and an
+    # optional south/west/north/east box, as in the admin view and spatial APIs), or both
+    ids = data.get('ids')
+    selection = data.get('filter')
+    if ids is None and selection is None:
+        raise ValueError("give 'ids' or 'filter'")
+
+    query = Report.query
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            raise ValueError("'ids' must be a list of report ids")
+        if len(ids) > MAX_BULK_IDS:
+            raise ValueError(f"at most {MAX_BULK_IDS} ids per request")
+        query = query.filter(Report.id.in_(ids))
+    if selection is not None:
+        if not isinstance(selection, dict) or not selection:
+            raise ValueError("'filter' must be a non-empty object")
+        unknown = set(selection) - {'status', 'from', 'to', 'south', 'west', 'north', 'east'}
+        if unknown:
+            raise ValueError(f"unknown filter field '{sorted(unknown)[0]}'")
+        status = selection.get('status')
+        if status not in (None, 'pending', 'solved'):
+            raise ValueError("'status' must be 'pending' or 'solved'")
+        for key in ('from', 'to'):
+            if not isinstance(selection.get(key), (str, type(None))):
+                raise ValueError(f"'{key}' must be a YYYY-MM-DD date")
+        start = parse_date(selection.get('from'))
+        end = parse_date(selection.get('to'))
+        if end:
+            end += timedelta(days=1)  # "to" date is inclusive
+        query = filter_reports(query, status, start, end)
+        box = [selection.get(key) for key in ('south', 'west', 'north', 'east')]
+        if any(value is not None for value in box):
+            if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in box):
+                raise ValueError("a box filter needs numeric 'south', 'west', 'north' and 'east'")
+            south, west, north, east = box
+            if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+                raise ValueError('box filter out of range')
+            query = within_bbox(query, *box)
+    return query
+
+@bp.route('/api/reports/bulk', methods=['POST'])
+@admin_required
+def bulk_action():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify(error='Expected a JSON object'), 400
+    action = data.get('action')
+    if action not in BULK_ACTIONS:
+        return jsonify(error=f"'action' must be one of {', '.join(BULK_ACTIONS)}"), 400
+    try:
+        query = bulk_query(data)
+    except ValueError as e:  # Includes malformed dates
+        return jsonify(error=str(e)), 400
+
+    if action == 'reassign':
+        user_id = data.get('user_id')
+        if not isinstance(user_id, int) or isinstance(user_id, bool) or db.session.get(User, user_id) is None:
+            return jsonify(error="'user_id' must be an existing user"), 400
+
+    # One set-based UPDATE or DELETE, committed as a single transaction; RETURNING gives the
+    # affected ids for the live feed
+    if action == 'delete':
+        statement = db.delete(Report)
+    elif action == 'reassign':
+        statement = db.update(Report).values(user_id=user_id)
+    else:
+        statement = db.update(Report).values(solved=action == 'solve')
+    statement = statement.where(query.whereclause).returning(Report.id)
+    ids = db.session.execute(statement, execution_options={'synchronize_session': False}).scalars().all()
+    db.session.commit()
+    if ids:
+        event = {'solve': 'solved', 'reopen': 'reopened', 'delete': 'deleted', 'reassign': 'reassigned'}[action]
+        if action == 'reassign':
+            reports_changed(event, ids=ids, user_id=user_id)
+        else:
+            reports_changed(event, ids=ids)
+    return jsonify(action=action, affected=len(ids))
+
+def parse_readings(body, content_type):
+    # Accept a JSON array of readings or NDJSON (one reading object per line)
+    if content_type.startswith('application/json'):
+        items = json.loads(body)
+        if not isinstance(items, list):
+            raise ValueError('Expected a JSON array of readings')
+    else:
+        items = [json.loads(line) for line in body.splitlines() if line.strip()]
+    if len(items) > MAX_INGEST_BATCH:
+        raise ValueError(f'At most {MAX_INGEST_BATCH} readings per request')
+
+    rows = []
+    for index, item in enumerate(items):
+        try:
+            station = item['station']
+            row = {
+                'station': station,
+                'timestamp': float(item['timestamp']),
+                'river_height': float(item['river_height']),
+                'flow_rate': float(item['flow_rate']),
+            }
+        except KeyError as e:
+            raise ValueError(f'Reading {index}: missing {e}')
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'Reading {index}: {e}')
+        if not isinstance(station, str) or not station or len(station) > 100:
+            raise ValueError(f'Reading {index}: station must be a non-empty string of up to 100 characters')
+        if not (math.isfinite(row['timestamp']) and math.isfinite(row['river_height'])
+                and math.isfinite(row['flow_rate'])):
+            raise ValueError(f'Reading {index}: values must be finite numbers')
+        rows.append(row)
+    return rows
+
+@bp.route('/api/readings', methods=['POST'])
+def ingest_readings():
+    token = current_app.config['INGEST_TOKEN']
+    if not token:
+        return jsonify(error='Reading ingest is disabled (INGEST_TOKEN not set)'), 403
+    auth = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(auth, f'Bearer {token}'):
+        return jsonify(error='Invalid ingest token'), 401
+
+    try:
+        rows = parse_readings(request.get_data(as_text=True), request.content_type or '')
+    except ValueError as e:  # Includes malformed JSON
+        return jsonify(error=str(e)), 400
+
+    # The whole batch is one transaction: a single prepared INSERT executed for every row
+    if rows:
+        db.session.execute(Reading.__table__.insert(), rows)
+        db.session.commit()
+    return jsonify(inserted=len(rows)), 201
+
+def within_bbox(query, south, west, north, east):
+    # Reports inside a bounding box; west > east means the box crosses the antimeridian
+    if west <= east:
+        columns = [(grid_column(west), grid_column(east))]
+        longitude = Report.longitude.between(west, east)
+    else:
+        columns = [(grid_column(west), GRID_COLUMNS - 1), (0, grid_column(east))]
+        longitude = or_(Report.longitude >= west, Report.longitude <= east)
+    query = query.filter(Report.latitude.between(south, north), longitude)
+
+    first, last = grid_row(south), grid_row(north)
+    if last - first < MAX_GRID_ROWS:
+        # One cell range per grid row; SQLite answers the OR with a range scan of ix_report_cell each
+        query = query.filter(or_(*(Report.cell.between(row * GRID_COLUMNS + start, row * GRID_COLUMNS + end)
+                                   for row in range(first, last + 1) for start, end in columns)))
+    return query
+
+def float_arg(name, low, high, default=None):
+    value = request.args.get(name)
+    if value is None or value == '':
+        if default is None:
+            raise ValueError(f"missing '{name}'")
+        return default
+    try:
+        value = float(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a number")
+    if not low <= value <= high:
+        raise ValueError(f"'{name}' must be between {low:g} and {high:g}")
+    return value
+
+def bbox_args():
+    south = float_arg('south', -90, 90)
+    north = float_arg('north', -90, 90)
+    if south > north:
+        raise ValueError("'south' must not be above 'north'")
+    return south, float_arg('west', -180, 180), north, float_arg('east', -180, 180)
+
+def spatial_query():
+    status = request.args.get('status')
+    if status not in (None, '', 'pending', 'solved'):
+        raise ValueError("'status' must be 'pending' or 'solved'")
+    limit = int(float_arg('limit', 1, MAX_API_RESULTS, MAX_API_RESULTS))
+    return filter_reports(Report.query, status), limit
+
+@bp.route('/api/reports/bbox')
+@admin_required
+def reports_in_bbox():
+    try:
+        query, limit = spatial_query()
+        south, west, north, east = bbox_args()
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    reports = (within_bbox(query, south, west, north, east)
+               .order_by(Report.timestamp.desc(), Report.id.desc()).limit(limit).all())
+    return jsonify(reports=[report.to_dict() for report in reports])
+
+@bp.route('/api/reports/near')
+@admin_required
+def reports_near():
+    try:
+        query, limit = spatial_query()
+        lat = float_arg('lat', -90, 90)
+        lon = float_arg('lon', -180, 180)
+        radius = float_arg('radius_km', 0, math.pi * EARTH_RADIUS_KM, 5.0)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    # Candidates from the bounding box of the circle, then the exact great-circle distance
+    dlat = math.degrees(radius / EARTH_RADIUS_KM)
+    south, north = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    widest = max(abs(south), abs(north))
+    if widest >= 90 or dlat >= 90:
+        west, east = -180.0, 180.0  # The circle reaches a pole
+    else:
+        dlon = dlat / math.cos(math.radians(widest))
+        if dlon >= 180:
+            west, east = -180.0, 180.0
+        else:
+            west = lon - dlon if lon - dlon >= -180 else lon - dlon + 360
+            east = lon + dlon if lon + dlon <= 180 else lon + dlon - 360
+
+    nearby = []
+    for report in within_bbox(query, south, west, north, east):
+        distance = distance_km(lat, lon, report.latitude, report.longitude)
+        if distance <= radius:
+            nearby.append((distance, report))
+    nearby.sort(key=lambda item: item[0])
+    return jsonify(reports=[dict(report.to_dict(), distance_km=round(distance, 3))
+                            for distance, report in nearby[:limit]])
+
+@bp.route('/api/reports/clusters')
+@admin_required
+def report_clusters():
+    try:
+        query, _ = spatial_query()
+        south, west, north, east = bbox_args()
+        size = float_arg('cell_deg', GRID_DEG, 180, 0.1)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    # Clusters are blocks of k x k grid cells, aggregated in SQL from the stored cell numbers
+    k = max(1, int(round(size / GRID_DEG)))
+    row = (Report.cell // GRID_COLUMNS) // k
+    column = (Report.cell % GRID_COLUMNS) // k
+    rows = (within_bbox(query, south, west, north, east)
+            .with_entities(row, column, db.func.count(Report.id),
+                           db.func.avg(Report.latitude), db.func.avg(Report.longitude))
+            .group_by(row, column).all())
+    return jsonify(cell_deg=k * GRID_DEG, clusters=[{
+        'south': round(row * k * GRID_DEG - 90, 6),
+        'west': round(column * k * GRID_DEG - 180, 6),
+        'count': count,
+        'latitude': latitude,
+        'longitude': longitude,
+    } for row, column, count, latitude, longitude in rows])
+
+EXPORT_COLUMNS = ('id', 'timestamp', 'name', 'phone', 'coordinates', 'latitude', 'longitude',
+                  'description', 'solved')
+
+def export_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()  # Header of an empty export
 
-@app.route('/submission_success')
+def export_ndjson(chunks):
+    for rows in chunks:
+        yield ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n' for row in rows)
+
+def export_geojson(chunks):
+    yield '{"type": "FeatureCollection", "features": ['
+    separator = ''
+    for rows in chunks:
+        features = []
+        for row in rows:
+            properties = dict(zip(EXPORT_COLUMNS, row))
+            latitude, longitude = properties.pop('latitude'), properties.pop('longitude')
+            geometry = {'type': 'Point', 'coordinates': [longitude, latitude]} if latitude is not None else None
+            features.append(json.dumps({'type': 'Feature', 'geometry': geometry, 'properties': properties}))
+        if features:
+            yield separator + ','.join(features)
+            separator = ','
+    yield ']}\n'
+
+EXPORT_FORMATS = {
+    'csv': (export_csv, 'text/csv'),
+    'ndjson': (export_ndjson, 'application/x-ndjson'),
+    'geojson': (export_geojson, 'application/geo+json'),
+}
+
+@bp.route('/api/reports/export.<fmt>')
+@admin_required
+def export_reports(fmt):
+    # Filters: status=pending|solved, from/to dates (inclusive) and an optional south/west/north/east box
+    if fmt not in EXPORT_FORMATS:
+        return jsonify(error=f"format must be one of {', '.join(EXPORT_FORMATS)}"), 404
+    try:
+        query, _ = spatial_query()
+        start = parse_date(request.args.get('from'))
+        end = parse_date(request.args.get('to'))
+        if any(request.args.get(key) for key in ('south', 'west', 'north', 'east')):
+            query = within_bbox(query, *bbox_args())
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    if end:
+        end += timedelta(days=1)  # "to" date is inclusive
+    query = filter_reports(query, None, start, end)
+    statement = (query.with_entities(*(getattr(Report, column) for column in EXPORT_COLUMNS))
+                 .order_by(Report.id).statement)
+
+    def chunks():
+        # One query read through the cursor EXPORT_CHUNK_ROWS rows at a time, so memory use is
+        # constant and the first rows go out before the rest are read
+        result = db.session.execute(statement, execution_options={'yield_per': EXPORT_CHUNK_ROWS})
+        for rows in result.partitions():
+            yield [(report_id, timestamp.isoformat() if timestamp else None, *rest)
+                   for report_id, timestamp, *rest in rows]
+
+    serialize, mimetype = EXPORT_FORMATS[fmt]
+    response = Response(stream_with_context(serialize(chunks())), mimetype=mimetype)
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename="reports-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"')
+    return response
+
+@bp.route('/api/triage/next')
+@admin_required
+def triage_next():
+    try:
+        n = int(float_arg('n', 1, MAX_API_RESULTS, 10))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    triage = current_app.extensions['triage']
+    ranked = triage.top(n)
+    reports = {report.id: report for report in Report.query.filter(Report.id.in_([i for _, i, _, _ in ranked]))}
+    now = datetime.utcnow().timestamp()
+    return jsonify(pending=len(triage), reports=[dict(
+        reports[report_id].to_dict(),
+        score=round(score, 2),
+        priority={'age_hours': round((now - details['submitted']) / 3600, 2), 'people': details['people'],
+                  'keywords': list(details['keywords']), 'repeats': details['repeats'], 'nearby': nearby},
+    ) for score, report_id, details, nearby in ranked if report_id in reports])
+
+@bp.route('/api/submissions/stats')
+@admin_required
+def submission_stats():
+    return jsonify(current_app.extensions['submissions'].stats())
+
+@bp.route('/api/archive/run', methods=['POST'])
+@admin_required
+def run_archive():
+    # Archive now; {"older_than_days": N} overrides ARCHIVE_AFTER_DAYS for this pass
+    archive = current_app.extensions['archive']
+    data = request.get_json(silent=True) or {}
+    days = data.get('older_than_days', archive.after.total_seconds() / 86400)
+    # bool is an int; NaN fails both comparisons; the cap keeps the cutoff a valid datetime
+    if isinstance(days, bool) or not isinstance(days, (int, float)) or not 0 <= days <= MAX_ARCHIVE_AGE_DAYS:
+        return jsonify(error=f"'older_than_days' must be a number between 0 and {MAX_ARCHIVE_AGE_DAYS}"), 400
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    return jsonify(archived=archive.archive(cutoff), cutoff=cutoff.isoformat(), archive=archive.stats())
+
+@bp.route('/api/archive/reports')
+@admin_required
+def archived_reports():
+    # Read-only search of archived reports: from/to dates, south/west/north/east box, q (text in
+    # description, name or phone), id, limit
+    try:
+        limit = int(float_arg('limit', 1, MAX_API_RESULTS, 100))
+        start = parse_date(request.args.get('from'))
+        end = parse_date(request.args.get('to'))
+        box = None
+        if any(request.args.get(key) for key in ('south', 'west', 'north', 'east')):
+            box = bbox_args()
+            if box[1] > box[3]:
+                raise ValueError('archive searches do not cross the antimeridian')
+        report_id = request.args.get('id')
+        if report_id:
+            if not report_id.isdigit():
+                raise ValueError("'id' must be a report id")
+            report_id = int(report_id)
+        else:
+            report_id = None
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    if end:
+        end += timedelta(days=1)  # "to" date is inclusive
+    return jsonify(reports=current_app.extensions['archive'].search(start, end, box, request.args.get('q'), report_id, limit))
+
+@bp.route('/api/archive/stats')
+@admin_required
+def archive_stats():
+    return jsonify(current_app.extensions['archive'].stats())
+
+@bp.route('/submission_success')
 @login_required
 def submission_success():
     return render_template('submission_success.html')
 
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()  # Create tables with new schema
-
-        # Create admin user if it doesn't exist
-        admin = User.query.filter_by(username=ADMIN_USERNAME).first()
-        if not admin:
-            admin = User(username=ADMIN_USERNAME, email='admin@example.com')
-            admin.set_password(ADMIN_PASSWORD)
-            db.session.add(admin)
-            db.session.commit()
-
-    app.run(debug=True, host='0.0.0.0')
\ No newline at end of file
+    create_app().run(debug=True, host='0.0.0.0')
@@ -0,0 +1,70 @@
+import importlib.util
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+# part_A also has an app.py, so load this one by path
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+spec = importlib.util.spec_from_file_location('app', APP_PATH)
+server = importlib.util.module_from_spec(spec)
+sys.modules['app'] = server
+spec.loader.exec_module(server)
+
+
+def make_app(directory, **config):
+    """Application with its own database, journal and archive under `directory`"""
+    directory.mkdir(parents=True, exist_ok=True)
+    return server.create_app(dict({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{directory / 'test.db'}",
+        'SUBMISSION_JOURNAL': str(directory / 'journal'),
+        'ARCHIVE_DIR': str(directory / 'archive'),
+        'ARCHIVE_INTERVAL_HOURS': 0,
+    }, **config))
+
+
+def close_app(app):
+    app.extensions['submissions'].stop()
+    with app.app_context():
+        server.db.engine.dispose()
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        server.init_database()
+    app.extensions['database_ready'] = True
+    yield app
+    close_app(app)
+
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    client.post('/admin_login', data={'username': server.ADMIN_USERNAME, 'password': server.ADMIN_PASSWORD})
+    return client
+
+
+@pytest.fixture
+def user_client(app):
+    client = app.test_client()
+    client.post('/login', data={'username': server.ADMIN_USERNAME, 'password': server.ADMIN_PASSWORD})
+    return client
+
+
+@pytest.fixture
+def add_reports(app):
+    """Store reports straight away (bypassing the submission writer); returns their ids"""
+    def add(*records):
+        rows = [server.report_row(dict({'name': 'Resident', 'phone': '555-0100', 'coordinates': '12.97, 77.59',
+                                        'description': 'Water entering the house', 'user_id': 1,
+                                        'timestamp': datetime(2024, 6, 1).isoformat()}, **record))
+                for record in records]
+        with app.app_context():
+            created, _ = server.store_reports(rows)
+            server.db.session.commit()
+        return [report_id for report_id, _ in created]
+    return add
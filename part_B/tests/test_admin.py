@@ -0,0 +1,82 @@
+import json
+
+from conftest import server
+
+
+def test_unchanged_page_is_not_modified(admin_client, add_reports):
+    add_reports({'description': 'Bridge flooded'})
+    first = admin_client.get('/admin')
+    assert first.status_code == 200 and b'Bridge flooded' in first.data and first.headers['ETag']
+    again = admin_client.get('/admin', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and again.data == b'' and again.headers['ETag'] == first.headers['ETag']
+    assert admin_client.get('/admin', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_write_changes_the_etag(app, admin_client, add_reports):
+    ids = add_reports({})
+    etag = admin_client.get('/admin').headers['ETag']
+    admin_client.post('/api/reports/bulk', json={'action': 'solve', 'ids': ids})
+    response = admin_client.get('/admin', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    assert app.extensions['admin_cache'].version == 1
+
+
+def test_cached_pages_are_served_until_a_write(app, admin_client, add_reports, monkeypatch):
+    add_reports({})
+    cache = app.extensions['admin_cache']
+    html = admin_client.get('/admin?status=pending').data
+    assert list(cache.pages) == ['/admin?status=pending']
+
+    def no_query(*args):
+        raise AssertionError('page rendered again')
+
+    monkeypatch.setattr(server, 'report_page', no_query)
+    assert admin_client.get('/admin?status=pending').data == html
+    monkeypatch.undo()
+
+    admin_client.post('/api/reports/bulk', json={'action': 'solve', 'filter': {'status': 'pending'}})
+    assert cache.pages == {}
+
+
+def test_oldest_cached_page_is_evicted(app, admin_client):
+    cache = app.extensions['admin_cache']
+    cache.size = 2
+    for status in ('pending', 'solved'):
+        admin_client.get(f'/admin?status={status}')
+    admin_client.get('/admin')
+    assert list(cache.pages) == ['/admin?status=solved', '/admin?']
+
+
+def events(app, admin_client, **headers):
+    """Open the live feed; returns the response and an iterator over its chunks"""
+    app.extensions['report_events'].keepalive = 0.05
+    response = admin_client.get('/admin/events', headers=headers)
+    assert response.mimetype == 'text/event-stream'
+    chunks = (chunk.decode() for chunk in response.iter_encoded())
+    assert next(chunks) == 'retry: 3000\n\n'
+    return response, chunks
+
+
+def test_feed_delivers_events_committed_after_connecting(app, admin_client, add_reports):
+    ids = add_reports({}, {'phone': '2'})
+    boot_id = app.extensions['report_events'].boot_id
+    response, chunks = events(app, admin_client)
+    assert next(chunks) == ': keepalive\n\n'
+    admin_client.post('/api/reports/bulk', json={'action': 'solve', 'ids': ids})
+    assert next(chunks) == f'id: {boot_id}:1\nevent: solved\ndata: {json.dumps({"ids": ids})}\n\n'
+    response.close()
+
+
+def test_feed_resumes_from_last_event_id(app, admin_client, add_reports):
+    ids = add_reports({}, {'phone': '2'})
+    for report_id in ids:
+        admin_client.post('/api/reports/bulk', json={'action': 'solve', 'ids': [report_id]})
+    boot_id = app.extensions['report_events'].boot_id
+    response, chunks = events(app, admin_client, **{'Last-Event-ID': f'{boot_id}:1'})
+    assert next(chunks) == f'id: {boot_id}:2\nevent: solved\ndata: {{"ids": [{ids[1]}]}}\n\n'
+    response.close()
+
+    # An id from before a restart cannot be resumed: the dashboard is told to reload
+    response, chunks = events(app, admin_client, **{'Last-Event-ID': 'ffffffff:1'})
+    assert next(chunks) == f'id: {boot_id}:2\nevent: reset\ndata: {{}}\n\n'
+    assert list(chunks) == []
@@ -0,0 +1,69 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import server
+
+
+def solve(app, ids):
+    with app.app_context():
+        server.db.session.execute(server.db.update(server.Report).where(server.Report.id.in_(ids)).values(solved=True))
+        server.db.session.commit()
+
+
+def remaining(app):
+    with app.app_context():
+        return sorted(server.db.session.execute(server.db.select(server.Report.id)).scalars())
+
+
+def test_archive_moves_old_solved_reports(app, add_reports):
+    ids = add_reports({'phone': '1', 'timestamp': '2024-05-30T08:00:00', 'description': 'Bridge flooded'},
+                      {'phone': '2', 'timestamp': '2024-06-02T08:00:00'},
+                      {'phone': '3', 'timestamp': '2024-06-03T08:00:00'},
+                      {'phone': '4', 'timestamp': '2024-07-01T08:00:00'})
+    solve(app, ids)
+    with app.app_context():
+        assert app.extensions['archive'].archive(datetime(2024, 6, 10)) == 3
+    assert remaining(app) == [ids[3]]
+
+    stats = app.extensions['archive'].stats()
+    assert stats['reports'] == 3 and stats['segments'] == 2
+    assert [record['id'] for record in app.extensions['archive'].search(text='bridge')] == [ids[0]]
+    assert [record['id'] for record in app.extensions['archive'].search(start=datetime(2024, 6, 1))] == [ids[2], ids[1]]
+
+
+def test_archive_skips_pending_reports(app, add_reports):
+    ids = add_reports({'phone': '1'}, {'phone': '2'})
+    solve(app, ids[:1])
+    with app.app_context():
+        assert app.extensions['archive'].archive(datetime(2025, 1, 1)) == 1
+    assert remaining(app) == [ids[1]]
+    assert [record['id'] for record in app.extensions['archive'].search()] == [ids[0]]
+
+
+def test_failed_archive_write_keeps_reports(app, add_reports, monkeypatch):
+    ids = add_reports({'phone': '1'}, {'phone': '2'})
+    solve(app, ids)
+
+    def fail(month, records):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(app.extensions['archive'], 'append', fail)
+    with app.app_context(), pytest.raises(OSError):
+        app.extensions['archive'].archive(datetime(2025, 1, 1))
+    assert remaining(app) == ids
+
+
+@pytest.mark.parametrize('days', ['true', '"30"', '-1', 'NaN', 'Infinity', '1e9'])
+def test_run_rejects_bad_older_than_days(admin_client, days):
+    response = admin_client.post('/api/archive/run', data='{"older_than_days": %s}' % days,
+                                 content_type='application/json')
+    assert response.status_code == 400 and 'older_than_days' in response.get_json()['error']
+
+
+def test_run_with_older_than_days(app, admin_client, add_reports):
+    ids = add_reports({'phone': '1'}, {'phone': '2', 'timestamp': datetime.utcnow().isoformat()})
+    solve(app, ids)
+    response = admin_client.post('/api/archive/run', json={'older_than_days': 30})
+    assert response.status_code == 200 and response.get_json()['archived'] == 1
+    assert remaining(app) == [ids[1]]
@@ -0,0 +1,70 @@
+import pytest
+
+from conftest import server
+
+
+def reports(app):
+    with app.app_context():
+        return {report.id: report for report in server.Report.query}
+
+
+def test_bulk_requires_admin(app):
+    response = app.test_client().post('/api/reports/bulk', json={'action': 'solve', 'ids': [1]})
+    assert response.status_code == 302
+
+
+def test_bulk_solve_by_ids(app, admin_client, add_reports):
+    ids = add_reports({'phone': '1'}, {'phone': '2'}, {'phone': '3'})
+    response = admin_client.post('/api/reports/bulk', json={'action': 'solve', 'ids': ids[:2]})
+    assert response.get_json() == {'action': 'solve', 'affected': 2}
+    assert [report.solved for report in reports(app).values()] == [True, True, False]
+
+
+def test_bulk_delete_by_filter(app, admin_client, add_reports):
+    add_reports({'phone': '1', 'timestamp': '2024-06-01T10:00:00'},
+                {'phone': '2', 'timestamp': '2024-06-02T10:00:00'},
+                {'phone': '3', 'timestamp': '2024-06-03T10:00:00'})
+    response = admin_client.post('/api/reports/bulk', json={
+        'action': 'delete', 'filter': {'from': '2024-06-02', 'to': '2024-06-02'}})
+    assert response.get_json()['affected'] == 1
+    assert sorted(report.phone for report in reports(app).values()) == ['1', '3']
+
+
+def test_bulk_filter_box(app, admin_client, add_reports):
+    add_reports({'phone': '1', 'coordinates': '12.97, 77.59'}, {'phone': '2', 'coordinates': '28.61, 77.21'})
+    response = admin_client.post('/api/reports/bulk', json={
+        'action': 'solve', 'filter': {'south': 12, 'west': 77, 'north': 13.5, 'east': 78}})
+    assert response.get_json()['affected'] == 1
+
+
+def test_bulk_reassign(app, admin_client, add_reports):
+    ids = add_reports({})
+    assert admin_client.post('/api/reports/bulk', json={
+        'action': 'reassign', 'ids': ids, 'user_id': 1}).get_json()['affected'] == 1
+    assert admin_client.post('/api/reports/bulk', json={
+        'action': 'reassign', 'ids': ids, 'user_id': 99}).status_code == 400
+
+
+@pytest.mark.parametrize('body', [
+    {'action': 'explode', 'ids': [1]},
+    {'action': 'solve'},
+    {'action': 'solve', 'ids': [True]},
+    {'action': 'solve', 'ids': '1,2'},
+    {'action': 'solve', 'filter': {}},
+    {'action': 'solve', 'filter': {'colour': 'red'}},
+    {'action': 'solve', 'filter': {'status': 'open'}},
+    {'action': 'solve', 'filter': {'from': 5}},
+    {'action': 'solve', 'filter': {'to': ['2024-06-01']}},
+    {'action': 'solve', 'filter': {'from': '01/06/2024'}},
+    {'action': 'solve', 'filter': {'south': True, 'west': 0, 'north': 1, 'east': 1}},
+    {'action': 'solve', 'filter': {'south': 0, 'west': 0, 'north': '1', 'east': 1}},
+    {'action': 'solve', 'filter': {'south': 0, 'west': 0, 'north': 91, 'east': 1}},
+    {'action': 'reassign', 'ids': [1], 'user_id': True},
+    {'action': 'reassign', 'ids': [1], 'user_id': '1'},
+])
+def test_bulk_rejects_malformed_requests(app, admin_client, add_reports, body):
+    add_reports({})
+    response = admin_client.post('/api/reports/bulk', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert not reports(app)[1].solved and reports(app)[1].user_id == 1
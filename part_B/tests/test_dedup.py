@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from conftest import server
+
+
+def submit(app, *records):
+    """Run records through the submission writer's storage step; returns (created ids, merged)"""
+    base = {'name': 'Resident', 'phone': '+91 98450 12345', 'coordinates': '12.97000, 77.59000',
+            'description': 'Water rising fast, family of 4 on the roof', 'user_id': 1,
+            'timestamp': datetime(2024, 6, 1, 10, 0).isoformat()}
+    rows = [server.report_row(dict(base, **record)) for record in records]
+    with app.app_context():
+        created, merged = server.store_reports(rows)
+        server.db.session.commit()
+    return [report_id for report_id, _ in created], merged
+
+
+def stored(app):
+    with app.app_context():
+        return [(report.id, report.duplicates) for report in server.Report.query.order_by(server.Report.id)]
+
+
+def test_repeat_submissions_are_merged(app):
+    (first,), _ = submit(app, {})
+    created, merged = submit(app, {'phone': '098450-12345', 'timestamp': '2024-06-01T10:20:00'},
+                             {'description': 'water rising fast,  family of 4 on the roof!',
+                              'timestamp': '2024-06-01T10:40:00'})
+    assert created == [] and merged == {first: 2}
+    assert stored(app) == [(first, 2)]
+
+
+def test_repeats_within_one_batch_are_merged(app):
+    created, merged = submit(app, {}, {'timestamp': '2024-06-01T10:05:00'}, {'timestamp': '2024-06-01T10:06:00'})
+    assert len(created) == 1 and merged == {}
+    assert stored(app) == [(created[0], 2)]
+
+
+def test_matches_across_rounding_and_bucket_edges(app):
+    # 0.0004 degrees (about 45 m) apart on either side of a rounding edge, and either side of the hour
+    (first,), _ = submit(app, {'coordinates': '12.97049, 77.59049', 'timestamp': '2024-06-01T10:59:00'})
+    created, merged = submit(app, {'coordinates': '12.97051, 77.59051', 'timestamp': '2024-06-01T11:01:00'})
+    assert created == [] and merged == {first: 1}
+
+
+def test_distinct_reports_are_kept(app):
+    (first,), _ = submit(app, {})
+    created, merged = submit(app,
+                             {'phone': '555-0199'},                                # Other phone
+                             {'coordinates': '12.98, 77.59'},                      # About 1 km away
+                             {'timestamp': '2024-06-01T11:30:00'},                 # Over an hour later
+                             {'description': 'Bridge collapsed near the school'})  # Different report
+    assert len(created) == 4 and merged == {}
+
+
+def test_solved_reports_are_not_merged_into(app):
+    (first,), _ = submit(app, {})
+    with app.app_context():
+        server.db.session.get(server.Report, first).solved = True
+        server.db.session.commit()
+    created, merged = submit(app, {'timestamp': '2024-06-01T10:10:00'})
+    assert len(created) == 1 and merged == {}
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+
+import pytest
+
+from conftest import server
+
+
+@pytest.fixture
+def ids(add_reports, monkeypatch):
+    monkeypatch.setattr(server, 'EXPORT_CHUNK_ROWS', 2)  # Several chunks for three reports
+    return add_reports({'phone': '1', 'description': 'Roof, "north" side'},
+                       {'phone': '2', 'coordinates': '28.61, 77.21'},
+                       {'phone': '3', 'timestamp': '2024-06-05T08:30:00'})
+
+
+def export(client, fmt, query=''):
+    response = client.get(f'/api/reports/export.{fmt}{query}')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'].endswith(f'.{fmt}"')
+    return response
+
+
+def test_csv(admin_client, ids):
+    response = export(admin_client, 'csv')
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == list(server.EXPORT_COLUMNS)
+    assert [row[0] for row in rows[1:]] == [str(report_id) for report_id in ids]
+    assert rows[1][1:8] == ['2024-06-01T00:00:00', 'Resident', '1', '12.97, 77.59', '12.97', '77.59',
+                            'Roof, "north" side']
+
+
+def test_ndjson_with_filters(admin_client, ids):
+    response = export(admin_client, 'ndjson', '?from=2024-06-01&to=2024-06-01&south=12&west=77&north=13&east=78')
+    assert response.mimetype == 'application/x-ndjson'
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [record['id'] for record in records] == ids[:1]
+    assert set(records[0]) == set(server.EXPORT_COLUMNS) and records[0]['solved'] is False
+
+
+def test_geojson(admin_client, ids):
+    response = export(admin_client, 'geojson')
+    assert response.mimetype == 'application/geo+json'
+    collection = json.loads(response.get_data(as_text=True))
+    assert collection['type'] == 'FeatureCollection'
+    features = collection['features']
+    assert [feature['properties']['id'] for feature in features] == ids
+    assert features[1]['geometry'] == {'type': 'Point', 'coordinates': [77.21, 28.61]}
+    assert 'latitude' not in features[1]['properties']
+
+
+def test_empty_and_bad_exports(admin_client):
+    assert admin_client.get('/api/reports/export.csv').get_data(as_text=True).splitlines() == \
+        [','.join(server.EXPORT_COLUMNS)]
+    assert json.loads(admin_client.get('/api/reports/export.geojson').data) == \
+        {'type': 'FeatureCollection', 'features': []}
+    assert admin_client.get('/api/reports/export.ndjson').data == b''
+    assert admin_client.get('/api/reports/export.xml').status_code == 404
+    assert admin_client.get('/api/reports/export.csv?from=June').status_code == 400
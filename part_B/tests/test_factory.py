@@ -0,0 +1,84 @@
+import sqlite3
+
+from conftest import close_app, make_app, server
+
+
+def columns(path, table):
+    with sqlite3.connect(path) as connection:
+        return {row[1] for row in connection.execute(f'PRAGMA table_info({table})')}
+
+
+def test_new_database_starts_at_latest_schema(app, tmp_path):
+    with app.app_context():
+        assert server.db.session.scalar(server.db.select(server.SchemaVersion.version)) == len(server.MIGRATIONS)
+        assert server.User.query.filter_by(username=server.ADMIN_USERNAME).one()
+    assert {'latitude', 'longitude', 'cell', 'dedup_key', 'duplicates'} <= columns(tmp_path / 'test.db', 'report')
+
+
+def test_legacy_database_is_migrated_in_place(tmp_path):
+    path = tmp_path / 'legacy.db'
+    with sqlite3.connect(path) as connection:
+        connection.executescript('''
+            CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(80) UNIQUE NOT NULL,
+                               email VARCHAR(120) UNIQUE NOT NULL, password_hash VARCHAR(120) NOT NULL);
+            CREATE TABLE report (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, phone VARCHAR(20) NOT NULL,
+                                 coordinates VARCHAR(50) NOT NULL, description TEXT NOT NULL, timestamp DATETIME,
+                                 solved BOOLEAN, user_id INTEGER NOT NULL REFERENCES user (id));
+            INSERT INTO user VALUES (1, 'resident', 'r@example.com', 'x');
+            INSERT INTO report VALUES (1, 'Resident', '555', '12.97, 77.59', 'Flooded street',
+                                       '2024-06-01 10:00:00.000000', 0, 1);
+            INSERT INTO report VALUES (2, 'Resident', '555', 'somewhere', 'No location', '2024-06-01 11:00:00.000000', 1, 1);
+        ''')
+
+    app = make_app(tmp_path, SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}')
+    result = app.test_cli_runner().invoke(args=['init-db'])
+    assert 'Database ready' in result.output
+    assert app.extensions['database_ready']
+    try:
+        with app.app_context():
+            assert server.db.session.scalar(server.db.select(server.SchemaVersion.version)) == len(server.MIGRATIONS)
+            located, unlocated = server.Report.query.order_by(server.Report.id).all()
+            assert (located.latitude, located.longitude) == (12.97, 77.59)
+            assert located.cell == server.grid_cell(12.97, 77.59) and located.duplicates == 0
+            assert unlocated.latitude is None and unlocated.solved
+            server.db.engine.dispose()
+        with sqlite3.connect(path) as connection:
+            indexes = {row[1] for row in connection.execute('PRAGMA index_list(report)')}
+        assert {'ix_report_timestamp_id', 'ix_report_cell', 'ix_report_dedup_key'} <= indexes
+
+        # Running it again finds nothing to migrate
+        assert 'Migrated' not in app.test_cli_runner().invoke(args=['init-db']).output
+    finally:
+        close_app(app)
+
+
+def submit(app, description):
+    client = app.test_client()
+    client.post('/login', data={'username': server.ADMIN_USERNAME, 'password': server.ADMIN_PASSWORD})
+    response = client.post('/user', data={'name': 'Resident', 'phone': '555-0100', 'coordinates': '12.97, 77.59',
+                                          'description': description})
+    assert response.status_code == 302
+
+
+def stored(app):
+    with app.app_context():
+        return sorted(report.description for report in server.Report.query)
+
+
+def test_apps_are_independent(tmp_path):
+    first = make_app(tmp_path / 'first')
+    submit(first, 'Submitted before the second app existed')
+    second = make_app(tmp_path / 'second')
+    assert not (tmp_path / 'second' / 'test.db').exists()  # Nothing is opened before the first request
+    submit(first, 'Submitted after the second app was created')
+    submit(second, 'Submitted to the second app')
+    assert first.extensions['submissions'] is not second.extensions['submissions']
+    for app in (first, second):
+        close_app(app)  # Drains the queue
+
+    assert stored(first) == ['Submitted after the second app was created', 'Submitted before the second app existed']
+    assert stored(second) == ['Submitted to the second app']
+    assert first.extensions['triage'] is not second.extensions['triage']
+    assert first.extensions['admin_cache'].version == 2 and second.extensions['admin_cache'].version == 1
+    for directory in (tmp_path / 'first' / 'journal', tmp_path / 'second' / 'journal'):
+        assert list(directory.iterdir()) == []
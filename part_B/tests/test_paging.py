@@ -0,0 +1,37 @@
+from conftest import server
+
+
+def walk(app, limit, **cursors):
+    with app.app_context():
+        reports, newer, older = server.report_page(server.Report.query, limit=limit, **cursors)
+        return [report.id for report in reports], newer, older
+
+
+def test_pages_split_reports_with_equal_timestamps(app, add_reports):
+    # One timestamp for all: only the id orders them, so the cursor must carry it
+    ids = add_reports(*[{'phone': str(n)} for n in range(5)])
+    newest_first = ids[::-1]
+
+    pages, older = [], None
+    while True:
+        page, newer, older = walk(app, 2, before=older and server.decode_cursor(older))
+        pages.append(page)
+        assert (newer is None) == (len(pages) == 1)
+        if older is None:
+            break
+    assert pages == [newest_first[:2], newest_first[2:4], newest_first[4:]]
+
+    # And back up from the last page
+    page, newer, older = walk(app, 2, after=server.decode_cursor(f'2024-06-01T00:00:00_{ids[0]}'))
+    assert page == newest_first[2:4] and newer is not None and older is not None
+    page, newer, older = walk(app, 2, after=server.decode_cursor(newer))
+    assert page == newest_first[:2] and newer is None
+
+
+def test_admin_page_links_follow_the_cursor(admin_client, add_reports):
+    ids = add_reports({'phone': '1', 'description': 'first report'},
+                      {'phone': '2', 'description': 'second report'},
+                      {'phone': '3', 'description': 'third report', 'timestamp': '2024-05-31T00:00:00'})
+    page = admin_client.get(f'/admin?before=2024-06-01T00:00:00_{ids[1]}').data
+    assert b'first report' in page and b'second report' not in page and b'third report' in page
+    assert admin_client.get('/admin?before=yesterday').status_code == 302
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from conftest import server
+
+AUTH = {'Authorization': 'Bearer sensor-token'}
+READING = {'station': 'North Weir', 'timestamp': 1717236000.0, 'river_height': 12.5, 'flow_rate': 3.2}
+
+
+@pytest.fixture
+def client(app):
+    app.config['INGEST_TOKEN'] = 'sensor-token'
+    return app.test_client()
+
+
+def stored(app):
+    with app.app_context():
+        return server.db.session.execute(server.db.select(server.Reading.station, server.Reading.river_height)).all()
+
+
+def test_json_and_ndjson_batches(app, client):
+    response = client.post('/api/readings', json=[READING, dict(READING, timestamp=1717236060)], headers=AUTH)
+    assert response.status_code == 201 and response.get_json() == {'inserted': 2}
+    body = '\n'.join(json.dumps(dict(READING, station='South', river_height=n)) for n in range(3)) + '\n\n'
+    response = client.post('/api/readings', data=body, content_type='application/x-ndjson', headers=AUTH)
+    assert response.get_json() == {'inserted': 3}
+    assert sorted(stored(app)) == [('North Weir', 12.5)] * 2 + [('South', n) for n in range(3)]
+
+
+@pytest.mark.parametrize('rows, error', [
+    ({'station': 'North'}, 'JSON array'),
+    ([READING, {'station': 'North', 'timestamp': 1, 'flow_rate': 1}], "Reading 1: missing 'river_height'"),
+    ([dict(READING, river_height='high')], 'Reading 0:'),
+    ([dict(READING, flow_rate=None)], 'Reading 0:'),
+    ([dict(READING, station='')], 'station must be'),
+    ([dict(READING, station=7)], 'station must be'),
+    ([dict(READING, station='x' * 101)], 'station must be'),
+    ([dict(READING, timestamp='nan')], 'finite'),
+    ([dict(READING, river_height='inf')], 'finite'),
+    (['North,1,2,3'], 'Reading 0:'),
+])
+def test_bad_rows_reject_the_whole_batch(app, client, rows, error):
+    response = client.post('/api/readings', json=rows, headers=AUTH)
+    assert response.status_code == 400 and error in response.get_json()['error']
+    assert stored(app) == []
+
+
+def test_malformed_and_oversized_bodies(app, client, monkeypatch):
+    assert client.post('/api/readings', data='[{"station":', content_type='application/json',
+                       headers=AUTH).status_code == 400
+    assert client.post('/api/readings', data='{"station": "North"}\nnot json\n', content_type='application/x-ndjson',
+                       headers=AUTH).status_code == 400
+    monkeypatch.setattr(server, 'MAX_INGEST_BATCH', 2)
+    response = client.post('/api/readings', json=[READING] * 3, headers=AUTH)
+    assert response.status_code == 400 and 'At most 2' in response.get_json()['error']
+    assert stored(app) == []
+
+
+def test_ingest_token(app, client):
+    assert client.post('/api/readings', json=[READING]).status_code == 401
+    assert client.post('/api/readings', json=[READING], headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    app.config['INGEST_TOKEN'] = None
+    assert client.post('/api/readings', json=[READING], headers=AUTH).status_code == 403
@@ -0,0 +1,152 @@
+import atexit
+import json
+import os
+import shutil
+
+import pytest
+
+from conftest import close_app, make_app, server
+
+RECORD = {'name': 'Resident', 'phone': '555-0100', 'coordinates': '12.97, 77.59', 'user_id': 1}
+
+
+@pytest.fixture
+def start_app(tmp_path):
+    apps = []
+
+    def start(**config):
+        app = make_app(tmp_path, **config)
+        with app.app_context():
+            server.init_database()
+        app.extensions['database_ready'] = True
+        apps.append(app)
+        return app, app.extensions['submissions']
+
+    yield start
+    for app in apps:
+        close_app(app)
+
+
+def descriptions(app):
+    with app.app_context():
+        return sorted(report.description for report in server.Report.query)
+
+
+def submit(queue, *descriptions):
+    for n, description in enumerate(descriptions):
+        # Distinct phones keep the reports from being merged as duplicates
+        queue.submit('Resident', f'555-01{n:02}', '12.97, 77.59', description, 1)
+
+
+def test_group_commit_batches_queued_reports(start_app, tmp_path):
+    app, queue = start_app(SUBMIT_BATCH_SIZE=3, SUBMIT_BATCH_INTERVAL=60)
+    submit(queue, *[f'report {n}' for n in range(7)])
+    queue.stop()  # Writes the remainder without waiting for the interval
+    assert descriptions(app) == [f'report {n}' for n in range(7)]
+    assert list((tmp_path / 'journal').iterdir()) == []
+    stats = queue.stats()
+    # Reports queued while a batch waits for its interval share its commit
+    assert stats['committed'] == 7 and 1 <= stats['batches'] <= 3 and stats['queue_depth'] == 0
+
+
+def test_stop_and_restart(start_app):
+    app, queue = start_app()
+    submit(queue, 'before restart')
+    queue.stop()
+    queue.stop()  # Idempotent
+    submit(queue, 'after restart')  # Starts the writer again
+    queue.stop()
+    assert descriptions(app) == ['after restart', 'before restart']
+
+
+def test_exit_handler_registered_once(start_app, monkeypatch):
+    registered = []
+    monkeypatch.setattr(atexit, 'register', registered.append)
+    app, queue = start_app()
+    for _ in range(3):
+        queue.stop()
+        queue.start()
+    assert registered == [queue.stop]
+
+
+def test_replay_of_journal_left_by_a_crash(start_app, tmp_path):
+    journal = tmp_path / 'journal'
+    journal.mkdir()
+    (journal / '1.ndjson').write_text(
+        json.dumps(dict(RECORD, description='acknowledged, never committed', timestamp='2024-06-01T10:00:00')) + '\n' +
+        json.dumps(dict(RECORD, description='also pending', phone='555-0199', timestamp='2024-06-01T10:00:01')) + '\n' +
+        '{"name": "torn')
+    (journal / '2.ndjson').write_text(json.dumps({'name': 'no other fields'}) + '\n')
+    (journal / 'notes.txt').write_text('not a segment')
+
+    app, queue = start_app()
+    assert descriptions(app) == ['acknowledged, never committed', 'also pending']
+    assert sorted(path.name for path in journal.iterdir() if path.suffix == '.ndjson') == [os.path.basename(queue.segment.name)]
+    assert [json.loads(line) for line in (journal / 'rejected' / '2.ndjson').read_text().splitlines()] == \
+        [{'name': 'no other fields'}]
+
+    # A second start finds nothing left to replay
+    queue.stop()
+    queue.start()
+    assert descriptions(app) == ['acknowledged, never committed', 'also pending']
+
+
+def test_bad_report_does_not_block_the_queue(start_app, tmp_path):
+    app, queue = start_app(SUBMIT_BATCH_INTERVAL=60)
+    queue.retries = 1
+    submit(queue, 'good')
+    queue.submit('Resident', '555-0177', 'nowhere', 'cannot be located', 1)  # Fails report_row()
+    submit(queue, 'also good')
+    queue.stop()
+    assert descriptions(app) == ['also good', 'good']
+    assert queue.stats()['rejected'] == 1
+    rejected = [json.loads(line) for path in (tmp_path / 'journal' / 'rejected').iterdir()
+                for line in path.read_text().splitlines()]
+    assert [record['description'] for record in rejected] == ['cannot be located']
+
+
+def test_failing_batch_is_retried_then_stored_report_by_report(start_app, tmp_path, monkeypatch):
+    app, queue = start_app(SUBMIT_BATCH_INTERVAL=60)
+    queue.retries = 2
+    store_reports = server.store_reports
+    calls = []
+
+    def refuse_poison(rows):
+        calls.append(len(rows))
+        if any(row['description'] == 'poison' for row in rows):
+            raise ValueError('constraint failed')
+        return store_reports(rows)
+
+    monkeypatch.setattr(server, 'store_reports', refuse_poison)
+    submit(queue, 'good', 'poison', 'also good')
+    queue.stop()
+    assert descriptions(app) == ['also good', 'good']
+    assert calls == [3, 3, 3, 1, 1, 1]  # The batch, its 2 retries, then one report at a time
+    stats = queue.stats()
+    assert stats['failed_commits'] == 4 and stats['rejected'] == 1 and stats['committed'] == 2
+    assert 'poison' in next((tmp_path / 'journal' / 'rejected').iterdir()).read_text()
+
+
+def test_writer_survives_losing_the_journal_directory(start_app, tmp_path):
+    app, queue = start_app(SUBMIT_BATCH_SIZE=1)
+    shutil.rmtree(tmp_path / 'journal')
+    submit(queue, 'first', 'second')
+    queue.stop()
+    assert descriptions(app) == ['first', 'second']
+    assert queue.thread is None
+
+
+def test_replay_after_a_crash_between_commit_and_segment_removal(start_app, tmp_path, monkeypatch):
+    app, queue = start_app(SUBMIT_BATCH_INTERVAL=60)
+    monkeypatch.setattr(queue, 'finish_segment', lambda *args: None)  # Crash before the segment goes
+    queue.submit('Resident', '555-0100', '12.97, 77.59', 'roof', 1)
+    queue.submit('Resident', '555-0100', '12.97, 77.59', 'roof', 1)  # Merged into the first
+    queue.stop()
+    monkeypatch.undo()
+
+    queue.start()  # Replays the segment: both submissions are already applied
+    with app.app_context():
+        assert [(report.description, report.duplicates) for report in server.Report.query] == [('roof', 1)]
+        assert server.AppliedSubmission.query.count() == 0  # Forgotten with the replayed segment
+    assert [path for path in (tmp_path / 'journal').iterdir() if path.name != os.path.basename(queue.segment.name)
+            and path.suffix == '.ndjson'] == []
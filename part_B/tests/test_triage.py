@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import server
+
+SUBMITTED = datetime(2024, 6, 1, 10, 0)
+
+
+def report(report_id, description='Water entering the house', latitude=12.97, longitude=77.59, **fields):
+    return dict({'id': report_id, 'timestamp': SUBMITTED, 'description': description, 'duplicates': 0,
+                 'cell': server.grid_cell(latitude, longitude)}, **fields)
+
+
+def ranking(triage, n=10):
+    return [report_id for _, report_id, _, _ in triage.top(n)]
+
+
+@pytest.fixture
+def triage():
+    return server.TriageQueue()
+
+
+def test_top_is_in_priority_order_and_leaves_the_queue_intact(triage):
+    triage.add(report(1))
+    triage.add(report(2, 'Family of 4 trapped on the roof', latitude=13.5))
+    triage.add(report(3, 'Elderly man stranded', latitude=14.5))
+    triage.add(report(4, 'Need help', timestamp=datetime(2024, 6, 1, 9, 0), latitude=15.5))  # Waiting longer
+    ranked = triage.top(10)
+    assert [report_id for _, report_id, _, _ in ranked] == [2, 3, 4, 1]
+    scores = [score for score, _, _, _ in ranked]
+    assert scores == sorted(scores, reverse=True)
+    assert ranking(triage, 2) == [2, 3]
+    assert ranking(triage) == [2, 3, 4, 1] and len(triage) == 4
+
+
+def test_stale_entries_of_solved_and_changed_reports_are_skipped(triage):
+    for report_id, latitude in enumerate((10.5, 11.5, 12.5), 1):
+        triage.add(report(report_id, latitude=latitude, timestamp=datetime(2024, 6, 1, 10, report_id)))
+    assert ranking(triage) == [1, 2, 3]  # Oldest first when nothing else differs
+
+    triage.remove([1])
+    triage.set_repeats(3, 2)  # Repeated reports of the same emergency rank higher
+    triage.set_repeats(3, 3)
+    assert len(triage.heap) > len(triage)  # Old entries stay in the heap until they surface
+    assert ranking(triage) == [3, 2]
+    assert triage.top(10)[0][2]['repeats'] == 3
+
+    triage.add(report(1, latitude=10.5))  # Reopened
+    assert ranking(triage) == [3, 1, 2]
+
+
+def test_reports_in_a_busy_block_are_rescored(triage):
+    triage.add(report(1))
+    alone = triage.top(1)[0]
+    assert alone[3] == 0
+    triage.add(report(2, latitude=12.971))
+    triage.add(report(3, latitude=12.972))
+    score, report_id, _, nearby = next(entry for entry in triage.top(10) if entry[1] == 1)
+    assert nearby == 2 and score == pytest.approx(alone[0] + 2 * server.TRIAGE_WEIGHTS['density'], abs=0.01)
+
+    triage.remove([2, 3])
+    score, _, _, nearby = triage.top(1)[0]
+    assert nearby == 0 and score == pytest.approx(alone[0], abs=0.01)
+    assert triage.blocks == {triage.entries[1][2]['block']: {1}}